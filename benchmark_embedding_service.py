@@ -0,0 +1,88 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from embedding_service import EmbeddingService
+
+#Runs EmbeddingService against a local fake batchEmbedContents server.
+#The fake server sleeps 40 ms per request, answers ~10% of requests with 429 and ~5% with 503, and
+#returns a deterministic vector per text, so results can be checked for order and exactness.
+#Run from the repo root:  python benchmark_embedding_service.py
+
+DIM = 768
+LATENCY_S = 0.04
+
+
+def expected_vector(text):
+    seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+    return np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+
+
+class FakeEmbeddingHandler(BaseHTTPRequestHandler):
+    error_rate = {429: 0.10, 503: 0.05}
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(LATENCY_S)
+        roll = random.random()
+        if roll < self.error_rate[429]:
+            return self._reply(429, {"error": "RESOURCE_EXHAUSTED"}, {"Retry-After": "0.05"})
+        if roll < self.error_rate[429] + self.error_rate[503]:
+            return self._reply(503, {"error": "UNAVAILABLE"})
+        texts = [request["content"]["parts"][0]["text"] for request in body["requests"]]
+        self._reply(200, {"embeddings": [{"values": expected_vector(text).tolist()} for text in texts]})
+
+    def _reply(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_fake_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeEmbeddingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+if __name__ == "__main__":
+    random.seed(0)
+    server, base_url = start_fake_server()
+    texts = [f"chunk {i}: " + "lorem ipsum dolor sit amet " * random.randint(5, 60) for i in range(2000)]
+    expected = np.stack([expected_vector(text) for text in texts])
+
+    print(f"{'concurrency':>11} | {'batches':>7} | {'requests':>8} | {'retries':>7} | {'seconds':>7} | {'texts/s':>7}")
+    for concurrency in [1, 4, 8]:
+        service = EmbeddingService(api_key="fake", base_url=base_url, max_concurrency=concurrency,
+                                   max_batch_size=100, max_batch_tokens=8000, backoff_base=0.05,
+                                   tokens_per_minute=100_000_000)
+        start = time.perf_counter()
+        embeddings = service.embed(texts)
+        elapsed = time.perf_counter() - start
+        service.close()
+
+        assert embeddings.dtype == np.float32 and embeddings.flags["C_CONTIGUOUS"]
+        assert np.array_equal(embeddings, expected), "embeddings out of order"
+        batches = len(list(service.iter_batches(texts)))
+        print(f"{concurrency:>11} | {batches:>7} | {service.counters['requests']:>8} | "
+              f"{service.counters['retries']:>7} | {elapsed:>7.2f} | {len(texts) / elapsed:>7.0f}")
+    server.shutdown()
+
+    # Output (1 vCPU; beyond 4 in flight the JSON encode/decode of the vectors is the bottleneck):
+    #concurrency | batches | requests | retries | seconds | texts/s
+    #          1 |      85 |      102 |      17 |    8.80 |     227
+    #          4 |      85 |      105 |      20 |    4.22 |     474
+    #          8 |      85 |       99 |      14 |    4.12 |     486
+    #With the default tokens_per_minute=1_000_000 the token bucket paces the same run to ~39 s.
@@ -0,0 +1,68 @@
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from embedding_store import EmbeddingStore
+
+#Memory per vector and recall@10 of float16 / int8 storage against exact float32 search.
+#Synthetic 768-dim embeddings: 200 random cluster centres plus noise, so neighbours are close
+#together like real text embeddings. Queries are perturbed corpus vectors.
+#Run from the repo root:  python benchmark_embedding_store.py [num_vectors]
+
+DIM = 768
+NUM_QUERIES = 200
+K = 10
+
+
+def synthetic_embeddings(rng, count, centres):
+    vectors = centres[rng.integers(0, len(centres), count)] + 0.6 * rng.standard_normal((count, DIM))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def recall_at_k(results, truth):
+    return np.mean([len(set(found.tolist()) & set(exact.tolist())) / K for (found, _), (exact, _) in zip(results, truth)])
+
+
+if __name__ == "__main__":
+    num_vectors = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = np.random.default_rng(0)
+    centres = rng.standard_normal((200, DIM)) / np.sqrt(DIM)
+    vectors = synthetic_embeddings(rng, num_vectors, centres)
+    queries = vectors[rng.choice(num_vectors, NUM_QUERIES, replace=False)] + 0.02 * rng.standard_normal((NUM_QUERIES, DIM))
+
+    python_list_bytes = sys.getsizeof(vectors[0].tolist()) + sum(sys.getsizeof(x) for x in vectors[0].tolist())
+    print(f"{num_vectors} vectors x {DIM} dims, Python list of floats: {python_list_bytes} bytes/vector\n")
+
+    exact = EmbeddingStore("float32", keep_full_precision=False)
+    exact.add(vectors)
+    truth = exact.search(queries, k=K)
+
+    print(f"{'storage':>16} | {'bytes/vector':>12} | {'corpus MB':>9} | {'recall@10':>9} | {'ms/query':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for dtype, rescore in [("float32", 0), ("float16", 0), ("int8", 0), ("int8", 4)]:
+            store = EmbeddingStore(dtype, keep_full_precision=bool(rescore))
+            store.add(vectors)
+            store.save(Path(tmp) / dtype)
+            store = EmbeddingStore.load(Path(tmp) / dtype)  # memory-mapped, as in production
+
+            start = time.perf_counter()
+            results = store.search(queries, k=K, rescore=rescore)
+            ms_per_query = (time.perf_counter() - start) * 1000 / NUM_QUERIES
+
+            label = f"{dtype} + rescore" if rescore else dtype
+            corpus_mb = store.bytes_per_vector() * num_vectors / 1e6
+            print(f"{label:>16} | {store.bytes_per_vector():>12} | {corpus_mb:>9.1f} | "
+                  f"{recall_at_k(results, truth):>9.3f} | {ms_per_query:>8.2f}")
+
+    # Output (1 vCPU, files memory-mapped from a warm page cache):
+    #100000 vectors x 768 dims, Python list of floats: 24632 bytes/vector
+    #
+    #         storage | bytes/vector | corpus MB | recall@10 | ms/query
+    #         float32 |         3072 |     307.2 |     1.000 |     3.01
+    #         float16 |         1536 |     153.6 |     0.999 |     4.03
+    #            int8 |          772 |      77.2 |     0.985 |     3.81
+    #  int8 + rescore |          772 |      77.2 |     1.000 |     3.57
+    #(int8 + rescore also keeps a 307 MB float32 file on disk, of which only ~40 rows/query are read)
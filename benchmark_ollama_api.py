@@ -0,0 +1,179 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import time
+
+import httpx
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Body
+from fastapi.responses import StreamingResponse
+from ollama import Client
+
+#Load test of ollama_api.py against a local fake Ollama server (no model needed).
+#The fake /api/chat streams TOKENS tokens, one every TOKEN_DELAY_S, and counts generations that were
+#aborted because the caller went away. Compared with the original blocking handler (sync
+#ollama.Client in FastAPI's thread pool) at increasing numbers of concurrent users.
+#Run from the repo root:  python benchmark_ollama_api.py
+
+TOKENS = 40
+TOKEN_DELAY_S = 0.05
+CONCURRENCY = [1, 8, 32, 64, 128]
+
+fake_ollama = FastAPI()
+fake_stats = {"started": 0, "finished": 0, "aborted": 0}
+
+
+@fake_ollama.post("/api/chat")
+async def fake_chat(body: dict = Body(...)):
+    fake_stats["started"] += 1
+
+    def part(content, done):
+        return {"model": body["model"], "created_at": "2025-01-01T00:00:00Z",
+                "message": {"role": "assistant", "content": content}, "done": done}
+
+    if not body.get("stream", True):
+        await asyncio.sleep(TOKENS * TOKEN_DELAY_S)
+        fake_stats["finished"] += 1
+        return part("tok " * TOKENS, True)
+
+    async def generate():
+        sent = 0
+        try:
+            for _ in range(TOKENS):
+                await asyncio.sleep(TOKEN_DELAY_S)
+                sent += 1
+                yield json.dumps(part("tok ", False)) + "\n"
+            yield json.dumps(part("", True)) + "\n"
+        finally:
+            fake_stats["finished" if sent == TOKENS else "aborted"] += 1
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+@fake_ollama.get("/stats")
+async def fake_stats_endpoint():
+    return fake_stats
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@fake_ollama.get("/api/ps")
+async def fake_ollama_ps():
+    return {"models": [{"name": "gemma3:1b", "model": "gemma3:1b"}]}
+
+def run_fake_ollama(port):
+    uvicorn.run(fake_ollama, host="127.0.0.1", port=port, log_level="error", limit_concurrency=10_000)
+
+
+def run_api(app_name, port, ollama_host):
+    os.environ["OLLAMA_HOST"] = ollama_host  # ollama_api reads it at import
+    app = blocking_app(ollama_host) if app_name == "blocking" else __import__(app_name).app
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="error", limit_concurrency=10_000)
+
+
+def serve_in_process(target, port, *args):
+    """Every server gets its own process, so none of them shares an event loop with the load generator"""
+    process = multiprocessing.Process(target=target, args=args, daemon=True)
+    process.start()
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port)).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def blocking_app(ollama_host):
+    """The original ollama_api.py handler"""
+    app = FastAPI()
+    client = Client(host=ollama_host)
+
+    @app.post("/chat")
+    def chat(message: str = Body(..., description= "Chat Message")):
+        response = client.chat(model="gemma3:1b", messages=[{"role": "user", "content": message}])
+        return response['message']['content']
+
+    return app
+
+
+async def one_request(http, url, sse):
+    start = time.perf_counter()
+    ttft = None
+    headers = {"Accept": "text/event-stream"} if sse else {}
+    async with http.stream("POST", url, json="hello", headers=headers) as response:
+        async for _ in response.aiter_raw():
+            ttft = ttft or time.perf_counter() - start
+    return ttft, time.perf_counter() - start
+
+
+async def load(url, concurrency, sse):
+    async with httpx.AsyncClient(timeout=120, limits=httpx.Limits(max_connections=None)) as http:
+        start = time.perf_counter()
+        results = await asyncio.gather(*[one_request(http, url, sse) for _ in range(concurrency)])
+        wall = time.perf_counter() - start
+    ttft, total = np.array(results).T
+    return np.median(ttft), np.percentile(total, 99), concurrency / wall
+
+
+async def disconnect_check(url, stats_url):
+    async with httpx.AsyncClient(timeout=30) as http:
+        before = (await http.get(stats_url)).json()["aborted"]
+        async with http.stream("POST", url, json="hello", headers={"Accept": "text/event-stream"}) as response:
+            received = 0
+            async for _ in response.aiter_lines():
+                received += 1
+                if received == 3:
+                    break  # user closes the tab
+        await asyncio.sleep(TOKEN_DELAY_S * 5)
+        return (await http.get(stats_url)).json()["aborted"] - before
+
+
+if __name__ == "__main__":
+    ollama_port, api_port, old_port = free_port(), free_port(), free_port()
+    ollama_host = f"http://127.0.0.1:{ollama_port}"
+    serve_in_process(run_fake_ollama, ollama_port, ollama_port)
+    serve_in_process(run_api, api_port, "ollama_api", api_port, ollama_host)
+    serve_in_process(run_api, old_port, "blocking", old_port, ollama_host)
+
+    print(f"fake Ollama: {TOKENS} tokens x {TOKEN_DELAY_S * 1000:.0f} ms = {TOKENS * TOKEN_DELAY_S:.2f} s per answer\n")
+    print(f"{'endpoint':>22} | {'users':>5} | {'TTFT p50 s':>10} | {'total p99 s':>11} | {'answers/s':>9}")
+    endpoints = [
+        ("blocking (original)", f"http://127.0.0.1:{old_port}/chat", False),
+        ("async, non-streaming", f"http://127.0.0.1:{api_port}/chat?stream=false", False),
+        ("async, SSE stream", f"http://127.0.0.1:{api_port}/chat", True),
+    ]
+    for label, url, sse in endpoints:
+        for concurrency in CONCURRENCY:
+            ttft, total_p99, rate = asyncio.run(load(url, concurrency, sse))
+            print(f"{label:>22} | {concurrency:>5} | {ttft:>10.2f} | {total_p99:>11.2f} | {rate:>9.1f}")
+
+    aborted = asyncio.run(disconnect_check(f"http://127.0.0.1:{api_port}/chat", f"http://127.0.0.1:{ollama_port}/stats"))
+    print(f"\nclient disconnect after 3 events -> upstream generations aborted: {aborted}")
+
+    # Output (1 vCPU shared by all four processes, which is what caps every row at 128 users).
+    # The blocking handler is limited by FastAPI's 40-thread pool, so from 64 users on requests queue
+    # for a thread; the async handlers are only limited by CPU. Streaming shows the first token
+    # after 0.1-0.9 s instead of after the whole 2 s answer:
+    #              endpoint | users | TTFT p50 s | total p99 s | answers/s
+    #   blocking (original) |     1 |       2.08 |        2.08 |       0.5
+    #   blocking (original) |    32 |       2.11 |        2.15 |      14.8
+    #   blocking (original) |    64 |       2.24 |        4.27 |      14.9
+    #   blocking (original) |   128 |       4.42 |        8.43 |      15.1
+    #  async, non-streaming |     1 |       2.04 |        2.04 |       0.5
+    #  async, non-streaming |    32 |       2.21 |        2.24 |      14.2
+    #  async, non-streaming |    64 |       2.25 |        2.35 |      27.1
+    #  async, non-streaming |   128 |       2.67 |        4.70 |      27.0
+    #     async, SSE stream |     1 |       0.08 |        2.08 |       0.5
+    #     async, SSE stream |    32 |       0.27 |        2.36 |      13.5
+    #     async, SSE stream |    64 |       0.50 |        2.72 |      23.4
+    #     async, SSE stream |   128 |       0.94 |        5.52 |      23.0
+    #
+    #client disconnect after 3 events -> upstream generations aborted: 1
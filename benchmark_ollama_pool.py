@@ -0,0 +1,190 @@
+import asyncio
+import json
+import time
+
+import httpx
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Body, Request
+from fastapi.responses import StreamingResponse
+
+from benchmark_ollama_api import free_port, serve_in_process
+from ollama_pool import OllamaPool
+
+#Routing test of ollama_pool.py against three local stub Ollama servers (no model needed).
+#Each stub runs PARALLEL generations at a time (more wait in line) and answers after its own delay;
+#a model that is not loaded yet costs LOAD_S first, like a real Ollama loading weights.
+#   fast    - 0.1 s per answer, model loaded
+#   slow    - 0.4 s per answer, model loaded
+#   cold    - 0.1 s per answer, model NOT loaded
+#REQUESTS chat calls from CONCURRENCY concurrent users go through: only the first host (what the
+#scripts did before), naive round robin, and the pool. Then the slow stub is killed mid-run and
+#restarted, to see the ejection, the failover and the active health check bring it back.
+#Each stub counts the distinct client sockets it saw, to show that connections are kept alive.
+#Run from the repo root:  python benchmark_ollama_pool.py
+
+MODEL = "gemma3:1b"
+PARALLEL = 4
+LOAD_S = 2.0
+REQUESTS = 240
+CONCURRENCY = 24
+STUBS = {"fast": (0.1, True), "slow": (0.4, True), "cold": (0.1, False)}
+
+
+def make_stub(delay_s, loaded):
+    stub = FastAPI()
+    state = {"models": {MODEL} if loaded else set(), "gpu": None, "loading": None, "sockets": set()}
+
+    async def generate(request, model):
+        state["sockets"].add(request.client)
+        state["gpu"] = state["gpu"] or asyncio.Semaphore(PARALLEL)
+        if model not in state["models"]:
+            state["loading"] = state["loading"] or asyncio.create_task(asyncio.sleep(LOAD_S))
+            await state["loading"]
+            state["models"].add(model)
+        async with state["gpu"]:
+            await asyncio.sleep(delay_s)
+
+    def part(model, content, done):
+        return {"model": model, "created_at": "2025-01-01T00:00:00Z",
+                "message": {"role": "assistant", "content": content}, "done": done}
+
+    @stub.post("/api/chat")
+    async def chat(request: Request, body: dict = Body(...)):
+        await generate(request, body["model"])
+        if not body.get("stream", True):
+            return part(body["model"], "tok", True)
+
+        async def lines():
+            yield json.dumps(part(body["model"], "tok", False)) + "\n"
+            yield json.dumps(part(body["model"], "", True)) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    @stub.get("/api/ps")
+    async def ps():
+        return {"models": [{"name": model, "model": model} for model in state["models"]]}
+
+    @stub.get("/stats")
+    async def stats():
+        return {"sockets": len(state["sockets"])}
+
+    return stub
+
+
+def run_stub(port, delay_s, loaded):
+    uvicorn.run(make_stub(delay_s, loaded), host="127.0.0.1", port=port, log_level="error", limit_concurrency=10_000)
+
+
+class RoundRobinPool(OllamaPool):
+    """Baseline: every backend in turn, no health or load awareness"""
+
+    def pick(self, model=None, exclude=()):
+        with self._lock:
+            self._next = getattr(self, "_next", -1) + 1
+            backend = self.backends[self._next % len(self.backends)]
+            backend.outstanding += 1
+            return backend
+
+
+async def one_request(pool, latencies, errors):
+    start = time.perf_counter()
+    try:
+        await pool.achat(MODEL, [{"role": "user", "content": "hello"}])
+        latencies.append(time.perf_counter() - start)
+    except Exception as e:
+        errors.append(type(e).__name__)
+
+
+async def load(pool, on_start=None):
+    latencies, errors = [], []
+    queue = asyncio.Queue()
+    for _ in range(REQUESTS):
+        queue.put_nowait(None)
+
+    async def user():
+        while not queue.empty():
+            queue.get_nowait()
+            await one_request(pool, latencies, errors)
+
+    start = time.perf_counter()
+    tasks = [asyncio.create_task(user()) for _ in range(CONCURRENCY)]
+    if on_start:
+        await on_start()
+    await asyncio.gather(*tasks)
+    return np.array(latencies), errors, time.perf_counter() - start
+
+
+def sockets(ports):
+    return sum(httpx.get(f"http://127.0.0.1:{port}/stats").json()["sockets"] for port in ports.values())
+
+
+def report(label, pool, latencies, errors, wall):
+    served = " ".join(f"{name}={backend.served:>3}" for name, backend in zip(STUBS, pool.backends))
+    print(f"{label:>12} | {np.percentile(latencies, 50):>7.2f} | {np.percentile(latencies, 99):>7.2f} | "
+          f"{REQUESTS / wall:>6.1f} | {len(errors):>6} | {served}")
+
+
+if __name__ == "__main__":
+    def start_stubs():
+        ports, processes = {}, {}
+        for name, (delay_s, loaded) in STUBS.items():
+            ports[name] = free_port()
+            processes[name] = serve_in_process(run_stub, ports[name], ports[name], delay_s, loaded)
+        return ports, processes
+
+    print(f"stubs: fast 0.1 s, slow 0.4 s, cold 0.1 s + {LOAD_S:.0f} s load; {PARALLEL} parallel each; "
+          f"{REQUESTS} requests from {CONCURRENCY} users\n")
+    print(f"{'routing':>12} | {'p50 s':>7} | {'p99 s':>7} | {'req/s':>6} | {'errors':>6} | answers per host")
+    for label, make_pool, hosts in [
+        ("single host", OllamaPool, ["fast"]),
+        ("round robin", RoundRobinPool, list(STUBS)),
+        ("pool", OllamaPool, list(STUBS)),
+    ]:
+        ports, processes = start_stubs()  # fresh stubs, so "cold" is cold again
+        pool = make_pool([f"http://127.0.0.1:{ports[name]}" for name in hosts])
+        pool.check_all()
+        latencies, errors, wall = asyncio.run(load(pool))
+        report(label, pool, latencies, errors, wall)
+        for process in processes.values():
+            process.terminate()
+
+    #failure: the slow host dies 0.5 s into the run, comes back after the run
+    ports, processes = start_stubs()
+    pool = OllamaPool([f"http://127.0.0.1:{port}" for port in ports.values()],
+                      eject_s=5, health_interval_s=0.5).start_health_checks()
+    time.sleep(0.2)
+
+    async def kill_slow():
+        await asyncio.sleep(0.5)
+        processes["slow"].kill()
+
+    latencies, errors, wall = asyncio.run(load(pool, kill_slow))
+    report("slow killed", pool, latencies, errors, wall)
+    slow = pool.backends[1]
+    print(f"\nslow host: {slow.failed} failed requests before it was ejected, healthy={slow.healthy}")
+    processes["slow"] = serve_in_process(run_stub, ports["slow"], ports["slow"], *STUBS["slow"])
+    start = time.perf_counter()
+    while not slow.healthy:
+        time.sleep(0.05)
+    print(f"restarted: back in the pool {time.perf_counter() - start:.2f} s later (active check every 0.5 s, "
+          f"ejection 5 s)")
+    pool.stop_health_checks()
+    print(f"connections opened by the pool: {sockets({k: v for k, v in ports.items() if k != 'slow'})} "
+          f"to fast + cold for {pool.backends[0].served + pool.backends[2].served} answers")
+
+    # Output (1 vCPU). Round robin sends a third of the traffic to the slow host and to the cold one
+    # while it loads; the pool keeps the slow host at its fair share, uses the cold host once the
+    # warm ones are busy (its 2 s load is the p99), and nearly doubles a single host's throughput.
+    # When the slow host dies, the requests in flight on it fail over, so users see no errors:
+    #stubs: fast 0.1 s, slow 0.4 s, cold 0.1 s + 2 s load; 4 parallel each; 240 requests from 24 users
+    #
+    #     routing |   p50 s |   p99 s |  req/s | errors | answers per host
+    # single host |    0.62 |    0.65 |   38.4 |      0 | fast=240
+    # round robin |    0.22 |    2.28 |   29.0 |      0 | fast= 80 slow= 80 cold= 80
+    #        pool |    0.21 |    2.14 |   58.9 |      0 | fast=140 slow= 40 cold= 60
+    # slow killed |    0.31 |    2.21 |   58.3 |      0 | fast=156 slow=  4 cold= 80
+    #
+    #slow host: 9 failed requests before it was ejected, healthy=False
+    #restarted: back in the pool 0.20 s later (active check every 0.5 s, ejection 5 s)
+    #connections opened by the pool: 26 to fast + cold for 236 answers
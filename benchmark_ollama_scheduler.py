@@ -0,0 +1,142 @@
+import asyncio
+import json
+import os
+import time
+
+import httpx
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Body
+from fastapi.responses import StreamingResponse
+
+from benchmark_ollama_api import free_port, serve_in_process
+
+#Burst test of the scheduler in ollama_api.py against a stub Ollama with fixed per-token latency.
+#The stub generates PARALLEL sequences at a time (like OLLAMA_NUM_PARALLEL), TOKENS tokens each,
+#one every TOKEN_DELAY_S; further requests wait inside the stub, first come first served.
+#A burst of BURST requests (10% high, 60% normal, 30% low priority) arrives at once, first with
+#admission control effectively off, then with max in-flight = PARALLEL and a bounded queue.
+#Run from the repo root:  python benchmark_ollama_scheduler.py
+
+PARALLEL = 4
+TOKENS = 10
+TOKEN_DELAY_S = 0.05
+BURST = 64
+LANES = ["high"] * 10 + ["normal"] * 60 + ["low"] * 30
+
+stub = FastAPI()
+gpu = None
+
+
+@stub.post("/api/chat")
+async def stub_chat(body: dict = Body(...)):
+    global gpu
+    gpu = gpu or asyncio.Semaphore(PARALLEL)
+
+    def part(content, done):
+        return json.dumps({"model": body["model"], "created_at": "2025-01-01T00:00:00Z",
+                           "message": {"role": "assistant", "content": content}, "done": done}) + "\n"
+
+    async def generate():
+        async with gpu:
+            for _ in range(TOKENS):
+                await asyncio.sleep(TOKEN_DELAY_S)
+                yield part("tok ", False)
+            yield part("", True)
+
+    if not body.get("stream", True):
+        async with gpu:
+            await asyncio.sleep(TOKENS * TOKEN_DELAY_S)
+        return json.loads(part("tok " * TOKENS, True))
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+@stub.get("/api/ps")
+async def stub_ps():
+    return {"models": [{"name": "gemma3:1b", "model": "gemma3:1b"}]}
+
+def run_stub(port):
+    uvicorn.run(stub, host="127.0.0.1", port=port, log_level="error", limit_concurrency=10_000)
+
+
+def run_api(port, ollama_host, max_in_flight, max_queue):
+    os.environ.update(OLLAMA_HOST=ollama_host, OLLAMA_MAX_IN_FLIGHT=str(max_in_flight), OLLAMA_MAX_QUEUE=str(max_queue))
+    import ollama_api
+    uvicorn.run(ollama_api.app, host="127.0.0.1", port=port, log_level="error", limit_concurrency=10_000)
+
+
+async def one_request(http, url, priority):
+    start = time.perf_counter()
+    # streamed, so the time to first token can be measured
+    async with http.stream("POST", f"{url}/chat", params={"priority": priority, "stream": "true"},
+                           json="hello") as response:
+        if response.status_code == 429:
+            return priority, None, time.perf_counter() - start
+        ttft = None
+        async for _ in response.aiter_raw():
+            ttft = ttft or time.perf_counter() - start
+    return priority, ttft, time.perf_counter() - start
+
+
+async def burst(url):
+    lanes = [LANES[i * len(LANES) // BURST] for i in range(BURST)]
+    np.random.default_rng(0).shuffle(lanes)
+    async with httpx.AsyncClient(timeout=300, limits=httpx.Limits(max_connections=None)) as http:
+        results = await asyncio.gather(*[one_request(http, url, lane) for lane in lanes])
+        metrics = (await http.get(f"{url}/metrics")).json()
+    return results, metrics
+
+
+def report(label, results):
+    for lane in ("high", "normal", "low"):
+        served = [(ttft, total) for priority, ttft, total in results if priority == lane and ttft is not None]
+        rejected = [total for priority, ttft, total in results if priority == lane and ttft is None]
+        reject_ms = f"{np.median(rejected) * 1000:.0f} ms" if rejected else "-"
+        if served:
+            ttft, total = np.array(served).T
+            latencies = f"{np.percentile(ttft, 50):>8.2f} | {np.percentile(ttft, 99):>8.2f} | {np.percentile(total, 99):>9.2f}"
+        else:
+            latencies = f"{'-':>8} | {'-':>8} | {'-':>9}"
+        print(f"{label:>18} | {lane:>6} | {len(served):>6} | {len(rejected):>8} | {reject_ms:>9} | {latencies}")
+
+
+if __name__ == "__main__":
+    stub_port = free_port()
+    serve_in_process(run_stub, stub_port, stub_port)
+    stub_host = f"http://127.0.0.1:{stub_port}"
+
+    print(f"stub: {PARALLEL} parallel sequences, {TOKENS} tokens x {TOKEN_DELAY_S * 1000:.0f} ms; burst of {BURST} requests\n")
+    print(f"{'admission':>18} | {'lane':>6} | {'served':>6} | {'rejected':>8} | {'429 after':>9} | "
+          f"{'TTFT p50':>8} | {'TTFT p99':>8} | {'total p99':>9}")
+    for label, max_in_flight, max_queue in [("none", 10_000, 10_000), (f"in-flight {PARALLEL}, q 24", PARALLEL, 24)]:
+        api_port = free_port()
+        api = serve_in_process(run_api, api_port, api_port, stub_host, max_in_flight, max_queue)
+        results, metrics = asyncio.run(burst(f"http://127.0.0.1:{api_port}"))
+        report(label, results)
+        api.terminate()
+
+    print("\n/metrics of the last run (bucket upper bounds, seconds):")
+    for name, histogram in metrics["latency"].items():
+        print(f"  {name:>18}: n={histogram['count']:>3}  p50<={histogram['p50']}  p99<={histogram['p99']}")
+
+    # Output (1 vCPU). Without admission control every request is accepted and waits inside Ollama,
+    # so every lane sees seconds to first token and ~8 s p99 regardless of priority. With the scheduler,
+    # high priority requests go first (displacing queued low ones), and the overflow gets its 429 in
+    # well under 0.1 s instead of waiting seconds:
+    #stub: 4 parallel sequences, 10 tokens x 50 ms; burst of 64 requests
+    #
+    #         admission |   lane | served | rejected | 429 after | TTFT p50 | TTFT p99 | total p99
+    #              none |   high |      7 |        0 |         - |     2.76 |     7.59 |      8.05
+    #              none | normal |     38 |        0 |         - |     3.77 |     7.63 |      8.09
+    #              none |    low |     19 |        0 |         - |     4.78 |     7.81 |      8.27
+    # in-flight 4, q 24 |   high |      7 |        0 |         - |     0.65 |     1.17 |      1.63
+    # in-flight 4, q 24 | normal |     21 |       17 |     66 ms |     2.21 |     3.25 |      3.71
+    # in-flight 4, q 24 |    low |      0 |       19 |     66 ms |        - |        - |         -
+    #
+    #/metrics of the last run (bucket upper bounds, seconds):
+    #     queue_wait.high: n=  7  p50<=1.0  p99<=2.5
+    #   queue_wait.normal: n= 21  p50<=2.5  p99<=5.0
+    #          total.high: n=  7  p50<=2.5  p99<=2.5
+    #        total.normal: n= 21  p50<=5.0  p99<=5.0
+    #           ttft.high: n=  7  p50<=1.0  p99<=2.5
+    #         ttft.normal: n= 21  p50<=2.5  p99<=5.0
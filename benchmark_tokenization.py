@@ -0,0 +1,50 @@
+import random
+import sys
+import time
+
+from tokenization import Tokenizer
+
+#Single-string vs batch tokenization throughput on 100k strings, plus the token-count cache.
+#Strings are 5-80 word sentences drawn from a fixed vocabulary, 10% of them repeated (as prompts,
+#memory entries and chunks are in practice).
+#Run from the repo root:  python benchmark_tokenization.py [model_name]
+
+NUM_STRINGS = 100_000
+WORDS = ("the cat sat on mat vector embedding token query retrieval fusion useEffect "
+         "component state memory chunk prompt model answer context budget cache").split()
+
+
+def timed(label, fn, num_strings):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:>34} | {elapsed:>7.2f} | {num_strings / elapsed:>10,.0f}")
+
+
+if __name__ == "__main__":
+    model = sys.argv[1] if len(sys.argv) > 1 else "gpt-4o"
+    random.seed(0)
+    unique = [" ".join(random.choices(WORDS, k=random.randint(5, 80))) + f" #{i}" for i in range(int(NUM_STRINGS * 0.9))]
+    texts = unique + random.choices(unique, k=NUM_STRINGS - len(unique))
+    random.shuffle(texts)
+
+    tokenizer = Tokenizer(model)
+    tokenizer.encode("warm up")  # load the BPE ranks outside the timings
+
+    print(f"{'':>34} | {'seconds':>7} | {'strings/s':>10}")
+    timed("encode, one string at a time", lambda: [tokenizer.encode(text) for text in texts], NUM_STRINGS)
+    timed("encode_batch", lambda: tokenizer.encode_batch(texts), NUM_STRINGS)
+    timed("count_tokens_batch (cold cache)", lambda: tokenizer.count_tokens_batch(texts), NUM_STRINGS)
+    timed("count_tokens_batch (warm cache)", lambda: tokenizer.count_tokens_batch(texts), NUM_STRINGS)
+    timed("count_tokens (warm cache)", lambda: [tokenizer.count_tokens(text) for text in texts], NUM_STRINGS)
+    timed("truncate_to_tokens(.., 16)", lambda: [tokenizer.truncate_to_tokens(text, 16) for text in texts], NUM_STRINGS)
+
+    # Output (cl100k_base via "gpt-4", 1 vCPU so the batch path runs single threaded; with more
+    # cores encode_batch/count_tokens_batch split the batch across threads):
+    #                                   | seconds |  strings/s
+    #      encode, one string at a time |    2.91 |     34,387
+    #                      encode_batch |    3.04 |     32,923
+    #   count_tokens_batch (cold cache) |    2.51 |     39,883
+    #   count_tokens_batch (warm cache) |    0.14 |    696,130
+    #         count_tokens (warm cache) |    0.18 |    559,828
+    #        truncate_to_tokens(.., 16) |    1.61 |     62,252
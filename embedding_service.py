@@ -0,0 +1,208 @@
+import asyncio
+import os
+import random
+import threading
+import time
+
+import httpx
+import numpy as np
+
+from tokenization import Tokenizer
+
+#Batched, rate-limit-aware embedding service on top of the Gemini REST batchEmbedContents endpoint.
+#VectorEmbedding.embed_content sends one text per API call; this service
+#   - groups an iterable of texts into batches bounded by count AND by (estimated) tokens
+#   - sends several batches concurrently, paced by token buckets for requests/min and tokens/min
+#   - retries 429 and 5xx responses with jittered exponential backoff (honouring Retry-After)
+#   - returns one contiguous float32 NumPy array (len(texts) x dim) instead of lists of Python floats
+#The requests run on the service's own event loop thread, so the rate limits and the HTTP connection
+#pool are shared by every embed()/aembed() call, from any thread or event loop. close() when done.
+
+GENAI_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Refills `rate` units per second up to `capacity`; acquire() waits until enough units are available"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self, amount=1):
+        amount = min(amount, self.capacity)
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+class EmbeddingService:
+    def __init__(self, api_key=None, model="embedding-001", task_type="RETRIEVAL_DOCUMENT",
+                 base_url=GENAI_BASE_URL, max_batch_size=100, max_batch_tokens=20_000,
+                 max_concurrency=4, requests_per_minute=1500, tokens_per_minute=1_000_000,
+                 max_retries=5, backoff_base=0.5, backoff_cap=20.0, timeout=30.0, tokenizer_model="gpt-4o"):
+        self.api_key = api_key or os.getenv("GENAI_API_KEY")
+        self.model = model
+        self.task_type = task_type
+        self.base_url = base_url.rstrip("/")
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.timeout = timeout
+        self.tokenizer = Tokenizer(tokenizer_model)
+        self.counters = {"requests": 0, "retries": 0, "texts": 0}
+        # created once: asyncio locks and an AsyncClient are bound to the loop they are first used on
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        self.request_bucket = TokenBucket(requests_per_minute / 60, capacity=max_concurrency)
+        self.token_bucket = TokenBucket(tokens_per_minute / 60, capacity=max(max_batch_tokens, tokens_per_minute / 60))
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.client = httpx.AsyncClient(timeout=timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Close the HTTP connections and stop the service's event loop"""
+        if self._loop.is_closed():
+            return
+        asyncio.run_coroutine_threadsafe(self.client.aclose(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    # ---- batching ----
+
+    def count_tokens(self, text):
+        return self.tokenizer.count_tokens(text)
+
+    def iter_batches(self, texts):
+        """Yield (start index, texts, token count) batches bounded by max_batch_size and max_batch_tokens"""
+        batch, batch_tokens, start = [], 0, 0
+        for index, text in enumerate(texts):
+            tokens = self.count_tokens(text)
+            if batch and (len(batch) == self.max_batch_size or batch_tokens + tokens > self.max_batch_tokens):
+                yield start, batch, batch_tokens
+                batch, batch_tokens, start = [], 0, index
+            batch.append(text)
+            batch_tokens += tokens
+        if batch:
+            yield start, batch, batch_tokens
+
+    # ---- transport ----
+
+    def _payload(self, texts):
+        model = f"models/{self.model}"
+        return {"requests": [
+            {"model": model, "content": {"parts": [{"text": text}]}, "taskType": self.task_type}
+            for text in texts
+        ]}
+
+    def _backoff(self, attempt, response=None):
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        # "full jitter": spreads the retries of concurrent batches instead of having them collide again
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    async def _post_batch(self, client, texts):
+        url = f"{self.base_url}/models/{self.model}:batchEmbedContents"
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                self.counters["requests"] += 1
+                response = await client.post(url, json=self._payload(texts), headers={"x-goog-api-key": self.api_key or ""})
+                if response.status_code not in RETRY_STATUS:
+                    response.raise_for_status()
+                    embeddings = response.json()["embeddings"]
+                    return np.array([embedding["values"] for embedding in embeddings], dtype=np.float32)
+            except httpx.TransportError:
+                pass
+            if attempt == self.max_retries:
+                break
+            self.counters["retries"] += 1
+            await asyncio.sleep(self._backoff(attempt, response))
+        status = response.status_code if response is not None else "connection error"
+        raise RuntimeError(f"Embedding batch of {len(texts)} texts failed after {self.max_retries + 1} attempts ({status})")
+
+    # ---- public API ----
+
+    async def _embed(self, texts):
+        """Runs on the service's loop"""
+        batches = list(self.iter_batches(texts))
+
+        async def run(texts, tokens):
+            async with self.semaphore:
+                await self.request_bucket.acquire()
+                await self.token_bucket.acquire(tokens)
+                return await self._post_batch(self.client, texts)
+
+        results = await asyncio.gather(*[run(batch, tokens) for _, batch, tokens in batches])
+
+        total = sum(len(batch) for _, batch, _ in batches)
+        self.counters["texts"] += total
+        if not results:
+            return np.zeros((0, 0), dtype=np.float32)
+        embeddings = np.empty((total, results[0].shape[1]), dtype=np.float32)
+        for (start, batch, _), vectors in zip(batches, results):
+            embeddings[start:start + len(batch)] = vectors
+        return embeddings
+
+    async def aembed(self, texts):
+        """Embed an iterable of texts, returns a (len(texts), dim) float32 array in input order"""
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._embed(texts), self._loop))
+
+    def embed(self, texts):
+        """Blocking aembed(), for code without an event loop"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run_coroutine_threadsafe(self._embed(texts), self._loop).result()
+        raise RuntimeError("embed() would block the running event loop, use `await service.aembed(texts)`")
+
+    # LangChain Embeddings-style methods, so the service can stand in for GoogleGenerativeAIEmbeddings
+
+    def embed_documents(self, texts):
+        return self.embed(texts).tolist()
+
+    def embed_query(self, text):
+        return self.embed([text])[0].tolist()
+
+
+#Example usage:
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    service = EmbeddingService()
+    texts = [f"The cat sat on mat number {i}." for i in range(250)]
+
+    embeddings = service.embed(texts)
+    service.close()
+    print(f"Embeddings: {embeddings.shape} {embeddings.dtype}, {embeddings.nbytes / 1024:.0f} KB")
+    print(f"Requests: {service.counters['requests']}, retries: {service.counters['retries']}")
+
+    # Output:
+    #Embeddings: (250, 768) float32, 750 KB
+    #Requests: 3, retries: 0
@@ -0,0 +1,177 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+#Compact on-disk store for embedding vectors (e.g. the output of EmbeddingService / VectorEmbedding).
+#A 768-dim embedding as a Python list of floats costs ~25 KB; as float32 it is 3 KB, as float16 1.5 KB
+#and scalar-quantized to int8 (one float32 scale per vector) 772 bytes.
+#   dtype="float16"  vectors are stored as half floats, scored in float32 blocks
+#   dtype="int8"     v ~= scale * q with q = round(v / max|v| * 127), score = scale * (q . query)
+#Searching scores the compact matrix block by block, so the float32 copy of the whole corpus never
+#exists in memory. With keep_full_precision=True the float32 vectors are also kept, in RAM until saved,
+#then in a separate .f32.npy that is only touched (memory-mapped) to rescore the top candidates of a
+#query; it is off by default since that copy is 4x the size of the int8 codes.
+#Persisted as <path>.q.npy, <path>.scale.npy, <path>.f32.npy (optional) + <path>.json; loads memory-mapped.
+
+DTYPES = ("float32", "float16", "int8")
+BLOCK_ROWS = 32_768
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def quantize_int8(vectors):
+    """Per-vector symmetric scalar quantization, returns (int8 codes, float32 scales)"""
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales = np.maximum(scales, 1e-12).astype(np.float32)
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales
+
+
+def _merge_top_k(best_indices, best_scores, indices, scores, k):
+    indices = np.concatenate([best_indices, indices])
+    scores = np.concatenate([best_scores, scores])
+    if scores.shape[0] > k:
+        keep = np.argpartition(-scores, k - 1)[:k]
+        indices, scores = indices[keep], scores[keep]
+    return indices, scores
+
+
+class EmbeddingStore:
+    def __init__(self, dtype="int8", keep_full_precision=False):
+        if dtype not in DTYPES:
+            raise ValueError(f"dtype must be one of {DTYPES}, got {dtype!r}")
+        self.dtype = dtype
+        self.keep_full_precision = keep_full_precision
+        self.codes = None
+        self.scales = None
+        self.full = None
+        self.ids = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def dim(self):
+        return 0 if self.codes is None else self.codes.shape[1]
+
+    def bytes_per_vector(self):
+        """Bytes held by the compact (searched) representation, excluding the optional float32 copy"""
+        if self.codes is None:
+            return 0
+        return self.dim * self.codes.itemsize + (4 if self.dtype == "int8" else 0)
+
+    # ---- ingest ----
+
+    def add(self, vectors, ids=None):
+        vectors = _normalize(vectors)
+        ids = ids or [str(len(self.ids) + i) for i in range(len(vectors))]
+        if self.dtype == "int8":
+            codes, scales = quantize_int8(vectors)
+        else:
+            codes, scales = vectors.astype(self.dtype), np.ones(len(vectors), dtype=np.float32)
+
+        if self.codes is None:
+            self.codes, self.scales = codes, scales
+            # a float32 store is already full precision, no second copy needed
+            self.full = vectors if self.keep_full_precision and self.dtype != "float32" else None
+        else:
+            # memory-mapped arrays are read only, concatenating copies them into memory
+            self.codes = np.concatenate([self.codes, codes])
+            self.scales = np.concatenate([self.scales, scales])
+            if self.full is not None:
+                self.full = np.concatenate([self.full, vectors])
+        self.ids.extend(ids)
+        return ids
+
+    # ---- search ----
+
+    def _approximate_top_k(self, queries, k):
+        """Top-k over the compact matrix, scored BLOCK_ROWS at a time"""
+        best = [(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)) for _ in queries]
+        for start in range(0, len(self), BLOCK_ROWS):
+            block = np.asarray(self.codes[start:start + BLOCK_ROWS], dtype=np.float32)
+            scores = block @ queries.T
+            if self.dtype == "int8":
+                scores *= self.scales[start:start + BLOCK_ROWS, None]
+            for i, column in enumerate(scores.T):
+                take = min(k, column.shape[0])
+                top = np.argpartition(-column, take - 1)[:take]
+                best[i] = _merge_top_k(*best[i], top + start, column[top], k)
+        return best
+
+    def search(self, query_vectors, k=10, rescore=4):
+        """Top-k (indices, scores) per query, best first.
+        rescore=N rescores the best k*N approximate candidates against the float32 vectors (0 disables)"""
+        queries = _normalize(query_vectors)
+        if len(self) == 0:
+            return [(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)) for _ in queries]
+
+        use_full = bool(rescore) and self.full is not None and self.dtype != "float32"
+        candidates = self._approximate_top_k(queries, k * rescore if use_full else k)
+
+        results = []
+        for query, (indices, scores) in zip(queries, candidates):
+            if use_full:
+                indices = np.sort(indices)  # sorted reads are sequential on the memory-mapped file
+                scores = np.asarray(self.full[indices]) @ query
+            order = np.argsort(-scores, kind="stable")[:k]
+            results.append((indices[order], scores[order]))
+        return results
+
+    # ---- persistence ----
+
+    @staticmethod
+    def _save_array(target, array):
+        # written aside and swapped in: `array` may be a memory map of `target` itself (see load)
+        tmp = target.with_name(target.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp, target)
+
+    def save(self, path):
+        path = Path(path)
+        self._save_array(path.with_suffix(".q.npy"), self.codes)
+        self._save_array(path.with_suffix(".scale.npy"), self.scales)
+        if self.full is not None:
+            self._save_array(path.with_suffix(".f32.npy"), np.asarray(self.full, dtype=np.float32))
+        with open(path.with_suffix(".json"), "w") as f:
+            json.dump({"dtype": self.dtype, "ids": self.ids}, f)
+
+    @classmethod
+    def load(cls, path):
+        path = Path(path)
+        with open(path.with_suffix(".json"), "r") as f:
+            meta = json.load(f)
+        full_path = path.with_suffix(".f32.npy")
+        store = cls(meta["dtype"], keep_full_precision=full_path.exists())
+        store.codes = np.load(path.with_suffix(".q.npy"), mmap_mode="r")
+        store.scales = np.load(path.with_suffix(".scale.npy"))
+        store.full = np.load(full_path, mmap_mode="r") if full_path.exists() else None
+        store.ids = meta["ids"]
+        return store
+
+
+#Example usage:
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    from embedding_service import EmbeddingService
+
+    load_dotenv()
+    texts = ["The cat sat on the mat.", "Dogs chase cats.", "Stock prices fell sharply today."]
+    store = EmbeddingStore(dtype="int8", keep_full_precision=True)
+    with EmbeddingService() as service:
+        store.add(service.embed(texts), ids=texts)
+    with EmbeddingService(task_type="RETRIEVAL_QUERY") as service:
+        query = service.embed(["Where did the cat sit?"])
+    indices, scores = store.search(query, k=2)[0]
+    for index, score in zip(indices, scores):
+        print(f"{score:.3f}  {store.ids[index]}")
+    print(f"{store.bytes_per_vector()} bytes per vector")
@@ -3,11 +3,17 @@ from dotenv import load_dotenv  # For loading environment variables
 from typing import Literal
 from pydantic import BaseModel, Field  # For defining data models
 import os
+import sys
+from pathlib import Path
 
 from ollama import Client  # Import the ollama client
 
 from langfuse.openai import OpenAI
 
+# ollama_pool.py lives at the repo root
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from ollama_pool import OllamaPool
+
 
 # Load environment variables from .env file
 load_dotenv()
@@ -29,11 +35,28 @@ OLLAMA_URL = "http://localhost:11434"
 # This allows you to call the LLM for chat in the same way you were calling OpenAI
 #ollama_chat_client = Client(host=OLLAMA_URL)
 
-# Use Langfuse's OpenAI wrapper pointed at Ollama
-client = OpenAI(
-    base_url=OLLAMA_URL_V1,
-    api_key="ollama",  # any placeholder
-)
+# Several Ollama hosts can be given as OLLAMA_HOSTS="http://a:11434,http://b:11434"; the pool picks
+# one per call (least busy, model already loaded, healthy) and fails over to the next one
+pool = OllamaPool(os.getenv("OLLAMA_HOSTS", OLLAMA_URL)).start_health_checks()
+
+# Use Langfuse's OpenAI wrapper pointed at Ollama, one client (and connection pool) per host
+clients = {
+    backend.host: OpenAI(
+        base_url=f"{backend.host}/v1",
+        api_key="ollama",  # any placeholder
+        max_retries=0,  # retrying on another host is the pool's job
+    )
+    for backend in pool.backends
+}
+
+
+def parse_completion(messages, response_format, model="mistral:latest"):
+    """client.beta.chat.completions.parse on the host picked by the pool"""
+    return pool.call(model, lambda backend: clients[backend.host].beta.chat.completions.parse(
+        model=model,
+        messages=messages,
+        response_format=response_format
+    ))
 
 
 class State(TypedDict):
@@ -79,11 +102,7 @@ def detect_query(state: State) -> State:
 
     # Call the Ollama LLM for chat completion using the ollama_chat_client
     # The model "gemma3:latest" is specified here, aligning with your Ollama setup.
-    response = client.beta.chat.completions.parse(
-        model="mistral:latest",
-        messages=messages,
-        response_format=DetectQueryResponse
-    )
+    response = parse_completion(messages, DetectQueryResponse)
 
     print("🕵️ [detect_query] Response from LLM:", response.choices[0].message.content)
 
@@ -137,11 +156,7 @@ def solve_coding_question(state: State) -> State:
 
     # Call the Ollama LLM for chat completion using the ollama_chat_client
     # The model "gemma3:latest" is specified here, aligning with your Ollama setup.
-    response = client.beta.chat.completions.parse(
-        model="mistral:latest",
-        messages=messages,
-        response_format=CodingQuestionResponse
-    )
+    response = parse_completion(messages, CodingQuestionResponse)
 
     print("💻 [solve_coding_question] Response from LLM:", response.choices[0].message.content)
 
@@ -172,11 +187,7 @@ def solve_simple_question(state: State) -> State:
 
     # Call the Ollama LLM for chat completion using the ollama_chat_client
     # The model "gemma3:latest" is specified here, aligning with your Ollama setup.
-    response = client.beta.chat.completions.parse(
-        model="mistral:latest",
-        messages=messages,
-        response_format=GeneralQuestionResponse
-    )
+    response = parse_completion(messages, GeneralQuestionResponse)
 
     print("🤖 [solve_simple_question] Response from LLM:", response.choices[0].message.content)
 
@@ -0,0 +1,104 @@
+import contextlib
+import queue
+import threading
+
+#Runs SimpleLLMMemory's fact extraction on a worker thread, off the reply's critical path.
+#submit() only enqueues the user's message and never blocks: when the bounded queue is full the
+#oldest pending message is dropped (counted, and handed to `on_drop` if given). The worker collects messages until none has
+#arrived for `settle_s` (or `max_batch` are waiting) and extracts from all of them in one LLM call,
+#so a user sending several quick messages costs one call instead of one per turn.
+#While a reply is being generated (inside hold()) no new extraction is started, so on a single-slot
+#Ollama (OLLAMA_NUM_PARALLEL=1) extraction fills the pauses instead of queueing in front of replies.
+#flush() waits until every message submitted so far has been applied (tests, /stats, shutdown);
+#close() flushes and stops the worker.
+
+_STOP = object()
+
+
+class BackgroundExtractor:
+    def __init__(self, extract, max_queue=64, max_batch=8, settle_s=0.5, on_drop=None):
+        self.extract = extract  # called on the worker thread with a list of messages
+        self.on_drop = on_drop  # called with each message dropped from a full queue
+        self.pending = queue.Queue(maxsize=max_queue)
+        self.max_batch = max_batch
+        self.settle_s = settle_s
+        self.holds = 0
+        self.submitted = 0
+        self.finished = 0
+        self.dropped = 0
+        self.calls = 0
+        self.progress = threading.Condition()
+        self.worker = threading.Thread(target=self._run, name="fact-extractor", daemon=True)
+        self.worker.start()
+
+    def submit(self, message):
+        with self.progress:
+            self.submitted += 1
+        while True:
+            try:
+                self.pending.put_nowait(message)
+                return
+            except queue.Full:
+                try:
+                    dropped = self.pending.get_nowait()  # make room: the oldest message is the least relevant
+                except queue.Empty:
+                    continue  # the worker emptied it meanwhile
+                if self.on_drop:
+                    self.on_drop(dropped)
+                self._finish(1, dropped=True)
+
+    def _finish(self, count, dropped=False):
+        with self.progress:
+            self.finished += count
+            self.dropped += count if dropped else 0
+            self.progress.notify_all()
+
+    def _run(self):
+        while True:
+            batch = [self.pending.get()]
+            while len(batch) < self.max_batch and batch[-1] is not _STOP:
+                try:
+                    batch.append(self.pending.get(timeout=self.settle_s) if self.settle_s else self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            stop = batch[-1] is _STOP
+            messages = batch[:-1] if stop else batch
+            if messages:
+                with self.progress:
+                    self.progress.wait_for(lambda: not self.holds)
+                try:
+                    self.calls += 1
+                    self.extract(messages)
+                except Exception as e:
+                    print(f"❌ Background extraction error: {e}")
+                finally:
+                    self._finish(len(messages))
+            if stop:
+                return
+
+    @contextlib.contextmanager
+    def hold(self):
+        """with extractor.hold(): <generate the reply> -- no extraction starts meanwhile"""
+        with self.progress:
+            self.holds += 1
+        try:
+            yield
+        finally:
+            with self.progress:
+                self.holds -= 1
+                self.progress.notify_all()
+
+    def flush(self, timeout=None):
+        """Wait until everything submitted so far is extracted; False if `timeout` ran out first"""
+        with self.progress:
+            target = self.submitted
+            return self.progress.wait_for(lambda: self.finished >= target, timeout)
+
+    def close(self, timeout=None):
+        self.flush(timeout)
+        if self.worker.is_alive():
+            self.pending.put(_STOP)
+            self.worker.join(timeout)
+
+    def stats(self):
+        return {"submitted": self.submitted, "finished": self.finished, "dropped": self.dropped, "llm_calls": self.calls}
@@ -0,0 +1,98 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from mem import SimpleLLMMemory
+
+#Per-turn latency of SimpleLLMMemory.chat with fact extraction before the reply (old behaviour)
+#against background extraction, using a stub LLM with fixed delays instead of Ollama:
+#EXTRACT_S per extraction call, REPLY_S per answer, at most `parallel` calls at a time (Ollama's
+#OLLAMA_NUM_PARALLEL; with 1, an extraction that has started still delays the next reply).
+#A scripted user sends TURNS messages, think_s apart (typing quickly / reading the answer first);
+#at the end flush() waits for extraction.
+#Run from the memory folder:  python benchmark_background_extraction.py
+
+TURNS = 12
+THINK_S = (0.1, 2.0)
+EXTRACT_S = 0.8
+REPLY_S = 0.5
+
+
+class StubLLM:
+    """Stands in for the ollama client: fixed delay, one fact per user message"""
+
+    def __init__(self, parallel):
+        self.slots = threading.Semaphore(parallel)
+        self.extraction_calls = 0
+
+    def chat(self, model, messages, **kwargs):
+        prompt = messages[-1]["content"]
+        with self.slots:
+            if prompt.startswith("You are a fact extractor"):
+                self.extraction_calls += 1
+                time.sleep(EXTRACT_S)
+                conversation = prompt.split('User message: "', 1)[1].split('"\n', 1)[0]
+                facts = [f"User said {line}" for line in conversation.splitlines() if line.strip()]
+                return {"message": {"content": json.dumps({"facts": facts, "relationships": []})}}
+            time.sleep(REPLY_S)
+            return {"message": {"content": "ok"}}
+
+
+def run(background, parallel, think_s):
+    with tempfile.TemporaryDirectory() as folder:
+        memory = SimpleLLMMemory(memory_file=os.path.join(folder, "memory.json"), background_extraction=background)
+        memory.client = llm = StubLLM(parallel)
+        latencies = []
+        for turn in range(TURNS):
+            start = time.perf_counter()
+            memory.chat(f"my hobby number {turn} is collecting item {turn}")
+            latencies.append(time.perf_counter() - start)
+            time.sleep(think_s)
+        start = time.perf_counter()
+        memory.flush()
+        flush_s = time.perf_counter() - start
+        learned = len(memory.persistent_memory["facts"])
+        memory.close()
+    return np.array(latencies), llm.extraction_calls, learned, flush_s
+
+
+if __name__ == "__main__":
+    import builtins
+    quiet_print = builtins.print
+    results = []
+    builtins.print = lambda *args, **kwargs: None  # mem.py prints every learned fact
+    try:
+        for think_s in THINK_S:
+            for parallel in (1, 4):
+                for background in (False, True):
+                    results.append((think_s, parallel, background, *run(background, parallel, think_s)))
+    finally:
+        builtins.print = quiet_print
+
+    print(f"stub LLM: extraction {EXTRACT_S} s, reply {REPLY_S} s; {TURNS} turns\n")
+    print(f"{'think s':>7} | {'parallel':>8} | {'extraction':>10} | {'turn p50 s':>10} | {'turn max s':>10} | "
+          f"{'LLM extractions':>15} | {'facts':>5} | {'flush s':>7}")
+    for think_s, parallel, background, latencies, calls, learned, flush_s in results:
+        print(f"{think_s:>7} | {parallel:>8} | {'background' if background else 'inline':>10} | {np.median(latencies):>10.2f} | "
+              f"{np.max(latencies):>10.2f} | {calls:>15} | {learned:>5} | {flush_s:>7.2f}")
+
+    # Output (1 vCPU). With extraction in the background a turn costs just the reply (0.5 s instead of
+    # 1.3 s) whenever the LLM has a free slot for it: always with OLLAMA_NUM_PARALLEL=4, and with a single
+    # slot as soon as the user pauses long enough for extraction to fit in between. Only a user firing
+    # messages back to back at a single-slot Ollama still waits for a running extraction (1.2 s).
+    # Quick messages are coalesced (12 extractions -> 6 calls); nothing is lost, flush() drains the rest:
+    # stub LLM: extraction 0.8 s, reply 0.5 s; 12 turns
+    #
+    # think s | parallel | extraction | turn p50 s | turn max s | LLM extractions | facts | flush s
+    #     0.1 |        1 |     inline |       1.30 |       1.30 |              12 |    12 |    0.00
+    #     0.1 |        1 | background |       1.20 |       1.20 |              12 |    12 |    0.70
+    #     0.1 |        4 |     inline |       1.30 |       1.30 |              12 |    12 |    0.00
+    #     0.1 |        4 | background |       0.50 |       0.50 |               6 |    12 |    1.40
+    #     2.0 |        1 |     inline |       1.30 |       1.30 |              12 |    12 |    0.00
+    #     2.0 |        1 | background |       0.50 |       0.50 |              12 |    12 |    0.00
+    #     2.0 |        4 |     inline |       1.30 |       1.30 |              12 |    12 |    0.00
+    #     2.0 |        4 | background |       0.50 |       0.50 |              12 |    12 |    0.00
@@ -0,0 +1,59 @@
+import time
+
+import numpy as np
+
+from fact_index import FactIndex
+
+#Cost of the dedup check and of a name lookup as memory grows: the plain list SimpleLLMMemory used
+#(`fact not in facts`, a scan over every stored fact) against FactIndex.
+#Per size: CHECKS candidate facts, half of them already stored; name lookup = every fact mentioning
+#one person (1 in 800 facts). Also the startup cost: the dedup set is built when memory.json is
+#loaded, the name index on the first lookup.
+#Run from the memory folder:  python benchmark_fact_index.py
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+CHECKS = 200
+NAMES = ["John", "Ziya", "Shaim", "Maria", "Omar", "Lena", "Ravi", "Chen"]
+
+
+def make_facts(n):
+    """Mostly facts about the user; every 100th one is about someone else"""
+    rng = np.random.default_rng(0)
+    return [f"{NAMES[rng.integers(len(NAMES))] if i % 100 == 0 else 'User'} likes item {i} and visits place {i * 7 % 9973}"
+            for i in range(n)]
+
+
+def per_call_us(call, args):
+    start = time.perf_counter()
+    for arg in args:
+        call(arg)
+    return (time.perf_counter() - start) / len(args) * 1e6
+
+
+if __name__ == "__main__":
+    print(f"{'facts':>9} | {'list in µs':>10} | {'index in µs':>11} | {'list about µs':>13} | "
+          f"{'index about µs':>14} | {'load s':>6} | {'names s':>7}")
+    for n in SIZES:
+        facts = make_facts(n)
+        candidates = facts[::max(1, n // (CHECKS // 2))][:CHECKS // 2] + [f"new fact {i}" for i in range(CHECKS // 2)]
+        start = time.perf_counter()
+        index = FactIndex(facts)
+        load_s = time.perf_counter() - start
+        start = time.perf_counter()
+        index.about("nobody")
+        names_s = time.perf_counter() - start
+
+        list_in = per_call_us(lambda fact: fact in facts, candidates)
+        index_in = per_call_us(lambda fact: fact in index, candidates)
+        list_about = per_call_us(lambda name: [fact for fact in facts if name in fact], NAMES)
+        index_about = per_call_us(index.about, NAMES)
+        print(f"{n:>9} | {list_in:>10.1f} | {index_in:>11.2f} | {list_about:>13.0f} | {index_about:>14.1f} | {load_s:>6.2f} | {names_s:>7.2f}")
+
+    # Output (1 vCPU). The list check grows linearly (12 ms per candidate at 1M facts, so learning a
+    # batch of facts was quadratic); the set lookup stays ~1 µs. Name lookups only touch the matching
+    # facts. The name index (~4 s at 1M facts) is paid once, on the first /about:
+    #    facts | list in µs | index in µs | list about µs | index about µs | load s | names s
+    #     1000 |       14.4 |        0.85 |            42 |            3.2 |   0.00 |    0.00
+    #    10000 |      133.0 |        1.71 |           644 |            7.6 |   0.01 |    0.04
+    #   100000 |      988.6 |        1.19 |          5849 |           43.8 |   0.10 |    0.38
+    #  1000000 |    12083.5 |        1.35 |         41771 |          243.8 |   1.26 |    4.15
@@ -0,0 +1,107 @@
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from memory_log import MemoryLog, empty_memory
+
+#Write latency of one new fact: the old save_memory (rewrite all of memory.json with indent=2)
+#against MemoryLog appends under each fsync policy, with 10, 10k and 1M facts already stored.
+#compact() is the occasional full snapshot; it runs after the log has grown to a quarter of the snapshot,
+#i.e. once every ~snapshot_size / 4 bytes of appends, however many facts there are.
+#Also the startup time: snapshot load + log tail replay, with the log about as big as it gets.
+#Run from the memory folder:  python benchmark_memory_log.py
+
+SIZES = [10, 10_000, 1_000_000]
+WRITES = 2000
+OLD_WRITES = {10: 200, 10_000: 50, 1_000_000: 3}  # full rewrites get slow
+
+
+def make_memory(n):
+    data = empty_memory()
+    data["facts"] = [f"User fact number {i}: likes item {i * 7 % 1000} on weekdays" for i in range(n)]
+    return data
+
+
+def old_save(path, data):
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def timed(calls):
+    times = []
+    for call in calls:
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+    return np.array(times) * 1000
+
+
+def row(label, n, times):
+    print(f"{n:>9} | {label:>16} | {np.mean(times):>9.3f} | {np.percentile(times, 99):>9.3f} | {np.max(times):>9.1f}")
+
+
+if __name__ == "__main__":
+    print(f"{'facts':>9} | {'write':>16} | {'mean ms':>9} | {'p99 ms':>9} | {'max ms':>9}")
+    startup = []
+    for n in SIZES:
+        data = make_memory(n)
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "memory.json")
+            old_save(path, data)
+
+            def old_write(i):
+                data["facts"].append(f"new fact {i}")
+                old_save(path, data)
+
+            row("rewrite (old)", n, timed(lambda i=i: old_write(i) for i in range(OLD_WRITES[n])))
+            for policy in ("never", "interval", "always"):
+                old_save(path, make_memory(n))
+                log = MemoryLog(path, fsync=policy)
+                row(f"append, {policy}", n, timed(lambda i=i: log.append("facts", f"new fact {i}") for i in range(WRITES)))
+                log.close()
+            log = MemoryLog(path, fsync="never")
+            row("compact()", n, timed([log.compact]))
+            log.close()
+
+            # worst case for startup: a log just below the compaction threshold
+            log = MemoryLog(path, fsync="never")
+            while log.log_bytes + 200 < max(log.min_compact_bytes, log.snapshot_bytes * log.compact_ratio):
+                log.append("facts", f"tail fact {log.seq}")
+            log.close()
+            start = time.perf_counter()
+            reloaded = MemoryLog(path)
+            startup.append((n, time.perf_counter() - start, reloaded.log_bytes, len(reloaded.data["facts"])))
+            reloaded.close()
+
+    print(f"\n{'facts':>9} | {'startup s':>9} | {'log MB':>6}")
+    for n, seconds, log_bytes, facts in startup:
+        print(f"{facts:>9} | {seconds:>9.3f} | {log_bytes / 1e6:>6.1f}")
+
+    # Output (1 vCPU, ext4 on a virtual disk whose write cache makes fsync cheap; expect ~1-10 ms
+    # for "always" on real disks). The old rewrite grows with the memory (0.5 s per fact at 1M facts);
+    # an append stays ~0.01 ms at any size. compact() costs as much as one old rewrite, but at 1M
+    # facts it runs once per ~15 MB (~190k facts) of log:
+    #    facts |            write |   mean ms |    p99 ms |    max ms
+    #       10 |    rewrite (old) |     0.165 |     0.328 |       0.3
+    #       10 |    append, never |     0.008 |     0.013 |       0.1
+    #       10 | append, interval |     0.008 |     0.012 |       0.1
+    #       10 |   append, always |     0.089 |     0.146 |       3.2
+    #       10 |        compact() |     3.023 |     3.023 |       3.0
+    #    10000 |    rewrite (old) |     5.727 |     8.558 |       8.8
+    #    10000 |    append, never |     0.008 |     0.013 |       0.5
+    #    10000 | append, interval |     0.008 |     0.013 |       0.1
+    #    10000 |   append, always |     0.087 |     0.129 |      13.0
+    #    10000 |        compact() |     6.969 |     6.969 |       7.0
+    #  1000000 |    rewrite (old) |   474.888 |   504.936 |     505.5
+    #  1000000 |    append, never |     0.007 |     0.011 |       0.1
+    #  1000000 | append, interval |     0.007 |     0.012 |       0.1
+    #  1000000 |   append, always |     0.083 |     0.160 |       3.3
+    #  1000000 |        compact() |   446.376 |   446.376 |     446.4
+    #
+    #    facts | startup s | log MB
+    #    17249 |     0.067 |    1.0
+    #    27239 |     0.042 |    1.0
+    #  1161430 |     1.090 |   14.7
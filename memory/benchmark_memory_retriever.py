@@ -0,0 +1,102 @@
+import time
+
+import numpy as np
+
+from memory_retriever import HashEmbedder, MemoryRetriever
+
+#Which facts reach the prompt: the last 8 facts / 5 relationships (old build_context_prompt) against
+#MemoryRetriever with the deterministic HashEmbedder (no Ollama needed).
+#Memory: one "User's favourite <topic> is <value>" fact per topic, buried among filler facts, and
+#relationships about a few people. Each query asks about one topic or one person; a hit means the
+#fact that answers it is in the prompt, tokens are those of the facts + relationships sections.
+#Also the cost: embedding on insert (in batches of n/100), one lookup, vector memory.
+#Run from the memory folder:  python benchmark_memory_retriever.py
+
+SIZES = [100, 10_000, 100_000]
+TOPICS = ["sport", "food", "city", "band", "movie", "book", "colour", "car", "game", "drink",
+          "season", "flower", "painter", "language", "holiday", "dessert", "podcast", "composer"]
+PEOPLE = ["John", "Ziya", "Maria", "Omar", "Lena", "Ravi"]
+PLACES = ["office", "gym", "park", "market", "station", "library", "beach", "museum"]
+
+
+def make_memory(n, rng):
+    facts = [f"User went to the {PLACES[i % len(PLACES)]} on day {i}" for i in range(n - len(TOPICS))]
+    for position, topic in zip(rng.choice(len(facts), len(TOPICS), replace=False), TOPICS):
+        facts.insert(position, f"User's favourite {topic} is {topic}-{position}")
+    relationships = [f"{name} is user's {role}" for name, role in
+                     zip(PEOPLE, ["father", "sister", "colleague", "neighbour", "cousin", "teacher"])]
+    relationships += [f"Person {i} met user at the {PLACES[i % len(PLACES)]}" for i in range(n // 10)]
+    return {"facts": facts, "relationships": relationships}
+
+
+def queries():
+    for topic in TOPICS:
+        yield f"What is my favourite {topic}?", f"User's favourite {topic} is"
+    for name in PEOPLE:
+        yield f"Tell me about {name}, who is {name} to me?", f"{name} is user's"
+
+
+def hit(selected, answer):
+    return any(text.startswith(answer) for text in selected["facts"] + selected["relationships"])
+
+
+def tokens(retriever, selected):
+    return sum(retriever.tokenizer.count_tokens(f"- {text}\n") for texts in selected.values() for text in texts)
+
+
+if __name__ == "__main__":
+    print(f"{'facts':>7} | {'prompt from':>17} | {'hits':>7} | {'tokens':>6} | {'embed ms/fact':>13} | "
+          f"{'lookup ms':>9} | {'vectors KB':>10}")
+    for n, min_score in [(n, min_score) for n in SIZES for min_score in (None, 0.25)]:
+        memory = make_memory(n, np.random.default_rng(0))
+        recent = {"facts": memory["facts"][-8:], "relationships": memory["relationships"][-5:]}
+        retriever = MemoryRetriever(HashEmbedder(), min_score=min_score)
+
+        start = time.perf_counter()
+        for i in range(1, len(memory["facts"]) + 1, max(1, n // 100)):  # insert in batches of n/100
+            retriever.update({"facts": memory["facts"][:i], "relationships": []})
+        retriever.update(memory)
+        embed_ms = (time.perf_counter() - start) * 1000 / (len(memory["facts"]) + len(memory["relationships"]))
+
+        last_n_hits = retrieval_hits = retrieval_tokens = 0
+        lookups = []
+        for query, answer in queries():
+            last_n_hits += hit(recent, answer)
+            start = time.perf_counter()
+            selected = retriever.relevant(query)
+            lookups.append(time.perf_counter() - start)
+            retrieval_hits += hit(selected, answer)
+            retrieval_tokens += tokens(retriever, selected)
+        total = len(TOPICS) + len(PEOPLE)
+        kilobytes = sum(store.codes.nbytes for store in retriever.stores.values()) / 1024
+        if min_score is None:
+            print(f"{n:>7} | {'last 8 + last 5':>17} | {last_n_hits:>2} / {total} | {tokens(retriever, recent):>6} |")
+        label = "retrieval" if min_score is None else f"retrieval, >={min_score}"
+        print(f"{n:>7} | {label:>17} | {retrieval_hits:>2} / {total} | {retrieval_tokens / total:>6.0f} | "
+              f"{embed_ms:>13.3f} | {np.median(lookups) * 1000:>9.2f} | {kilobytes:>10.0f}")
+
+    print("\nSelected for 'What is my favourite band?' at 10000 facts, min_score 0.25:")
+    memory = make_memory(10_000, np.random.default_rng(0))
+    retriever = MemoryRetriever(HashEmbedder(), min_score=0.25)
+    retriever.update(memory)
+    for kind, texts in retriever.relevant("What is my favourite band?").items():
+        print(f"  {kind}: {texts}")
+
+    # Output (1 vCPU; token counts with the cl100k tokenizer). The last-N prompt never holds the answer
+    # once it is older than the last 8 facts; retrieval finds it at the same token cost, and with a
+    # score floor most irrelevant filler is left out. Lookups scan the float16 matrix (~1 ms per
+    # 1000 facts with the 256-dim stub). The misses are HashEmbedder collisions, not retrieval:
+    #  facts |       prompt from |    hits | tokens | embed ms/fact | lookup ms | vectors KB
+    #    100 |   last 8 + last 5 |  0 / 24 |    138 |
+    #    100 |         retrieval | 24 / 24 |    118 |         0.035 |      0.20 |         58
+    #    100 | retrieval, >=0.25 | 23 / 24 |     11 |         0.033 |      0.17 |         58
+    #  10000 |   last 8 + last 5 |  0 / 24 |    146 |
+    #  10000 |         retrieval | 23 / 24 |    143 |         0.039 |     12.16 |       5503
+    #  10000 | retrieval, >=0.25 | 22 / 24 |     44 |         0.030 |      8.99 |       5503
+    # 100000 |   last 8 + last 5 |  0 / 24 |    151 |
+    # 100000 |         retrieval | 22 / 24 |    148 |         0.030 |    141.46 |      55003
+    # 100000 | retrieval, >=0.25 | 21 / 24 |    117 |         0.028 |    103.20 |      55003
+    #
+    #Selected for 'What is my favourite band?' at 10000 facts, min_score 0.25:
+    #  facts: ["User's favourite band is band-9105", 'User went to the office on day 3512']
+    #  relationships: ['Person 328 met user at the office']
@@ -0,0 +1,88 @@
+import re
+from collections import defaultdict
+from collections.abc import Sequence
+
+#Indexed list of facts (or relationships) for SimpleLLMMemory.
+#It behaves like the plain list it replaces - insertion order, len(), slicing for the "last N" views,
+#iteration, `fact in facts` - and is saved to memory.json as the same list of strings. In addition:
+#   - a set of normalized texts makes `in` and dedup O(1) ("User likes tea." == "user  likes tea")
+#   - an entity index maps every name in a fact (capitalized words, plus "user") to its positions,
+#     and a subject index does the same for the first name, so about("John") does not scan.
+#     It is built on the first lookup and then kept up to date, so loading memory.json stays cheap.
+#Facts are only ever appended, so positions never change.
+
+_WORD = re.compile(r"[A-Za-z][\w-]*")
+_POSSESSIVE = re.compile(r"['’]s\b")
+# capitalized words that are not names
+_NOT_ENTITIES = {"a", "an", "the", "he", "she", "they", "it", "his", "her", "their", "i", "my", "we", "our"}
+
+
+def normalize(text):
+    """Key used for dedup: case and whitespace insensitive, trailing punctuation ignored"""
+    return " ".join(text.split()).rstrip(".!").casefold()
+
+
+def entities(text):
+    """Names mentioned in a fact, lower-cased, in order: "John is user's father" -> ["john", "user"]"""
+    found = []
+    for word in _WORD.findall(_POSSESSIVE.sub("", text)):
+        name = word.casefold()
+        if (word[0].isupper() or name == "user") and name not in _NOT_ENTITIES and name not in found:
+            found.append(name)
+    return found
+
+
+class FactIndex(Sequence):
+    def __init__(self, items=()):
+        self.items = []
+        self.keys = set()
+        self.by_entity = defaultdict(list)
+        self.by_subject = defaultdict(list)
+        self.indexed = 0  # items[:indexed] are in by_entity / by_subject
+        for item in items:
+            self.add(item)
+
+    def add(self, text):
+        """Append `text` unless an equivalent fact is already stored; returns whether it was added"""
+        key = normalize(text)
+        if not key or key in self.keys:
+            return False
+        self.items.append(text)
+        self.keys.add(key)
+        return True
+
+    append = add  # so code written for the plain list keeps working
+
+    def _index_names(self):
+        for position in range(self.indexed, len(self.items)):
+            names = entities(self.items[position])
+            for name in names:
+                self.by_entity[name].append(position)
+            if names:
+                self.by_subject[names[0]].append(position)
+        self.indexed = len(self.items)
+
+    def about(self, name):
+        """Facts mentioning `name`, oldest first"""
+        self._index_names()
+        return [self.items[i] for i in self.by_entity.get(name.casefold(), [])]
+
+    def with_subject(self, name):
+        """Facts whose first name is `name`, e.g. "John is user's father" for "John" """
+        self._index_names()
+        return [self.items[i] for i in self.by_subject.get(name.casefold(), [])]
+
+    def __contains__(self, text):
+        return isinstance(text, str) and normalize(text) in self.keys
+
+    def __getitem__(self, index):
+        return self.items[index]
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __repr__(self):
+        return f"FactIndex({self.items!r})"
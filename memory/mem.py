@@ -1,19 +1,45 @@
+import contextlib
 import json
 import os
+import sys
+import threading
 from datetime import datetime
-from ollama import Client
+from pathlib import Path
+
+# ollama_pool.py lives at the repo root
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from ollama_pool import OllamaPool
+from background_extractor import BackgroundExtractor
+from memory_log import MemoryLog
+from memory_retriever import MemoryRetriever, OllamaEmbedder
 
 class SimpleLLMMemory:
-    def __init__(self, ollama_url="http://localhost:11434", model="mistral:latest", memory_file="memory.json"):
-        self.client = Client(host=ollama_url)
+    def __init__(self, ollama_url=os.getenv("OLLAMA_HOSTS", "http://localhost:11434"), model="mistral:latest", memory_file="memory.json",
+                 retriever=None, background_extraction=True, client=None):
+        # one host or several ("http://a:11434,http://b:11434" or a list); same .chat() as ollama.Client.
+        # `client`: an existing OllamaPool to share (memory_service.py keeps one per user, one pool for all)
+        self.client = client or OllamaPool(ollama_url).start_health_checks()
         self.model = model
         self.memory_file = memory_file
         
         # Volatile memory for current session
         self.conversation_history = []  # List of {"role": "user/assistant", "content": "...", "timestamp": "..."}
         
-        # Load persistent memory from file
-        self.persistent_memory = self.load_memory()
+        # Load persistent memory: memory.json snapshot + replay of the append-only memory.json.log
+        self.store = MemoryLog(memory_file)
+        self.persistent_memory = self.store.data
+
+        # Fact extraction runs on a worker thread (see background_extractor.py), so replies never wait
+        # for it; the lock serializes its writes with the chat thread's reads
+        self.lock = threading.RLock()
+
+        # Optional MemoryRetriever: prompts get the facts relevant to the user input instead of the latest ones
+        self.retriever = retriever
+        self.update_vectors()
+
+        self.extractor = None
+        if background_extraction:
+            self.extractor = BackgroundExtractor(lambda messages: self.extract_from_user_input("\n".join(messages)))
         
         # System prompt
         self.system_prompt = """You are a helpful AI assistant with access to conversation context and learned facts.
@@ -45,41 +71,55 @@ Return ONLY a valid JSON object like this:
 
 Important: Return ONLY the JSON object, no other text."""
 
-    def load_memory(self):
-        """Load persistent memory from JSON file"""
-        if os.path.exists(self.memory_file):
+    def remember(self, kind, value):
+        """Append a new fact / relationship to persistent memory; returns False for duplicates
+        (O(1): persistent_memory["facts"] / ["relationships"] are FactIndex objects)"""
+        # the extraction JSON is written by the LLM: a number becomes text, a dict or list is dropped
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = str(value)
+        if not isinstance(value, str):
+            print(f"⚠️ Ignored a {kind[:-1]} that is not text: {value!r}")
+            return False
+        value = value.strip()
+        with self.lock:
+            if not value or value in self.persistent_memory[kind]:
+                return False
+            self.store.append(kind, value)  # one log line, not a rewrite of memory.json
+        self.update_vectors()
+        return True
+
+    def update_vectors(self):
+        """Embed newly learned facts for the retriever; on failure they are retried next time.
+        The embedding call runs without the lock, so prompts are not held up by it."""
+        if not self.retriever:
+            return
+        with self.lock:
+            pending = self.retriever.pending(self.persistent_memory)
+        for kind, start, texts in pending:
             try:
-                with open(self.memory_file, 'r') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, FileNotFoundError):
-                print(f"Error loading {self.memory_file}, creating new memory")
-        
-        # Default structure
-        default_memory = {
-            "facts": [],
-            "relationships": [],
-            "summaries": [],
-            "last_updated": datetime.now().isoformat()
-        }
-        
-        # Create the file immediately
-        self.save_memory_data(default_memory)
-        return default_memory
+                vectors = self.retriever.embedder.embed(texts)
+            except Exception as e:
+                print(f"❌ Embedding Error: {e}")
+                return
+            with self.lock:
+                self.retriever.add(kind, start, texts, vectors)
+
+    def recall_about(self, name):
+        """Facts and relationships that mention `name` (index lookup, no scan)"""
+        return (self.persistent_memory["facts"].about(name)
+                + self.persistent_memory["relationships"].about(name))
 
-    def save_memory_data(self, data):
-        """Save memory data to JSON file"""
+    def save_memory(self):
+        """Write a full memory.json snapshot now (normally done by log compaction)"""
         try:
-            with open(self.memory_file, 'w') as f:
-                json.dump(data, f, indent=2)
+            with self.lock:
+                self.store.compact()
+                if self.retriever:
+                    self.retriever.save()
             print(f"Memory saved to {self.memory_file}")
         except Exception as e:
             print(f"Error saving memory: {e}")
 
-    def save_memory(self):
-        """Save persistent memory to JSON file"""
-        self.persistent_memory["last_updated"] = datetime.now().isoformat()
-        self.save_memory_data(self.persistent_memory)
-
     def add_to_conversation(self, role, content):
         """Add a message to conversation history"""
         message = {
@@ -89,13 +129,15 @@ Important: Return ONLY the JSON object, no other text."""
         }
         self.conversation_history.append(message)
 
-    def get_recent_context(self, num_exchanges=3):
-        """Get the last N conversation exchanges (user + assistant pairs)"""
-        if not self.conversation_history:
+    def get_recent_context(self, num_exchanges=3, history=None):
+        """Get the last N conversation exchanges (user + assistant pairs) of `history`
+        (default: this session's conversation_history)"""
+        history = self.conversation_history if history is None else history
+        if not history:
             return []
         
         # Get last num_exchanges * 2 messages (user + assistant pairs)
-        recent_messages = self.conversation_history[-(num_exchanges * 2):]
+        recent_messages = history[-(num_exchanges * 2):]
         return recent_messages
 
     def extract_facts_and_relationships(self):
@@ -134,20 +176,14 @@ Important: Return ONLY the JSON object, no other text."""
                 # Add new facts
                 if "facts" in extracted_data and extracted_data["facts"]:
                     for fact in extracted_data["facts"]:
-                        if fact and fact not in self.persistent_memory["facts"]:
-                            self.persistent_memory["facts"].append(fact)
+                        if self.remember("facts", fact):
                             print(f"💡 Learned fact: {fact}")
                 
-                # Add new relationships
+                # Add new relationships (each one is written to the log as it is learned)
                 if "relationships" in extracted_data and extracted_data["relationships"]:
                     for rel in extracted_data["relationships"]:
-                        if rel and rel not in self.persistent_memory["relationships"]:
-                            self.persistent_memory["relationships"].append(rel)
+                        if self.remember("relationships", rel):
                             print(f"🔗 Learned relationship: {rel}")
-                
-                # Save if we learned something new
-                if (extracted_data.get("facts") or extracted_data.get("relationships")):
-                    self.save_memory()
                     
             except json.JSONDecodeError:
                 print(f"Could not parse extracted facts: {extracted_text}")
@@ -155,12 +191,12 @@ Important: Return ONLY the JSON object, no other text."""
         except Exception as e:
             print(f"Error extracting facts: {e}")
 
-    def build_context_prompt(self, user_input):
-        """Build the full prompt with context"""
+    def build_context_prompt(self, user_input, history=None):
+        """Build the full prompt with context (`history`: another session's messages, see get_recent_context)"""
         context_parts = []
         
         # Add recent conversation history
-        recent_context = self.get_recent_context()
+        recent_context = self.get_recent_context(history=history)
         if recent_context:
             context_parts.append("RECENT CONVERSATION:")
             for msg in recent_context:
@@ -168,17 +204,36 @@ Important: Return ONLY the JSON object, no other text."""
                 context_parts.append(f"{role_label}: {msg['content']}")
             context_parts.append("")
         
+        # Facts and relationships: the most relevant ones if there is a retriever, else the latest.
+        # New facts are embedded by remember(); the user input is embedded here, outside the lock,
+        # so a slow embedding call never holds up the extractor or another prompt
+        query_vector = None
+        if self.retriever:
+            try:
+                query_vector = self.retriever.embedder.embed([user_input])
+            except Exception as e:
+                print(f"❌ Retrieval Error: {e}")
+        with self.lock:
+            facts = self.persistent_memory["facts"][-8:]  # Last 8 facts
+            relationships = self.persistent_memory["relationships"][-5:]  # Last 5 relationships
+            if query_vector is not None:
+                try:
+                    relevant = self.retriever.relevant(user_input, query_vector)
+                    facts, relationships = relevant["facts"], relevant["relationships"]
+                except Exception as e:
+                    print(f"❌ Retrieval Error: {e}")
+
         # Add facts
-        if self.persistent_memory["facts"]:
+        if facts:
             context_parts.append("KNOWN FACTS:")
-            for fact in self.persistent_memory["facts"][-8:]:  # Last 8 facts
+            for fact in facts:
                 context_parts.append(f"- {fact}")
             context_parts.append("")
         
         # Add relationships
-        if self.persistent_memory["relationships"]:
+        if relationships:
             context_parts.append("KNOWN RELATIONSHIPS:")
-            for rel in self.persistent_memory["relationships"][-5:]:  # Last 5 relationships
+            for rel in relationships:
                 context_parts.append(f"- {rel}")
             context_parts.append("")
         
@@ -199,32 +254,26 @@ Important: Return ONLY the JSON object, no other text."""
 
     def add_fact(self, fact):
         """Manually add an important fact to persistent memory"""
-        if fact and fact not in self.persistent_memory["facts"]:
-            self.persistent_memory["facts"].append(fact)
-            self.save_memory()
+        if self.remember("facts", fact):
             print(f"Added fact: {fact}")
 
     def add_relationship(self, relationship):
         """Manually add a relationship to persistent memory"""
-        if relationship and relationship not in self.persistent_memory["relationships"]:
-            self.persistent_memory["relationships"].append(relationship)
-            self.save_memory()
+        if self.remember("relationships", relationship):
             print(f"Added relationship: {relationship}")
 
     def add_summary(self, summary):
         """Add a conversation summary to persistent memory"""
         if summary:
-            self.persistent_memory["summaries"].append({
-                "summary": summary,
-                "date": datetime.now().isoformat()
-            })
-            # Keep only last 10 summaries
-            if len(self.persistent_memory["summaries"]) > 10:
-                self.persistent_memory["summaries"] = self.persistent_memory["summaries"][-10:]
-            self.save_memory()
+            # the store keeps only the last 10 summaries
+            with self.lock:
+                self.store.append("summaries", {
+                    "summary": summary,
+                    "date": datetime.now().isoformat()
+                })
 
     def extract_from_user_input(self, user_input):
-        """Extract facts and relationships from user input before responding"""
+        """Extract facts and relationships from user input (one message, or several joined by newlines)"""
         if not user_input.strip():
             return
         
@@ -262,20 +311,14 @@ Important: Return ONLY the JSON object, no other text."""
                 # Add new facts
                 if "facts" in extracted_data and extracted_data["facts"]:
                     for fact in extracted_data["facts"]:
-                        if fact and fact not in self.persistent_memory["facts"]:
-                            self.persistent_memory["facts"].append(fact)
+                        if self.remember("facts", fact):
                             print(f"💡 Learned: {fact}")
                 
-                # Add new relationships
+                # Add new relationships (each one is written to the log as it is learned)
                 if "relationships" in extracted_data and extracted_data["relationships"]:
                     for rel in extracted_data["relationships"]:
-                        if rel and rel not in self.persistent_memory["relationships"]:
-                            self.persistent_memory["relationships"].append(rel)
+                        if self.remember("relationships", rel):
                             print(f"🔗 Connected: {rel}")
-                
-                # Save if we learned something new
-                if (extracted_data.get("facts") or extracted_data.get("relationships")):
-                    self.save_memory()
                     
             except json.JSONDecodeError as e:
                 print(f"❌ JSON Parse Error: {e}")  # Debug print
@@ -294,8 +337,12 @@ Important: Return ONLY the JSON object, no other text."""
             len(self.persistent_memory["relationships"]) == 0
         )
 
-        # Extract facts and relationships from user input first
-        self.extract_from_user_input(user_input)
+        # Extract facts and relationships from user input: in the background, so the reply does not
+        # wait for it (this message is in the prompt anyway, as the current user input)
+        if self.extractor:
+            self.extractor.submit(user_input)
+        else:
+            self.extract_from_user_input(user_input)
         
         # Add user input to conversation history
         self.add_to_conversation("user", user_input)
@@ -305,25 +352,28 @@ Important: Return ONLY the JSON object, no other text."""
             # Build context prompt
             full_prompt = self.build_context_prompt(user_input)
         
+        # no background extraction starts while the reply is generated (they would share the GPU)
+        hold = self.extractor.hold() if self.extractor else contextlib.nullcontext()
         try:
-            if not is_initial_interaction:
-                # Call the LLM with user input + memory context
-                response = self.client.chat(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": self.system_prompt},
-                        {"role": "user", "content": full_prompt}
-                    ]
-                )
-            else: 
-                 # Call the LLM with user input (for first iteraction)
-                response = self.client.chat(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": self.system_prompt},
-                        {"role": "user", "content": user_input}
-                    ]
-                )
+            with hold:
+                if not is_initial_interaction:
+                    # Call the LLM with user input + memory context
+                    response = self.client.chat(
+                        model=self.model,
+                        messages=[
+                            {"role": "system", "content": self.system_prompt},
+                            {"role": "user", "content": full_prompt}
+                        ]
+                    )
+                else: 
+                     # Call the LLM with user input (for first iteraction)
+                    response = self.client.chat(
+                        model=self.model,
+                        messages=[
+                            {"role": "system", "content": self.system_prompt},
+                            {"role": "user", "content": user_input}
+                        ]
+                    )
             
             assistant_response = response['message']['content']
             
@@ -339,6 +389,18 @@ Important: Return ONLY the JSON object, no other text."""
         except Exception as e:
             return f"Error communicating with LLM: {str(e)}"
 
+    def flush(self, timeout=None):
+        """Wait for background fact extraction to catch up; False if `timeout` ran out first"""
+        return self.extractor.flush(timeout) if self.extractor else True
+
+    def close(self):
+        """Finish pending extraction and persist everything (call before exiting)"""
+        if self.extractor:
+            self.extractor.close()
+        self.store.close()
+        if self.retriever:
+            self.retriever.save()
+
     def clear_session_memory(self):
         """Clear current session conversation history"""
         self.conversation_history = []
@@ -367,19 +429,23 @@ Important: Return ONLY the JSON object, no other text."""
         abs_path = os.path.abspath(self.memory_file)
         print(f"💾 Memory file location: {abs_path}")
         if os.path.exists(self.memory_file):
-            print(f"✅ File exists and is {os.path.getsize(self.memory_file)} bytes")
+            print(f"✅ File exists and is {os.path.getsize(self.memory_file)} bytes "
+                  f"(+ {self.store.log_bytes} bytes of changes in {self.store.log_path})")
         else:
             print("❌ File does not exist yet")
 
 
 def main():
     """Example usage"""
-    # Initialize the memory system
+    # Initialize the memory system; facts are recalled by relevance, embedded with a local Ollama model
     llm_memory = SimpleLLMMemory()
+    embedder = OllamaEmbedder(llm_memory.client, os.getenv("MEMORY_EMBED_MODEL", "nomic-embed-text"))
+    llm_memory.retriever = MemoryRetriever(embedder, memory_file=llm_memory.memory_file)
+    llm_memory.update_vectors()
     
     print("🧠 Simple LLM with Auto-Learning Memory")
     print("Just chat naturally - I'll automatically learn about you!")
-    print("Commands: /stats, /clear, /file, /quit")
+    print("Commands: /stats, /clear, /file, /about <name>, /quit")
     print("-" * 50)
     
     # Show file location
@@ -389,17 +455,23 @@ def main():
         user_input = input("\n🗣️  You: ").strip()
         
         if user_input.lower() == '/quit':
+            llm_memory.close()
             break
         elif user_input.lower() == '/clear':
             llm_memory.clear_session_memory()
             print("🧹 Session memory cleared!")
             continue
         elif user_input.lower() == '/stats':
+            llm_memory.flush()  # include what is still being extracted
             llm_memory.show_memory_stats()
             continue
         elif user_input.lower() == '/file':
             llm_memory.show_memory_file_location()
             continue
+        elif user_input.lower().startswith('/about '):
+            for item in llm_memory.recall_about(user_input[len('/about '):].strip()):
+                print(f"  - {item}")
+            continue
         elif not user_input:
             continue
         
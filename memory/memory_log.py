@@ -0,0 +1,204 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from fact_index import FactIndex
+
+#Append-only storage for SimpleLLMMemory (replaces rewriting all of memory.json on every new fact).
+#memory.json stays the snapshot, in the same format as before plus "log_seq"; every change after it
+#is one JSON line appended to memory.json.log:
+#   {"seq": 12, "ts": "2025-06-18T12:36:44", "op": "facts", "value": "User likes tea"}
+#Startup loads the snapshot and replays only the log tail (records with seq > log_seq); a torn last
+#line, left by a crash mid-append, is dropped.
+#Compaction writes the whole state to memory.json.tmp, fsyncs it, renames it over memory.json (atomic)
+#and empties the log. It runs once the log has grown to `compact_ratio` x the snapshot size, so the
+#cost per write stays constant however big the memory gets, and so does the share of the data that
+#has to be replayed at startup. A crash at any point leaves the old or the new snapshot, and replay
+#skips log records the snapshot already holds.
+#fsync policies:
+#   "always"   - every append is on disk before append() returns
+#   "interval" - at most one fsync per fsync_interval_s; a power cut loses at most that window
+#                (a crashed process loses nothing, lines are flushed to the OS on every append).
+#                An append that falls inside the window is fsynced by a timer when the window ends,
+#                so it does not wait for the next write to reach the disk.
+#   "never"    - leave it to the OS
+#Facts and relationships are held in FactIndex (fact_index.py) for O(1) dedup and name lookups;
+#on disk they are plain lists of strings, as before.
+
+FSYNC_POLICIES = ("always", "interval", "never")
+KINDS = ("facts", "relationships", "summaries")
+INDEXED = ("facts", "relationships")
+SUMMARY_LIMIT = 10  # keep only the last 10 summaries
+
+
+def empty_memory():
+    return {
+        "facts": [],
+        "relationships": [],
+        "summaries": [],
+        "last_updated": datetime.now().isoformat()
+    }
+
+
+class MemoryLog:
+    def __init__(self, path="memory.json", fsync="interval", fsync_interval_s=1.0,
+                 compact_ratio=0.25, min_compact_bytes=1 << 20):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}")
+        self.path = path
+        self.log_path = path + ".log"
+        self.fsync = fsync
+        self.fsync_interval_s = fsync_interval_s
+        self.compact_ratio = compact_ratio
+        self.min_compact_bytes = min_compact_bytes
+
+        self.data, self.seq = self._load_snapshot()
+        self._index(self.data)
+        self.snapshot_bytes = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        self.log_bytes = self._replay()
+        self._log = open(self.log_path, "ab")
+        self._last_fsync = time.monotonic()
+        self._fsync_lock = threading.Lock()  # the timer thread fsyncs too
+        self._timer = None
+        if not os.path.exists(self.path):
+            self.compact()  # create the file immediately, as before
+
+    # ---- loading ----
+
+    def _load_snapshot(self):
+        if not os.path.exists(self.path):
+            return empty_memory(), 0
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except json.JSONDecodeError:
+            # never overwrite what we could not read: keep it for inspection, rebuild from the log
+            corrupt = f"{self.path}.corrupt-{int(time.time())}"
+            os.replace(self.path, corrupt)
+            print(f"⚠️ Could not parse {self.path}, moved it to {corrupt}")
+            return empty_memory(), 0
+        for kind in KINDS:
+            data.setdefault(kind, [])
+        return data, data.pop("log_seq", 0)
+
+    def _index(self, data):
+        for kind in INDEXED:
+            data[kind] = FactIndex(data[kind])
+        return data
+
+    def _replay(self):
+        """Apply the log records newer than the snapshot; returns the size of the valid log"""
+        if not os.path.exists(self.log_path):
+            return 0
+        valid = 0
+        with open(self.log_path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # torn write at the tail
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                valid += len(line)
+                if record["seq"] > self.seq:
+                    try:
+                        self._apply(self._check(record))
+                    except (KeyError, TypeError, ValueError, AttributeError) as e:
+                        # written by an older version without the checks: skip it rather than never load again
+                        print(f"⚠️ Skipped unreadable record {record.get('seq')} in {self.log_path}: {e!r}")
+                    self.seq = record["seq"]
+        if valid < os.path.getsize(self.log_path):
+            print(f"⚠️ Dropped a partial record at the end of {self.log_path}")
+            with open(self.log_path, "r+b") as f:
+                f.truncate(valid)
+        return valid
+
+    # ---- writing ----
+
+    @staticmethod
+    def _check(record):
+        """Raise ValueError for a record that _apply() could not take"""
+        if record["op"] not in KINDS:
+            raise ValueError(f"unknown op {record['op']!r}")
+        if record["op"] in INDEXED and not isinstance(record["value"], str):
+            raise ValueError(f"{record['op']} must be strings, got {type(record['value']).__name__}")
+        return record
+
+    def _apply(self, record):
+        kind = record["op"]
+        self.data[kind].append(record["value"])
+        if kind == "summaries" and len(self.data[kind]) > SUMMARY_LIMIT:
+            del self.data[kind][:-SUMMARY_LIMIT]
+        self.data["last_updated"] = record["ts"]
+
+    def append(self, kind, value):
+        """Durably record one new fact / relationship / summary and apply it to self.data"""
+        if kind not in KINDS:
+            raise ValueError(f"kind must be one of {KINDS}")
+        record = self._check({"seq": self.seq + 1, "ts": datetime.now().isoformat(), "op": kind, "value": value})
+        line = (json.dumps(record) + "\n").encode("utf-8")  # checked and encoded before anything is written
+        self._log.write(line)
+        self._log.flush()
+        if self.fsync == "always":
+            os.fsync(self._log.fileno())
+        elif self.fsync == "interval":
+            self._fsync_within_interval()
+        self.seq += 1
+        self.log_bytes += len(line)
+        self._apply(record)
+        if self.log_bytes >= max(self.min_compact_bytes, self.snapshot_bytes * self.compact_ratio):
+            self.compact()
+
+    def _fsync_within_interval(self):
+        with self._fsync_lock:
+            wait = self._last_fsync + self.fsync_interval_s - time.monotonic()
+            if wait <= 0:
+                os.fsync(self._log.fileno())
+                self._last_fsync = time.monotonic()
+            elif self._timer is None:
+                self._timer = threading.Timer(wait, self._timed_fsync)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _timed_fsync(self):
+        with self._fsync_lock:
+            self._timer = None
+            if not self._log.closed:
+                os.fsync(self._log.fileno())
+                self._last_fsync = time.monotonic()
+
+    def compact(self):
+        """Write the full state as a new snapshot (atomic rename) and empty the log"""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({**self.data, "log_seq": self.seq}, f, indent=2, default=list)  # FactIndex -> list
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._fsync_dir()
+        # the new snapshot already holds every record, so a crash before this truncate is harmless
+        self._log.truncate(0)
+        os.fsync(self._log.fileno())
+        self.snapshot_bytes = os.path.getsize(self.path)
+        self.log_bytes = 0
+
+    def _fsync_dir(self):
+        """Make the rename itself durable (POSIX only)"""
+        if hasattr(os, "O_DIRECTORY"):
+            fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def close(self):
+        with self._fsync_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._log.closed:
+                self._log.flush()
+                os.fsync(self._log.fileno())
+                self._log.close()
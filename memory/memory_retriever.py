@@ -0,0 +1,142 @@
+import hashlib
+import re
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# embedding_store.py and tokenization.py live at the repo root
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from embedding_store import EmbeddingStore
+from tokenization import Tokenizer
+
+#Relevance-based recall for SimpleLLMMemory.build_context_prompt (instead of the last 8 facts and
+#the last 5 relationships, whatever the user asks).
+#Every fact / relationship is embedded once, when it is learned, and its vector is appended to a
+#float16 EmbeddingStore per kind (embedding_store.py), i.e. one compact NumPy matrix each.
+#The matrices are saved next to memory.json (memory_facts_<model>.q.npy + .json holding the texts)
+#and reloaded at startup; only facts learned since the last save are embedded again.
+#At chat time the user input is embedded, the top-k facts and relationships are looked up, and the
+#best ones overall are packed, by score, until `budget_tokens` prompt tokens are used; `min_score`
+#(cosine, depends on the embedding model) also drops matches too weak to be worth their tokens.
+#Embedders: OllamaEmbedder (a local embedding model through OllamaPool or ollama.Client) or
+#HashEmbedder, a deterministic bag-of-words stand-in for tests and benchmarks.
+
+KINDS = ("facts", "relationships")
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+class HashEmbedder:
+    """Deterministic stand-in for an embedding model: hashed word and word-pair counts"""
+
+    def __init__(self, dim=256):
+        self.dim = dim
+        self.name = f"hash{dim}"
+
+    def _bucket(self, token):
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        return value % self.dim, 1.0 if value >> 63 else -1.0
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = [word for word in _WORD.findall(text.lower()) if len(word) > 2 or word.isdigit()]
+            for token in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                column, sign = self._bucket(token)
+                vectors[row, column] += sign
+        return vectors
+
+
+class OllamaEmbedder:
+    def __init__(self, client, model="nomic-embed-text"):
+        self.client = client  # OllamaPool or ollama.Client
+        self.model = model
+        self.name = model
+
+    def embed(self, texts):
+        response = self.client.embed(model=self.model, input=list(texts))
+        return np.asarray(response["embeddings"], dtype=np.float32)
+
+
+class MemoryRetriever:
+    def __init__(self, embedder, memory_file=None, k_facts=8, k_relationships=5, budget_tokens=200,
+                 min_score=None, model_name="gpt-4o"):
+        self.embedder = embedder
+        self.k = {"facts": k_facts, "relationships": k_relationships}
+        self.budget_tokens = budget_tokens
+        self.min_score = min_score
+        self.tokenizer = Tokenizer(model_name)
+        self.paths = {}
+        self.stores = {}
+        model = re.sub(r"[^\w-]+", "-", embedder.name)
+        for kind in KINDS:
+            store = EmbeddingStore("float16", keep_full_precision=False)
+            if memory_file:
+                self.paths[kind] = Path(memory_file).with_name(f"{Path(memory_file).stem}_{kind}_{model}")
+                if self.paths[kind].with_suffix(".json").exists():
+                    store = EmbeddingStore.load(self.paths[kind])
+            self.stores[kind] = store
+        self.checked = set()  # kinds whose saved vectors were matched against memory.json
+        self.unsaved = False
+
+    def pending(self, memory):
+        """[(kind, start, texts)]: the facts / relationships of `memory` with no vector yet, normally just
+        the newest (call with the memory's lock held, embed them without it, then add())"""
+        batches = []
+        for kind in KINDS:
+            store, texts = self.stores[kind], memory[kind]
+            if kind not in self.checked:
+                # facts are append-only, so after this one check the vectors stay aligned with them
+                if store.ids != list(texts[:len(store)]):
+                    # memory.json was edited or replaced: the saved vectors no longer line up, start over
+                    store = self.stores[kind] = EmbeddingStore("float16", keep_full_precision=False)
+                self.checked.add(kind)
+            missing = list(texts[len(store):])
+            if missing:
+                batches.append((kind, len(store), missing))
+        return batches
+
+    def add(self, kind, start, texts, vectors):
+        """Store the vectors of a pending() batch; the part another caller stored meanwhile is skipped"""
+        store = self.stores[kind]
+        overlap = len(store) - start
+        if overlap < 0 or store.ids[start:] != texts[:overlap]:
+            return  # a batch before it failed or the store was reset; the next pending() covers it
+        if overlap < len(texts):
+            store.add(vectors[overlap:], ids=texts[overlap:])
+            self.unsaved = True
+
+    def update(self, memory):
+        """Embed the facts / relationships of `memory` that have no vector yet (single-threaded use)"""
+        for kind, start, texts in self.pending(memory):
+            self.add(kind, start, texts, self.embedder.embed(texts))
+
+    def relevant(self, query, query_vector=None):
+        """{"facts": [...], "relationships": [...]}: the best matches for `query`, best first,
+        together within budget_tokens (pass `query_vector` if it was embedded already)"""
+        if query_vector is None:
+            query_vector = self.embedder.embed([query])
+        scored = []
+        for kind in KINDS:
+            store = self.stores[kind]
+            indices, scores = store.search(query_vector, k=min(self.k[kind], len(store)))[0]
+            scored.extend((score, kind, store.ids[i]) for i, score in zip(indices, scores)
+                          if self.min_score is None or score >= self.min_score)
+
+        selected = {kind: [] for kind in KINDS}
+        used = 0
+        for _, kind, text in sorted(scored, key=lambda item: -item[0]):
+            cost = self.tokenizer.count_tokens(f"- {text}\n")
+            if used + cost > self.budget_tokens:
+                continue  # a shorter, less relevant one may still fit
+            used += cost
+            selected[kind].append(text)
+        return selected
+
+    def save(self):
+        if self.unsaved and self.paths:
+            for kind, store in self.stores.items():
+                if len(store):
+                    store.save(self.paths[kind])
+            self.unsaved = False
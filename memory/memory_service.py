@@ -0,0 +1,351 @@
+import asyncio
+import contextlib
+import hashlib
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+
+# ollama_pool.py lives at the repo root
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from ollama_pool import OllamaPool
+from ollama_scheduler import QueueFull
+from background_extractor import BackgroundExtractor
+from mem import SimpleLLMMemory
+from memory_retriever import MemoryRetriever
+
+#Memory for many users at once, keyed by (user_id, session_id); served over HTTP by memory_api.py.
+#Every user gets their own SimpleLLMMemory (mem.py) on their own shard of the disk:
+#   <root>/<first 2 hex digits of sha1(user_id)>/<user_id>/memory.json (+ memory.json.log)
+#so no file is shared between users and no directory grows past 1/256 of them.
+#Hot users stay loaded in an LRU cache of `max_hot_users`; when a new one has to be loaded the least
+#recently used idle one is closed (log fsynced, vectors saved). Users with a request in flight are
+#pinned and never evicted. Each loaded user keeps its log file open: mind the fd limit.
+#Locking: the service lock only guards the cache (a few dict operations). Everything about one user -
+#sessions, prompt building, fact writes - runs under that user's own lock (SimpleLLMMemory.lock), so
+#users never wait for each other, only for their own requests. No lock is held while the LLM answers.
+#Sessions: up to `max_sessions` conversations per user, the last HISTORY_LIMIT messages each; volatile
+#like SimpleLLMMemory.conversation_history, they go when the user is evicted.
+#Fact extraction runs on `extract_workers` BackgroundExtractors; a user always goes to the same one, so
+#their messages are applied in order, and a worker's batch costs one LLM call per user in it. A queued
+#message keeps its user pinned until it has been extracted (or dropped), so extraction never has to
+#reload an evicted user; the cache can exceed max_hot_users by the users waiting for extraction.
+#With a scheduler, extraction calls take a "low" priority slot on the event loop achat() runs on, so
+#they yield to replies; a full queue is retried for up to EXTRACT_PATIENCE_S before the batch is given up.
+
+USER_ID = re.compile(r"[A-Za-z0-9_@-][A-Za-z0-9_.@-]{0,63}")  # also a safe directory name
+HISTORY_LIMIT = 20
+EXTRACT_PATIENCE_S = 30.0
+
+
+class InvalidId(ValueError):
+    pass
+
+
+def check_id(value, what="user_id"):
+    if not USER_ID.fullmatch(value):
+        raise InvalidId(f"invalid {what} {value!r}: 1-64 of A-Z a-z 0-9 _ . @ -, not starting with '.'")
+    return value
+
+
+class UserMemory:
+    """One loaded user: persistent memory (a SimpleLLMMemory) and session histories, under one lock"""
+
+    def __init__(self, user_id, max_sessions):
+        self.user_id = user_id
+        self.max_sessions = max_sessions
+        self.lock = threading.RLock()
+        self.memory = None  # loaded by MemoryService.checkout, outside the service lock
+        self.sessions = OrderedDict()
+        self.refs = 0  # leases in flight; only changed under the service lock
+        self.closed = threading.Event()
+
+    def session(self, session_id):
+        """The messages of `session_id`, created on first use (call with the lock held)"""
+        history = self.sessions.get(session_id)
+        if history is None:
+            history = self.sessions[session_id] = []
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)  # the least recently used conversation
+        self.sessions.move_to_end(session_id)
+        return history
+
+    def add_message(self, session_id, role, content):
+        with self.lock:
+            history = self.session(session_id)
+            history.append({"role": role, "content": content, "timestamp": datetime.now().isoformat()})
+            del history[:-HISTORY_LIMIT]
+
+    def retract(self, session_id, message):
+        """Remove the latest user `message` from the session, e.g. when it could not be answered"""
+        with self.lock:
+            history = self.sessions.get(session_id, [])
+            for i in range(len(history) - 1, -1, -1):
+                if history[i]["role"] == "user" and history[i]["content"] == message:
+                    del history[i]
+                    return
+
+    def prepare(self, session_id, message):
+        """Record the user's message; returns the messages to send to the LLM for the reply"""
+        with self.lock:
+            self.add_message(session_id, "user", message)
+            history = list(self.session(session_id))
+        # not under the lock: recall may call the embedding model (build_context_prompt locks the lookup)
+        prompt = self.memory.build_context_prompt(message, history)
+        return [
+            {"role": "system", "content": self.memory.system_prompt},
+            {"role": "user", "content": prompt},
+        ]
+
+
+class MemoryService:
+    def __init__(self, root="users", client=None, model="mistral:latest", max_hot_users=256, max_sessions=16,
+                 extract_workers=4, extract_queue=4096, embedder=None, scheduler=None):
+        self.root = root
+        self.client = client or OllamaPool.from_env().start_health_checks()
+        self.model = model
+        self.max_hot_users = max_hot_users
+        self.max_sessions = max_sessions
+        self.embedder = embedder  # optional: relevance recall per user (MemoryRetriever)
+        self.scheduler = scheduler  # optional ollama_scheduler.Scheduler: achat() replies wait for a slot
+        self._loop = None  # the event loop achat() runs on, which the scheduler belongs to
+        self._lock = threading.Lock()
+        self._hot = {}  # user_id -> UserMemory, every loaded user
+        self._idle = OrderedDict()  # the loaded users nobody is using, least recently used first
+        self._closing = {}  # evicted users whose files are still being closed
+        self.hits = self.loads = self.evictions = self.extractions = 0
+        # shared by many users, so the queues are much longer than a single user's (a full one drops
+        # its oldest message, see extraction["dropped"] in stats())
+        self.extractors = [BackgroundExtractor(self._extract, max_queue=extract_queue, on_drop=self._dropped)
+                           for _ in range(extract_workers)]
+
+    def path_for(self, user_id):
+        shard = hashlib.sha1(user_id.encode("utf-8")).hexdigest()[:2]
+        return os.path.join(self.root, shard, user_id, "memory.json")
+
+    # ---- cache ----
+
+    def checkout(self, user_id):
+        """Pin `user_id` in the cache, loading it if needed; pair every checkout with a release()"""
+        check_id(user_id)
+        previous = None
+        with self._lock:
+            user = self._hot.get(user_id)
+            if user is None:
+                user = self._hot[user_id] = UserMemory(user_id, self.max_sessions)
+                previous = self._closing.get(user_id)
+            else:
+                self.hits += 1
+            self._idle.pop(user_id, None)
+            user.refs += 1
+            evicted = self._evict()
+        for old in evicted:
+            self._close(old)
+        try:
+            with user.lock:
+                if user.memory is None:
+                    if previous:
+                        previous.closed.wait()  # its last changes must be on disk before we read them
+                    self._load(user)
+        except BaseException:
+            self.release(user)
+            raise
+        return user
+
+    def release(self, user):
+        with self._lock:
+            user.refs -= 1
+            if user.refs == 0 and self._hot.get(user.user_id) is user:
+                self._idle[user.user_id] = user
+            evicted = self._evict()
+        for old in evicted:
+            self._close(old)
+
+    @contextlib.contextmanager
+    def lease(self, user_id):
+        """with service.lease(user_id) as user: ... -- the user stays loaded meanwhile"""
+        user = self.checkout(user_id)
+        try:
+            yield user
+        finally:
+            self.release(user)
+
+    def _evict(self):
+        """Drop the least recently used idle users beyond max_hot_users from the cache (service lock
+        held); they are closed by the caller, outside the lock"""
+        evicted = []
+        while len(self._hot) > self.max_hot_users and self._idle:
+            user_id, user = self._idle.popitem(last=False)
+            del self._hot[user_id]
+            self._closing[user_id] = user
+            evicted.append(user)
+        self.evictions += len(evicted)
+        return evicted
+
+    def _load(self, user):
+        path = self.path_for(user.user_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        retriever = MemoryRetriever(self.embedder, memory_file=path) if self.embedder else None
+        memory = SimpleLLMMemory(model=self.model, memory_file=path, retriever=retriever,
+                                 background_extraction=False, client=self.client)
+        memory.lock = user.lock  # one lock per user, for its sessions and its memory
+        user.memory = memory
+        with self._lock:
+            self.loads += 1
+
+    def _close(self, user):
+        try:
+            with user.lock:
+                if user.memory is not None:
+                    user.memory.close()
+        finally:
+            with self._lock:
+                if self._closing.get(user.user_id) is user:
+                    del self._closing[user.user_id]
+            user.closed.set()
+
+    # ---- chat ----
+
+    def chat(self, user_id, session_id, message):
+        """Answer `message` in the user's session with their memory as context"""
+        check_id(session_id, "session_id")
+        with self.lease(user_id) as user:
+            messages = user.prepare(session_id, message)
+            answer = self.client.chat(model=self.model, messages=messages)["message"]["content"]
+            user.add_message(session_id, "assistant", answer)
+            self.extract_later(user, message)  # before the lease ends, so the user stays loaded for it
+        return answer
+
+    async def achat(self, user_id, session_id, message, priority="normal"):
+        """chat() for the event loop: disk and lock waits run in threads, the reply is awaited.
+        Raises ollama_scheduler.QueueFull if the scheduler has no room for the reply."""
+        check_id(session_id, "session_id")
+        self._loop = asyncio.get_running_loop()
+        user = await asyncio.to_thread(self.checkout, user_id)
+        try:
+            messages = await asyncio.to_thread(user.prepare, session_id, message)
+            try:
+                slot = await self.scheduler.acquire(self.model, priority) if self.scheduler else None
+            except QueueFull:
+                user.retract(session_id, message)  # never answered, so not part of the conversation
+                raise
+            try:
+                response = await self.client.achat(self.model, messages)
+                if slot:
+                    slot.first_token()
+            finally:
+                if slot:
+                    slot.release()
+            answer = response["message"]["content"]
+            await asyncio.to_thread(user.add_message, session_id, "assistant", answer)
+            self.extract_later(user, message)  # before the lease ends, so the user stays loaded for it
+        finally:
+            await asyncio.to_thread(self.release, user)
+        return answer
+
+    def extract_later(self, user, message):
+        """Queue `message` for fact extraction into a checked out user's memory; the user stays
+        pinned until it has been extracted"""
+        with self._lock:
+            user.refs += 1
+        self.extractors[hash(user.user_id) % len(self.extractors)].submit((user, message))
+
+    def _dropped(self, item):
+        self.release(item[0])
+
+    def _low_priority_slot(self):
+        """A "low" scheduler slot for an extraction call (extractor thread), or None without a scheduler"""
+        loop = self._loop
+        if self.scheduler is None or loop is None or loop.is_closed():
+            return None
+        deadline = time.monotonic() + EXTRACT_PATIENCE_S
+        while True:
+            try:
+                return asyncio.run_coroutine_threadsafe(self.scheduler.acquire(self.model, "low"), loop).result()
+            except QueueFull:
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.5)  # replies are queued ahead of us; try again once some have gone
+
+    def _extract(self, batch):
+        by_user = {}
+        for user, message in batch:
+            by_user.setdefault(user, []).append(message)
+        for user, messages in by_user.items():
+            try:
+                slot = self._low_priority_slot()
+                try:
+                    with self._lock:
+                        self.extractions += 1
+                    user.memory.extract_from_user_input("\n".join(messages))
+                finally:
+                    if slot:
+                        self._loop.call_soon_threadsafe(slot.release)
+            except Exception as e:
+                print(f"❌ Extraction Error for {user.user_id}: {e}")  # the other users' messages still go ahead
+            finally:
+                for _ in messages:
+                    self.release(user)
+
+    # ---- memory ----
+
+    def recall(self, user_id, about=None, limit=20):
+        """The user's facts and relationships: those mentioning `about`, or the latest `limit`"""
+        with self.lease(user_id) as user, user.lock:
+            memory = user.memory.persistent_memory
+            if about:
+                return {"facts": memory["facts"].about(about), "relationships": memory["relationships"].about(about)}
+            return {"facts": memory["facts"][-limit:], "relationships": memory["relationships"][-limit:]}
+
+    def add_fact(self, user_id, fact):
+        with self.lease(user_id) as user:
+            return user.memory.remember("facts", fact)
+
+    def clear_session(self, user_id, session_id):
+        with self.lease(user_id) as user, user.lock:
+            user.sessions.pop(session_id, None)
+
+    def flush(self, timeout=None):
+        """Wait until every queued message has been extracted; False if `timeout` ran out first"""
+        return all([extractor.flush(timeout) for extractor in self.extractors])
+
+    def close(self):
+        """Finish extraction and close every loaded user (call before exiting)"""
+        for extractor in self.extractors:
+            extractor.close()
+        with self._lock:
+            users = list(self._hot.values())
+            closing = list(self._closing.values())
+            self._hot.clear()
+            self._idle.clear()
+        for user in users:
+            self._close(user)
+        for user in closing:
+            user.closed.wait()  # evicted by another thread, which is still writing its files
+
+    def stats(self):
+        extraction = [extractor.stats() for extractor in self.extractors]
+        extraction = {key: sum(stats[key] for stats in extraction) for key in ("submitted", "finished", "dropped")}
+        with self._lock:
+            return {
+                "hot_users": len(self._hot),
+                "pinned_users": len(self._hot) - len(self._idle),
+                "cache_hits": self.hits,
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "extraction": {**extraction, "batches": sum(e.calls for e in self.extractors), "llm_calls": self.extractions},
+            }
+
+
+#Example usage:
+if __name__ == "__main__":
+    service = MemoryService(root="users")
+    print(f"🤖 {service.chat('shaim', 'morning', 'Hi, my name is Shaim and I love playing football')}")
+    service.flush()
+    print(f"🧠 {service.recall('shaim')}")
+    print(f"📊 {service.stats()}")
+    service.close()
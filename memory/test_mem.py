@@ -0,0 +1,26 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from mem import SimpleLLMMemory
+from memory_log import MemoryLog
+
+
+def make_memory(tmp_path):
+    # client=object(): nothing here talks to Ollama
+    return SimpleLLMMemory(memory_file=str(tmp_path / "memory.json"), background_extraction=False, client=object())
+
+
+def test_remember_ignores_facts_that_are_not_text(tmp_path):
+    memory = make_memory(tmp_path)
+    assert memory.remember("facts", {"fact": "User likes tea"}) is False
+    assert memory.remember("relationships", ["John", "father"]) is False
+    assert memory.remember("facts", None) is False
+    assert memory.remember("facts", 42) is True  # numbers are kept as text
+    assert memory.remember("facts", "User likes tea") is True
+    memory.close()
+
+    reloaded = MemoryLog(str(tmp_path / "memory.json"))
+    assert list(reloaded.data["facts"]) == ["42", "User likes tea"]
+    assert list(reloaded.data["relationships"]) == []
+    reloaded.close()
@@ -0,0 +1,35 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from memory_log import MemoryLog
+
+
+def test_rejected_record_is_not_written(tmp_path):
+    path = str(tmp_path / "memory.json")
+    log = MemoryLog(path)
+    log.append("facts", "User likes tea")
+    with pytest.raises(ValueError):
+        log.append("facts", {"fact": "not text"})
+    log.append("facts", "User owns a cat")
+    log.close()
+
+    reloaded = MemoryLog(path)
+    assert list(reloaded.data["facts"]) == ["User likes tea", "User owns a cat"]
+    reloaded.close()
+
+
+def test_replay_skips_a_record_it_cannot_apply(tmp_path):
+    path = str(tmp_path / "memory.json")
+    MemoryLog(path).close()
+    with open(path + ".log", "a") as f:
+        for seq, value in enumerate(["User likes tea", {"fact": "bad"}, "User owns a cat"], start=1):
+            f.write(json.dumps({"seq": seq, "ts": "2025-06-18T12:36:44", "op": "facts", "value": value}) + "\n")
+
+    log = MemoryLog(path)
+    assert list(log.data["facts"]) == ["User likes tea", "User owns a cat"]
+    assert log.seq == 3
+    log.close()
@@ -0,0 +1,85 @@
+import asyncio
+import contextlib
+import os
+import sys
+from pathlib import Path
+from typing import Literal
+
+from fastapi import FastAPI, Body, HTTPException, Query, Request
+from fastapi.responses import JSONResponse
+
+from ollama_api import pool, scheduler
+from ollama_scheduler import QueueFull
+
+# memory_service.py and the memory modules it uses live in memory/
+sys.path.append(str(Path(__file__).resolve().parent / "memory"))
+from memory_service import InvalidId, MemoryService
+
+#Multi-user memory chat over HTTP, next to ollama_api.py (same OllamaPool and scheduler).
+#Every user has their own persistent memory and any number of sessions (memory/memory_service.py):
+#   POST   /users/{user_id}/sessions/{session_id}/chat   body: "message"  -> the answer
+#   DELETE /users/{user_id}/sessions/{session_id}                         -> forget that conversation
+#   GET    /users/{user_id}/memory?about=John                             -> facts / relationships
+#   POST   /users/{user_id}/facts                        body: "fact"
+#   GET    /memory/metrics                                                -> cache, extraction, scheduler
+#Replies go through the scheduler (429 when its queue is full); facts are extracted in the background,
+#through the same scheduler at "low" priority.
+#Memory is stored under MEMORY_ROOT (default ./users), at most MEMORY_MAX_HOT_USERS users are kept loaded.
+#Run:  uvicorn memory_api:app
+
+MODEL = os.getenv("MEMORY_MODEL", "mistral:latest")
+
+service = MemoryService(
+    root=os.getenv("MEMORY_ROOT", "users"),
+    client=pool,
+    model=MODEL,
+    max_hot_users=int(os.getenv("MEMORY_MAX_HOT_USERS", "256")),
+    extract_workers=int(os.getenv("MEMORY_EXTRACT_WORKERS", "4")),
+    scheduler=scheduler,
+)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    yield
+    await asyncio.to_thread(service.close)  # pending facts are extracted and every log is fsynced
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.exception_handler(InvalidId)
+async def invalid_id(request: Request, error: InvalidId):
+    return JSONResponse(status_code=400, content={"detail": str(error)})
+
+
+@app.post("/users/{user_id}/sessions/{session_id}/chat")
+async def chat(user_id: str, session_id: str,
+               message: str = Body(..., description="Chat Message"),
+               priority: Literal["high", "normal", "low"] = Query("normal")):
+    try:
+        return await service.achat(user_id, session_id, message, priority)
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+
+
+@app.delete("/users/{user_id}/sessions/{session_id}")
+async def clear_session(user_id: str, session_id: str):
+    await asyncio.to_thread(service.clear_session, user_id, session_id)
+    return {"cleared": session_id}
+
+
+@app.get("/users/{user_id}/memory")
+async def memory(user_id: str, about: str = Query(None, description="Only what mentions this name"),
+                 limit: int = Query(20, ge=1, le=1000)):
+    return await asyncio.to_thread(service.recall, user_id, about, limit)
+
+
+@app.post("/users/{user_id}/facts")
+async def add_fact(user_id: str, fact: str = Body(..., description="Fact")):
+    return {"added": await asyncio.to_thread(service.add_fact, user_id, fact)}
+
+
+@app.get("/memory/metrics")
+async def metrics():
+    return {**service.stats(), "scheduler": scheduler.stats()}
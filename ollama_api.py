@@ -1,16 +1,100 @@
-from fastapi import FastAPI, Body
-from ollama import Client 
+import json
+import os
+from typing import Literal, Optional
+
+from fastapi import FastAPI, Body, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+from ollama_pool import OllamaPool
+from ollama_scheduler import QueueFull, Scheduler
+
+#Async, streaming chat endpoint in front of Ollama.
+#Requests go through a shared OllamaPool (ollama_pool.py): one or more Ollama hosts from OLLAMA_HOSTS
+#(or OLLAMA_HOST), each with its own kept-alive connections, and the handler never blocks a worker
+#thread. Clients opt in to getting tokens as they are generated:
+#   Accept: text/event-stream  ->  Server-Sent Events, "data: {"token": ...}" per chunk, then "data: [DONE]"
+#   ?stream=true               ->  chunked text/plain, raw token text (SSE if the Accept header asks for it)
+#   anything else              ->  the whole answer as one JSON string (the original behaviour)
+#   ?stream=false              ->  the JSON string, whatever the Accept header says
+#If the client disconnects mid-answer the upstream stream is closed, which makes Ollama stop generating.
+#Every request first gets a generation slot from the scheduler (ollama_scheduler.py): at most
+#OLLAMA_MAX_IN_FLIGHT generations per model and backend, up to OLLAMA_MAX_QUEUE waiting in priority lanes
+#(?priority=high|normal|low), 429 when the queue is full. Latency histograms and backend health are
+#served on /metrics.
+
+MODEL = os.getenv("OLLAMA_MODEL", "gemma3:1b")
 
 app = FastAPI()
-client = Client(
-    host='http://localhost:11434'
+pool = OllamaPool.from_env().start_health_checks()
+scheduler = Scheduler(
+    max_in_flight=int(os.getenv("OLLAMA_MAX_IN_FLIGHT", "4")) * len(pool.backends),
+    max_queue=int(os.getenv("OLLAMA_MAX_QUEUE", "64")),
 )
 
+
+async def stream_chat(messages, model=MODEL):
+    """Yield the answer's text chunks as Ollama generates them"""
+    upstream = pool.astream_chat(model, messages)
+    try:
+        async for part in upstream:
+            if part["message"]["content"]:
+                yield part["message"]["content"]
+    finally:
+        # runs on normal completion, on errors and when the downstream response is cancelled
+        await upstream.aclose()
+
+
+async def forward(chunks, sse, slot):
+    """Pass chunks to the client. When the client disconnects Starlette cancels this generator,
+    and closing `chunks` closes the upstream stream too."""
+    try:
+        async for chunk in chunks:
+            slot.first_token()
+            yield f"data: {json.dumps({'token': chunk})}\n\n" if sse else chunk
+        if sse:
+            yield "data: [DONE]\n\n"
+    finally:
+        await chunks.aclose()
+        slot.release()
+
+
 @app.post("/chat")
-def chat(message: str = Body(..., description= "Chat Message")):
-    response = client.chat(model="gemma3:1b", messages=[
+async def chat(request: Request,
+               message: str = Body(..., description= "Chat Message"),
+               stream: Optional[bool] = Query(None, description="Stream tokens as they are generated "
+                                                                "(default: only for Accept: text/event-stream)"),
+               priority: Literal["high", "normal", "low"] = Query("normal")):
+    messages = [
         {"role": "user", "content": message},
+    ]
+
+    sse = "text/event-stream" in request.headers.get("accept", "")
+    if stream is None:
+        stream = sse  # unchanged clients keep getting the JSON string
+
+    try:
+        slot = await scheduler.acquire(MODEL, priority)
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+
+    if not stream:
+        try:
+            response = await pool.achat(MODEL, messages)
+            slot.first_token()
+            return response['message']['content']
+        finally:
+            slot.release()
+
+    return StreamingResponse(
+        forward(stream_chat(messages), sse, slot),
+        media_type="text/event-stream" if sse else "text/plain; charset=utf-8",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # frees the slot even if the client left before the stream was ever started
+        background=BackgroundTask(slot.release),
+    )
 
-    ])
 
-    return response['message']['content']
+@app.get("/metrics")
+async def metrics():
+    return {**scheduler.stats(), "backends": pool.stats()}
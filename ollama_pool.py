@@ -0,0 +1,258 @@
+import contextlib
+import os
+import threading
+import time
+
+import httpx
+from ollama import AsyncClient, Client
+
+#Pool of Ollama backends, shared by ollama_api.py, memory/mem.py and lang-graph/graph.py.
+#Routing: every request goes to the healthy backend with the lowest score, where
+#   score = outstanding requests (+ cold_penalty if the backend does not have the model loaded yet)
+#so requests stick to hosts that already hold the model (no load time, no evicting another model)
+#until those are `cold_penalty` requests busier than a cold host.
+#Health:
+#   passive - `max_failures` failed requests in a row (connection error, timeout, 5xx) eject the
+#             backend for `eject_s` seconds; after that one request is let through to probe it
+#   active  - a daemon thread polls GET /api/ps on every backend each `health_interval_s`: a failed
+#             probe ejects the backend, a good one brings it back and refreshes its loaded models
+#A request that fails on a backend is retried on another one (streams only before the first part).
+#Each backend keeps one sync and one async ollama client, so connections are kept alive and reused.
+#Hosts: a list or a comma separated string; from_env() reads OLLAMA_HOSTS, then OLLAMA_HOST.
+
+DEFAULT_HOST = "http://localhost:11434"
+TRANSPORT_ERRORS = (ConnectionError, TimeoutError, httpx.TransportError)
+
+
+def is_backend_failure(error):
+    """True for errors that say something about the backend rather than the request"""
+    if isinstance(error, TRANSPORT_ERRORS) or isinstance(error.__cause__, TRANSPORT_ERRORS):
+        return True  # the __cause__ check covers wrappers such as openai.APIConnectionError
+    return (getattr(error, "status_code", None) or 0) >= 500
+
+
+class Backend:
+    def __init__(self, host, keepalive_connections=20, keepalive_expiry_s=60):
+        self.host = host.strip().rstrip("/")
+        limits = httpx.Limits(max_keepalive_connections=keepalive_connections, keepalive_expiry=keepalive_expiry_s)
+        self.client = Client(host=self.host, limits=limits)
+        self.async_client = AsyncClient(host=self.host, limits=limits)
+        self.models = set()
+        self.outstanding = 0
+        self.failures = 0  # consecutive
+        self.ejected_until = 0.0
+        self.served = 0
+        self.failed = 0
+
+    @property
+    def healthy(self):
+        return time.monotonic() >= self.ejected_until
+
+    def stats(self):
+        return {
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "served": self.served,
+            "failed": self.failed,
+            "models": sorted(self.models),
+        }
+
+
+class OllamaPool:
+    def __init__(self, hosts=DEFAULT_HOST, cold_penalty=4, max_failures=3, eject_s=30,
+                 health_interval_s=10, health_timeout_s=2, **backend_kwargs):
+        if isinstance(hosts, str):
+            hosts = hosts.split(",")
+        self.backends = [Backend(host, **backend_kwargs) for host in hosts if host.strip()]
+        if not self.backends:
+            raise ValueError("OllamaPool needs at least one host")
+        self.cold_penalty = cold_penalty
+        self.max_failures = max_failures
+        self.eject_s = eject_s
+        self.health_interval_s = health_interval_s
+        self.health_timeout_s = health_timeout_s
+        self._lock = threading.Lock()
+        self._probe = None
+        self._stop = threading.Event()
+        self._health_thread = None
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        return cls(os.getenv("OLLAMA_HOSTS") or os.getenv("OLLAMA_HOST") or DEFAULT_HOST, **kwargs)
+
+    # ---- routing ----
+
+    def pick(self, model=None, exclude=()):
+        """Reserve the best backend for one request; pair every pick with a done()"""
+        with self._lock:
+            candidates = [b for b in self.backends if b not in exclude] or self.backends
+            healthy = [b for b in candidates if b.healthy]
+            if not healthy:
+                # all ejected: try the one due back first rather than failing without asking anyone
+                healthy = [min(candidates, key=lambda b: b.ejected_until)]
+            backend = min(healthy, key=lambda b: (
+                b.outstanding + (0 if model in b.models else self.cold_penalty), b.served))
+            backend.outstanding += 1
+            return backend
+
+    def done(self, backend, model=None, error=None):
+        with self._lock:
+            backend.outstanding -= 1
+            if error is None:
+                backend.failures = 0
+                backend.served += 1
+                if model:
+                    backend.models.add(model)  # it is loaded now
+            elif is_backend_failure(error):
+                backend.failures += 1
+                backend.failed += 1
+                if backend.failures >= self.max_failures:
+                    backend.ejected_until = time.monotonic() + self.eject_s
+
+    @contextlib.contextmanager
+    def lease(self, model=None, exclude=()):
+        """with pool.lease(model) as backend: ... -- errors raised inside count against the backend"""
+        backend = self.pick(model, exclude)
+        try:
+            yield backend
+        except BaseException as e:
+            self.done(backend, model, e)
+            raise
+        self.done(backend, model)
+
+    def _retry(self, error, started, attempt):
+        return not started and is_backend_failure(error) and attempt < len(self.backends) - 1
+
+    # ---- requests ----
+
+    def call(self, model, request):
+        """request(backend) on the picked backend, retried on another backend if that one fails"""
+        tried = []
+        for attempt in range(len(self.backends)):
+            try:
+                with self.lease(model, exclude=tried) as backend:
+                    return request(backend)
+            except Exception as e:
+                if not self._retry(e, False, attempt):
+                    raise
+                tried.append(backend)
+
+    async def acall(self, model, request):
+        """Async call(): `request(backend)` returns an awaitable"""
+        tried = []
+        for attempt in range(len(self.backends)):
+            try:
+                with self.lease(model, exclude=tried) as backend:
+                    return await request(backend)
+            except Exception as e:
+                if not self._retry(e, False, attempt):
+                    raise
+                tried.append(backend)
+
+    def chat(self, model, messages, stream=False, **kwargs):
+        """Drop-in for ollama.Client.chat"""
+        if stream:
+            return self.stream_chat(model, messages, **kwargs)
+        return self.call(model, lambda backend: backend.client.chat(model=model, messages=messages, **kwargs))
+
+    async def achat(self, model, messages, **kwargs):
+        """Drop-in for ollama.AsyncClient.chat without streaming"""
+        return await self.acall(model, lambda backend: backend.async_client.chat(model=model, messages=messages, **kwargs))
+
+    def embed(self, model, input, **kwargs):
+        """Drop-in for ollama.Client.embed"""
+        return self.call(model, lambda backend: backend.client.embed(model=model, input=input, **kwargs))
+
+    def stream_chat(self, model, messages, **kwargs):
+        """Yield chat parts; the lease lasts until the stream is finished or closed"""
+        tried = []
+        for attempt in range(len(self.backends)):
+            started = False
+            try:
+                with self.lease(model, exclude=tried) as backend:
+                    upstream = backend.client.chat(model=model, messages=messages, stream=True, **kwargs)
+                    try:
+                        for part in upstream:
+                            started = True
+                            yield part
+                    finally:
+                        upstream.close()
+                    return
+            except Exception as e:
+                if not self._retry(e, started, attempt):
+                    raise
+                tried.append(backend)
+
+    async def astream_chat(self, model, messages, **kwargs):
+        """Async stream_chat(); closing it closes the upstream stream, which stops the generation"""
+        tried = []
+        for attempt in range(len(self.backends)):
+            started = False
+            try:
+                with self.lease(model, exclude=tried) as backend:
+                    upstream = await backend.async_client.chat(model=model, messages=messages, stream=True, **kwargs)
+                    try:
+                        async for part in upstream:
+                            started = True
+                            yield part
+                    finally:
+                        await upstream.aclose()
+                    return
+            except Exception as e:
+                if not self._retry(e, started, attempt):
+                    raise
+                tried.append(backend)
+
+    # ---- active health checks ----
+
+    def check(self, backend):
+        """Probe one backend; returns whether it answered"""
+        self._probe = self._probe or httpx.Client(timeout=self.health_timeout_s)
+        try:
+            response = self._probe.get(f"{backend.host}/api/ps")
+            response.raise_for_status()
+            models = {m.get("model") or m.get("name") for m in response.json().get("models") or []}
+        except (httpx.HTTPError, ValueError):
+            with self._lock:
+                backend.failures = max(backend.failures, self.max_failures)
+                backend.ejected_until = time.monotonic() + self.eject_s
+            return False
+        with self._lock:
+            backend.models = models
+            backend.failures = 0
+            backend.ejected_until = 0.0
+        return True
+
+    def check_all(self):
+        return {backend.host: self.check(backend) for backend in self.backends}
+
+    def start_health_checks(self):
+        """Run check_all() every health_interval_s in a daemon thread; returns the pool"""
+        if self._health_thread is None:
+            def loop():
+                while not self._stop.is_set():
+                    self.check_all()
+                    self._stop.wait(self.health_interval_s)
+
+            self._stop.clear()
+            self._health_thread = threading.Thread(target=loop, name="ollama-pool-health", daemon=True)
+            self._health_thread.start()
+        return self
+
+    def stop_health_checks(self):
+        if self._health_thread is not None:
+            self._stop.set()
+            self._health_thread.join()
+            self._health_thread = None
+
+    def stats(self):
+        return {backend.host: backend.stats() for backend in self.backends}
+
+
+#Example usage:
+if __name__ == "__main__":
+    pool = OllamaPool.from_env().start_health_checks()
+    print(f"🩺 Backends: {pool.check_all()}")
+    response = pool.chat(model="gemma3:1b", messages=[{"role": "user", "content": "Say hello in one word"}])
+    print(f"🤖 {response['message']['content']}")
+    print(f"📊 {pool.stats()}")
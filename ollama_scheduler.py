@@ -0,0 +1,163 @@
+import asyncio
+import bisect
+import time
+from collections import deque
+
+#Admission control in front of Ollama.
+#Each model gets at most `max_in_flight` concurrent generations (match it to OLLAMA_NUM_PARALLEL: Ollama
+#batches that many sequences on the GPU, anything beyond only waits inside Ollama, invisible to us).
+#Requests above the limit wait in a bounded queue with priority lanes; a request finding its model's
+#queue full is rejected at once (QueueFull -> HTTP 429) instead of piling up behind a burst, unless
+#it outranks a waiting request, which is then rejected in its place.
+#Queue wait, time to first token and total latency are recorded in histograms.
+
+PRIORITIES = ("high", "normal", "low")
+# seconds; roughly log-spaced like Prometheus' default latency buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class QueueFull(Exception):
+    def __init__(self, model, queued):
+        super().__init__(f"{queued} requests already queued for {model}")
+        self.model = model
+        self.queued = queued
+
+
+class LatencyHistogram:
+    """Fixed-bucket histogram, cheap to update on every request"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile (float("inf") past the last bucket)"""
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self):
+        """JSON-ready: an infinite percentile is reported as "+Inf", which JSON has no number for"""
+        percentiles = {f"p{q}": self.percentile(q) for q in (50, 90, 99)}
+        return {
+            "count": self.count,
+            "mean": self.sum / self.count if self.count else None,
+            **{key: "+Inf" if value == float("inf") else value for key, value in percentiles.items()},
+            "buckets": {str(bound): count for bound, count in zip(self.buckets + ("+Inf",), self.counts)},
+        }
+
+
+class Slot:
+    """One admitted request; times are measured from when it entered the queue"""
+
+    def __init__(self, scheduler, model, priority):
+        self.scheduler = scheduler
+        self.model = model
+        self.priority = priority
+        self.enqueued = time.perf_counter()
+        self.saw_first_token = False
+        self.released = False
+
+    def first_token(self):
+        if not self.saw_first_token:
+            self.saw_first_token = True
+            self.scheduler.observe("ttft", self.priority, time.perf_counter() - self.enqueued)
+
+    def release(self):
+        """Idempotent, so it can be called from both the response stream and a background task"""
+        if not self.released:
+            self.released = True
+            self.scheduler.observe("total", self.priority, time.perf_counter() - self.enqueued)
+            self.scheduler.release(self.model)
+
+
+class Scheduler:
+    def __init__(self, max_in_flight=4, max_queue=64, model_limits=None):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.model_limits = model_limits or {}
+        self.in_flight = {}
+        self.lanes = {}  # model -> {priority: deque of futures}
+        self.rejected = 0
+        self.histograms = {}
+
+    def limit(self, model):
+        return self.model_limits.get(model, self.max_in_flight)
+
+    def queued(self, model):
+        return sum(len(lane) for lane in self.lanes.get(model, {}).values())
+
+    def observe(self, metric, priority, seconds):
+        key = (metric, priority)
+        if key not in self.histograms:
+            self.histograms[key] = LatencyHistogram()
+        self.histograms[key].observe(seconds)
+
+    async def acquire(self, model, priority="normal"):
+        """Wait for a generation slot on `model`; raises QueueFull when its queue is at capacity"""
+        if priority not in PRIORITIES:
+            raise ValueError(f"priority must be one of {PRIORITIES}")
+        slot = Slot(self, model, priority)
+        queued = self.queued(model)
+        if self.in_flight.get(model, 0) < self.limit(model) and queued == 0:
+            self.in_flight[model] = self.in_flight.get(model, 0) + 1
+        else:
+            lanes = self.lanes.setdefault(model, {lane: deque() for lane in PRIORITIES})
+            if queued >= self.max_queue:
+                self.rejected += 1
+                if not self._evict_lower(lanes, priority, QueueFull(model, queued)):
+                    raise QueueFull(model, queued)
+            waiter = asyncio.get_running_loop().create_future()
+            lanes[priority].append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self.release(model)  # slot was handed over just as the caller gave up
+                elif waiter in lanes[priority]:
+                    lanes[priority].remove(waiter)
+                raise
+        self.observe("queue_wait", priority, time.perf_counter() - slot.enqueued)
+        return slot
+
+    def _evict_lower(self, lanes, priority, error):
+        """Reject the newest waiter of the lowest lane below `priority`, if there is one"""
+        for lane in reversed(PRIORITIES[PRIORITIES.index(priority) + 1:]):
+            while lanes[lane]:
+                waiter = lanes[lane].pop()
+                if not waiter.done():
+                    waiter.set_exception(error)
+                    return True
+        return False
+
+    def release(self, model):
+        """Hand the freed slot straight to the next waiter, highest priority lane first"""
+        for lane in self.lanes.get(model, {}).values():
+            while lane:
+                waiter = lane.popleft()
+                if not waiter.done():
+                    waiter.set_result(None)  # in_flight stays the same: the slot changes hands
+                    return
+        self.in_flight[model] -= 1
+
+    def stats(self):
+        return {
+            "in_flight": dict(self.in_flight),
+            "queued": {model: self.queued(model) for model in self.lanes},
+            "rejected": self.rejected,
+            "latency": {f"{metric}.{priority}": histogram.snapshot()
+                        for (metric, priority), histogram in sorted(self.histograms.items())},
+        }
@@ -1,12 +1,24 @@
 from pathlib import Path
 from dotenv import load_dotenv
 import os
-from collections import defaultdict
+import sys
+import time
 
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
-from langchain_qdrant import QdrantVectorStore
+
+# shared helpers live one level up in query_tranformation/
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from embedding_cache import CachedEmbeddings
+from qdrant_sync import connect_qdrant
+from streaming_ingest import iter_chunks, iter_pdf_pages, stream_pdf_to_qdrant
+from local_vector_store import LocalVectorStore
+from semantic_cache import SemanticAnswerCache
+from query_variations import VariationCache, iter_variation_lines, retrieve_with_speculation
+from context_packer import ContextPacker
+from near_duplicates import collapse_near_duplicates
+from rank_fusion import chunk_id, fuse_documents
+from bm25_index import BM25Index, index_chunks
+from reranker import Reranker
 
 #load pdf
 
@@ -27,31 +39,19 @@ from langchain_qdrant import QdrantVectorStore
 
 load_dotenv()
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-
-def load_pdf_documents(pdf_path):
-    loader = PyPDFLoader(pdf_path)
-    return loader.load()
-
-def split_into_chunks(documents, chunk_size=2000, chunk_overlap=200):
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size, chunk_overlap=chunk_overlap
-    )
-    return splitter.split_documents(documents)
+# "qdrant" (server at localhost:6333) or "local" (in-process NumPy index, no server needed)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "qdrant")
+# LLM grading of borderline chunks costs a chat call each; opt in with RERANK_LLM=1 and a budget
+# large enough for it (RERANK_BUDGET_MS, the default only covers the cheap scores)
+RERANK_LLM = os.getenv("RERANK_LLM") == "1"
+RERANK_BUDGET_MS = int(os.getenv("RERANK_BUDGET_MS", "300"))
 
 def get_embedder():
-    return GoogleGenerativeAIEmbeddings(
+    # cached so re-runs on an unchanged PDF skip already-embedded chunks
+    return CachedEmbeddings(GoogleGenerativeAIEmbeddings(
         model="models/text-embedding-004",
         google_api_key=GOOGLE_API_KEY
-    )
-
-
-def store_chunks_in_qdrant(chunks, embedding_model):
-    return QdrantVectorStore.from_documents(
-        documents=chunks,
-        embedding=embedding_model,
-        url="http://localhost:6333",
-        collection_name="pdf_chunks"
-    )
+    ))
 
 def get_chat_model():
     return ChatGoogleGenerativeAI(
@@ -76,83 +76,89 @@ If the query is unclear, ask the user to clarify the question once again.
 
 #Reciproval Rank Fusion
 
-def generate_query_variations(original_query, model, num_variations=3):
-    prompt = f"Generate {num_variations} different ways to ask this question: {original_query}"
-    response = model.invoke(prompt)
-    variations = response.content.split("\n")
-    return [original_query] + [v.strip() for v in variations if v.strip()]
-
-def retrieve_parallel_with_rrf(vector_store, queries, k=3):
-    docs_per_query = []         #list of Documents:  [Document(metadata={....}, page_content='React is framework over JS....'), 
-                                #        Document(metadata={....}, page_content='React is a JavaScript library for building user interfaces....')   ]
-    print("\n🔍 Top-k documents for each variation:")
-    for i, query in enumerate(queries):
-        docs = vector_store.similarity_search(query, k=k)
-        docs_per_query.append(docs)
-        print(f"\n🔸 Variation {i+1}: {query}")
-
-        #print the rank (just preview)
-        for j, doc in enumerate(docs, start=1):
-            preview = doc.page_content[:100].replace("\n", " ") + "..."
-            #print(f"   Rank {j}: {preview}")
-
-    return docs_per_query
-
-
-def rank_the_queries(docs_per_query, k=60):
-    scores = defaultdict(float)
-    doc_map = {}
-    source_info = defaultdict(list)
-
-    for i, query_docs in enumerate(docs_per_query):
-        for rank, doc in enumerate(query_docs, start=1):            #here rank is index of Document in list
-            content = doc.page_content
-            score = 1 / (k + rank)
-            scores[content] += score
-            doc_map[content] = doc
-            source_info[content].append(f"Variation {i+1} (Rank {rank}, +{score:.4f})")
-
-    #>>> source_info
-    #defaultdict(<class 'list'>, {"5 | P a g e  \n \n \n \n \n \n \n \n \n \n \n \n \n \n \n \n \nHANDLE SIDE EFFECTS \n}": ['Variation 2 (Rank 2, +0.0166)']})
-
-    #>>> scores
-    # defaultdict(<class 'float'>, {"5 | P a g e  \n \n \n \n \n \n \n \n \n \n \n \n \n \n \n \n \nHANDLE SIDE EFFECTS \n}": 0.016666666666666666})
-    # 
-
-    #sorting by the score (key is page_content and value is score)
-    #If you want the top-ranked (highest scoring) documents first, you need descending order. By default, sorted sorts in ascending order, so reverse=True flips it.
-    #Example
-    #scores = {'doc1': 0.8, 'doc2': 0.5, 'doc3': 0.9}
-    #sorted_docs = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-    # Result: [('doc3', 0.9), ('doc1', 0.8), ('doc2', 0.5)]
-    sorted_docs = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+def query_variation_prompt(original_query, num_variations=3):
+    return f"Generate {num_variations} different ways to ask this question: {original_query}"
+
+
+def rank_the_queries(docs_per_query, k=60, strategy="rrf", top_k=None, debug=False,
+                     scores_per_query=None, weights=None):
+    #documents are identified by their chunk ID (Qdrant point ID), not by the full page_content string,
+    #and all lists are scored in one vectorized pass, see rank_fusion.py for the strategies
+    #(rrf, weighted_rrf, combsum, combmnz); combsum/combmnz need the similarity score of every
+    #document in scores_per_query (same shape as docs_per_query), weighted_rrf one weight per list
+    if not debug:
+        return fuse_documents(docs_per_query, strategy=strategy, scores_per_query=scores_per_query,
+                              weights=weights, k=k, top_k=top_k)
+
+    unique_docs, scores, provenance = fuse_documents(
+        docs_per_query, strategy=strategy, scores_per_query=scores_per_query, weights=weights,
+        k=k, top_k=top_k, debug=True
+    )
 
     print("\n📊 RRF Fused Rankings:")
-    for i, (doc_text, score) in enumerate(sorted_docs, start=1):
-        source = "; ".join(source_info[doc_text])
+    for i, (doc, score) in enumerate(zip(unique_docs, scores), start=1):
+        source = "; ".join(
+            f"Variation {query_idx+1} (Rank {rank}, +{contribution:.4f})"
+            for query_idx, rank, contribution in provenance[chunk_id(doc)]
+        )
         #print the source (just preview)
-        preview = doc_text[:100].replace("\n", " ") + "..."
+        preview = doc.page_content[:100].replace("\n", " ") + "..."
         print(f"{i}. Score: {score:.4f} | Source: {source}\n   {preview}")
-    
-    unique_docs = [doc_map[doc_text] for doc_text, _ in sorted_docs]
+
     return unique_docs
 
 
-def chat_with_rrf(query, vector_store, chat_model):
-    queries = generate_query_variations(query, chat_model)
+def chat_with_rrf(query, vector_store, chat_model, answer_cache=None, variation_cache=None, packer=None,
+                  lexical_index=None, reranker=None, rerank_pool=50):
+    # same or nearly the same question asked before: skip variations, retrieval and generation
+    if answer_cache is not None:
+        cached_answer, query_vector = answer_cache.get(query)
+        if cached_answer is not None:
+            return cached_answer
+    start = time.perf_counter()
+
+    # with a reranker every list goes deeper, so the original query and its 3 variations
+    # together can fill the rerank pool
+    depth = 3 if reranker is None else max(3, -(-rerank_pool // 4))
+
+    # the original query is searched while the variations are still being generated,
+    # repeated questions reuse their cached variations
+    queries, docs_per_query = retrieve_with_speculation(
+        query,
+        vector_store,
+        iter_variation_lines(chat_model, query_variation_prompt(query)),
+        k=depth,
+        cache=variation_cache,
+    )
     print("\n🔁 Generated Query Variations:")
     for idx, q in enumerate(queries, 1):
         print(f"{idx}. {q}")
 
-    docs_per_query = retrieve_parallel_with_rrf(vector_store, queries)
-    fused_docs = rank_the_queries(docs_per_query)
+    # BM25 rankings catch exact identifiers (useEffect, API names) and are fused like any other list
+    if lexical_index is not None:
+        docs_per_query = docs_per_query + [lexical_index.search(q, k=depth) for q in queries]
+
+    # near-duplicates keep only their best-ranked representative
+    fused_docs = collapse_near_duplicates(rank_the_queries(docs_per_query))
+    if reranker is not None:
+        # rescore a larger pool cheaply so the chunks that reach the prompt are the most relevant ones
+        fused_docs = reranker.rerank(query, fused_docs[:rerank_pool], top_n=5)
+    if packer is None:
+        context = "\n\n...\n\n".join([doc.page_content for doc in fused_docs[:5]])
+    else:
+        # pack fused docs best first into the token budget instead of a fixed top 5
+        context, _, _ = packer.pack(fused_docs)
 
-    context = "\n\n...\n\n".join([doc.page_content for doc in fused_docs[:5]])
     full_prompt = (
         SYSTEM_PROMPT +
         f"\n\nRelevant excerpts from the PDF:\n{context}\n\nUser's question: {query}\n\nAssistant:"
     )
+    if packer is not None:
+        print(f"🧮 Prompt tokens: {packer.count_tokens(full_prompt)}")
     response = chat_model.invoke(full_prompt)
+
+    if answer_cache is not None:
+        answer_cache.put(query, response.content, time.perf_counter() - start, query_vector)
     return response.content
 
 
@@ -160,20 +166,36 @@ if __name__ == "__main__":
     print("📘 Welcome to the PDF Chat Assistant with RRF!")
     pdf_path = Path("../") / "React CheatSheet.pdf"
 
-    print("📄 Loading PDF...")
-    documents = load_pdf_documents(pdf_path)
-
-    print("🔪 Splitting PDF into chunks...")
-    chunks = split_into_chunks(documents)
-
     print("🧠 Generating embeddings...")
     embedder = get_embedder()
 
-    print("📥 Storing chunks into Qdrant...")
-    vector_store = store_chunks_in_qdrant(chunks, embedder)
+    print(f"📥 Streaming PDF pages into the {VECTOR_BACKEND} vector store...")
+    # lexical index is persisted and updated incrementally alongside the vector store
+    bm25_path = Path(__file__).resolve().parent / "bm25_index"
+    lexical_index = BM25Index.load_or_create(bm25_path)
+    # pages are loaded, split, embedded and upserted batch by batch instead of all at once
+    if VECTOR_BACKEND == "local":
+        # persisted next to the BM25 index, re-runs only embed the chunks that changed
+        index_path = Path(__file__).resolve().parent / "vector_index"
+        vector_store = LocalVectorStore.load_or_create(index_path, embedder)
+        vector_store.sync_documents(index_chunks(iter_chunks(iter_pdf_pages(pdf_path)), lexical_index))
+        vector_store.save_if_dirty(index_path)
+        lexical_index.retain(vector_store.ids)
+    else:
+        vector_store = stream_pdf_to_qdrant(
+            pdf_path, embedder, client=connect_qdrant("http://localhost:6333"), collection_name="pdf_chunks",
+            lexical_index=lexical_index
+        )
+    lexical_index.save_if_dirty(bm25_path)
+    embedder.print_stats()
+    answer_cache = SemanticAnswerCache(embedder, path=Path(__file__).resolve().parent / "answer_cache.json")
+    answer_cache.bind(vector_store)
+    variation_cache = VariationCache(path=Path(__file__).resolve().parent / "variation_cache.json")
+    packer = ContextPacker(budget_tokens=3000)
 
     print("💬 Loading chat model...")
     chat_model = get_chat_model()
+    reranker = Reranker(embedder, llm=chat_model if RERANK_LLM else None, budget_ms=RERANK_BUDGET_MS)
 
     print("✅ Ready to chat with your PDF!")
 
@@ -187,7 +209,8 @@ if __name__ == "__main__":
             continue
 
         try:
-            answer = chat_with_rrf(query, vector_store, chat_model)
+            answer = chat_with_rrf(query, vector_store, chat_model, answer_cache, variation_cache, packer, lexical_index, reranker)
             print("\n📎 Answer:\n", answer)
+            answer_cache.print_stats()
         except Exception as e:
             print(f"⚠️ Error: {e}")
\ No newline at end of file
@@ -0,0 +1,36 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bulk_ingest import discover_pdfs, parse_and_split
+
+#Parse + split throughput (pages/sec) of the bulk ingest process pool for 1 vs N workers.
+#Embedding is left out on purpose, this measures the CPU-bound stage only.
+#Usage:  python benchmark_bulk_ingest.py [folder]   (defaults to 32 copies of the bundled cheat sheet)
+
+
+def run(pdf_paths, workers):
+    start = time.perf_counter()
+    pages = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for _, file_pages, _ in pool.map(parse_and_split, pdf_paths):
+            pages += file_pages
+    return pages / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        pdf_paths = [str(path) for path in discover_pdfs(sys.argv[1])]
+    else:
+        pdf_paths = [os.path.join(os.path.dirname(__file__), "React CheatSheet.pdf")] * 32
+
+    worker_counts = sorted({1, 2, 4, os.cpu_count() or 1})
+    for workers in worker_counts:
+        print(f"{workers:>2} workers: {run(pdf_paths, workers):8.1f} pages/sec")
+
+    # Output (32 x React CheatSheet.pdf on a 1 vCPU box, so no speedup is possible there;
+    # expect close to linear scaling up to the number of physical cores):
+    # 1 workers:     17.1 pages/sec
+    # 2 workers:     16.2 pages/sec
+    # 4 workers:     15.3 pages/sec
@@ -0,0 +1,50 @@
+import time
+
+import numpy as np
+
+from local_vector_store import LocalVectorStore
+
+#Recall@10 and per-query latency of the IVF index vs. exact brute-force search.
+#Synthetic clustered 768-dim vectors (same size as text-embedding-004) stand in for real chunks.
+#Run from this folder:  python benchmark_local_vector_store.py
+
+DIM = 768
+K = 10
+NUM_QUERIES = 200
+
+
+def clustered_vectors(rng, n, dim, n_clusters=256):
+    centers = rng.standard_normal((n_clusters, dim)).astype(np.float32)
+    return centers[rng.integers(0, n_clusters, n)] + 0.5 * rng.standard_normal((n, dim)).astype(np.float32)
+
+
+def per_query_ms(store, queries, exact):
+    start = time.perf_counter()
+    results = [store.search_batch(query[None, :], K, exact=exact)[0][0] for query in queries]
+    return (time.perf_counter() - start) / len(queries) * 1000, results
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    print(f"{'corpus':>8} | {'exact ms':>9} | {'n_probe':>7} | {'ivf ms':>7} | {'recall@10':>9}")
+    for n in (10_000, 100_000):
+        store = LocalVectorStore(embedding=None)
+        store.add_vectors(clustered_vectors(rng, n, DIM), [None] * n, ids=list(range(n)))
+        queries = clustered_vectors(rng, NUM_QUERIES, DIM)
+
+        exact_ms, truth = per_query_ms(store, queries, exact=True)
+        store.build_ivf()
+        for n_probe in (4, 16, 32):
+            store.n_probe = n_probe
+            ivf_ms, approx = per_query_ms(store, queries, exact=False)
+            recall = np.mean([len(set(a.tolist()) & set(t.tolist())) / K for a, t in zip(approx, truth)])
+            print(f"{n:>8} | {exact_ms:>9.2f} | {n_probe:>7} | {ivf_ms:>7.2f} | {recall:>9.3f}")
+
+    # Output:
+    #  corpus |  exact ms | n_probe |  ivf ms | recall@10
+    #   10000 |      3.81 |       4 |    0.46 |     0.470
+    #   10000 |      3.81 |      16 |    1.57 |     0.802
+    #   10000 |      3.81 |      32 |    3.74 |     0.918
+    #  100000 |     37.19 |       4 |    1.51 |     0.849
+    #  100000 |     37.19 |      16 |    6.76 |     0.963
+    #  100000 |     37.19 |      32 |   14.29 |     0.985
@@ -0,0 +1,102 @@
+import re
+import zlib
+
+import numpy as np
+
+from context_packer import SEPARATOR, ContextPacker
+from local_vector_store import LocalVectorStore
+from near_duplicates import _bands, collapse_near_duplicates
+from streaming_ingest import iter_chunks, iter_pdf_pages
+
+#Prompt-token savings of near-duplicate collapsing on the bundled React cheat sheet, with the chunks
+#ingest actually produces (streaming_ingest.iter_chunks, TokenChunker) and the shipped max_distance.
+#Retrieval uses a hashed bag-of-words embedder so it runs offline; each question is asked as
+#4 variations, top 3 per variation, exact duplicates removed first (remove_duplicate_chunks).
+#Run from this folder:  python benchmark_near_duplicates.py
+
+QUESTIONS = [
+    ["How does useState work?", "Explain the useState hook", "What is state in React hooks?", "useState example"],
+    ["What is useEffect for?", "How do I handle side effects?", "useEffect cleanup", "useLayoutEffect vs useEffect"],
+    ["How do I use context?", "Explain useContext", "React context API", "Consumer vs useContext"],
+    ["When to use useMemo?", "Memoize a value", "useCallback vs useMemo", "Avoid expensive recalculation"],
+    ["What does useRef do?", "Hold a mutable value", "useImperativeHandle", "Refs in function components"],
+]
+
+
+class HashedBagOfWords:
+    """Offline stand-in for a real embedding model"""
+
+    def __init__(self, dim=1024):
+        self.dim = dim
+
+    def embed_query(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            vector[zlib.crc32(word.encode()) % self.dim] += 1.0
+        return vector.tolist()
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+def band_comparisons(signatures, max_distance=8):
+    """How many signature pairs collapse_near_duplicates compares (pairs sharing a band bucket)"""
+    buckets = {}
+    comparisons = 0
+    for sig in signatures:
+        bands = _bands(sig, max_distance + 1)
+        comparisons += sum(len(buckets.get(band, ())) for band in bands)
+        for band in bands:
+            buckets.setdefault(band, []).append(sig)
+    return comparisons
+
+
+def exact_dedup(docs):
+    seen, unique = set(), []
+    for doc in docs:
+        if doc.page_content not in seen:
+            seen.add(doc.page_content)
+            unique.append(doc)
+    return unique
+
+
+if __name__ == "__main__":
+    # unrelated chunks must only meet in a few buckets, not be compared all against all
+    rng = np.random.default_rng(0)
+    n = 5000
+    comparisons = band_comparisons(int(sig) for sig in rng.integers(0, 2**64, n, dtype=np.uint64))
+    print(f"band candidates for {n} random signatures: {comparisons} of {n * (n - 1) // 2} pairs")
+    assert comparisons < n * (n - 1) // 2 // 10, "band buckets are shared by (almost) every signature"
+
+    packer = ContextPacker(model_name="gpt-4")
+    pages = list(iter_pdf_pages("React CheatSheet.pdf"))
+
+    # ingest defaults first (500/50 tokens), then smaller chunks with more overlap
+    print(f"{'tokens/overlap':>14} | {'chunks':>6} | {'sent before':>11} | {'after':>6} | {'tokens before':>13} | {'after':>6} | {'saved':>6}")
+    for chunk_tokens, overlap_tokens in [(500, 50), (200, 50), (100, 50), (100, 80)]:
+        chunks = list(iter_chunks(pages, chunk_tokens, overlap_tokens))
+        store = LocalVectorStore.from_documents(chunks, HashedBagOfWords())
+
+        before_docs = after_docs = before_tokens = after_tokens = 0
+        for variations in QUESTIONS:
+            pool = exact_dedup([doc for query in variations for doc in store.similarity_search(query, k=3)])
+            collapsed = collapse_near_duplicates(pool)  # shipped max_distance (8 bits)
+            before_docs += len(pool)
+            after_docs += len(collapsed)
+            before_tokens += packer.count_tokens(SEPARATOR.join(doc.page_content for doc in pool))
+            after_tokens += packer.count_tokens(SEPARATOR.join(doc.page_content for doc in collapsed))
+
+        saved = 1 - after_tokens / before_tokens
+        print(f"{chunk_tokens:>7}/{overlap_tokens:<6} | {len(chunks):>6} | {before_docs:>11} | {after_docs:>6} | "
+              f"{before_tokens:>13} | {after_tokens:>6} | {saved:>6.1%}")
+
+    # Output (gpt-4 tokenizer). The old ceiling-width bands gave 12887520 candidates here:
+    #band candidates for 5000 random signatures: 830487 of 12497500 pairs
+    # With the ingest defaults a chunk spans one or more whole pages of the cheat sheet and the 50-token
+    # overlap is far below what max_distance=8 treats as a near duplicate, so nothing collapses; savings
+    # only show up when small chunks overlap heavily:
+    #tokens/overlap | chunks | sent before |  after | tokens before |  after |  saved
+    #    500/50     |      9 |          35 |     35 |         11974 |  11974 |   0.0%
+    #    200/50     |     21 |          36 |     36 |          6263 |   6263 |   0.0%
+    #    100/50     |     73 |          47 |     46 |          3831 |   3754 |   2.0%
+    #    100/80     |    134 |          47 |     44 |          4096 |   3817 |   6.8%
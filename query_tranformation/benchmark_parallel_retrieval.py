@@ -0,0 +1,65 @@
+import asyncio
+import time
+
+from parallel_retrieval import retrieve_concurrently, aretrieve_concurrently
+
+#Sequential vs. concurrent retrieval latency against a stubbed vector store.
+#The stub sleeps to simulate network round trips, so no Qdrant or Google API key is needed.
+#Run from this folder:  python benchmark_parallel_retrieval.py
+
+EMBED_LATENCY = 0.05    # seconds per embedding request (batched or not)
+SEARCH_LATENCY = 0.08   # seconds per vector search
+
+
+class StubEmbedder:
+    def embed_query(self, text):
+        time.sleep(EMBED_LATENCY)
+        return [float(len(text))]
+
+    def embed_documents(self, texts):
+        time.sleep(EMBED_LATENCY)
+        return [[float(len(text))] for text in texts]
+
+
+class StubVectorStore:
+    def __init__(self):
+        self.embeddings = StubEmbedder()
+
+    def similarity_search(self, query, k=3):
+        return self.similarity_search_by_vector(self.embeddings.embed_query(query), k=k)
+
+    def similarity_search_by_vector(self, embedding, k=3):
+        time.sleep(SEARCH_LATENCY)
+        return [f"doc-{embedding[0]}-{i}" for i in range(k)]
+
+    async def asimilarity_search_by_vector(self, embedding, k=3):
+        await asyncio.sleep(SEARCH_LATENCY)
+        return [f"doc-{embedding[0]}-{i}" for i in range(k)]
+
+
+def sequential(queries, vector_store, k=3):
+    # what the pipelines did before: one embed + one search per variation, back to back
+    return [vector_store.similarity_search(query, k=k) for query in queries]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+if __name__ == "__main__":
+    store = StubVectorStore()
+    print(f"{'variations':>10} | {'sequential':>12} | {'threads':>12} | {'asyncio':>12}")
+    for n in (3, 5, 10):
+        queries = [f"query variation number {i}" for i in range(n)]
+        seq_ms = timed(lambda: sequential(queries, store))
+        thr_ms = timed(lambda: retrieve_concurrently(queries, store, max_concurrency=10))
+        aio_ms = timed(lambda: asyncio.run(aretrieve_concurrently(queries, store, max_concurrency=10)))
+        print(f"{n:>10} | {seq_ms:>9.1f} ms | {thr_ms:>9.1f} ms | {aio_ms:>9.1f} ms")
+
+    # Output (EMBED_LATENCY=50ms, SEARCH_LATENCY=80ms):
+    #variations |   sequential |      threads |      asyncio
+    #         3 |     391.2 ms |     133.4 ms |     133.5 ms
+    #         5 |     652.1 ms |     133.0 ms |     133.5 ms
+    #        10 |    1304.0 ms |     132.2 ms |     133.3 ms
@@ -0,0 +1,51 @@
+import timeit
+from collections import defaultdict
+
+import numpy as np
+
+from rank_fusion import fuse
+
+#Micro-benchmark of the fusion engine: hundreds of ranked lists of depth 100 over a 10k-chunk corpus.
+#Run from this folder:  python benchmark_rank_fusion.py
+
+NUM_LISTS = 300
+DEPTH = 100
+CORPUS = 10_000
+TOP_K = 10
+
+
+def dict_rrf(ids, k=60):
+    # the old rank_the_queries approach: python dict accumulation + full sort
+    scores = defaultdict(float)
+    for row in ids.tolist():
+        for rank, doc in enumerate(row, start=1):
+            scores[doc] += 1 / (k + rank)
+    return sorted(scores.items(), key=lambda x: x[1], reverse=True)[:TOP_K]
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    ids = np.stack([rng.choice(CORPUS, DEPTH, replace=False) for _ in range(NUM_LISTS)])
+    scores = np.sort(rng.random((NUM_LISTS, DEPTH)), axis=1)[:, ::-1]
+    weights = rng.random(NUM_LISTS)
+
+    runs = 200
+    cases = {
+        "dict rrf (old)": lambda: dict_rrf(ids),
+        "rrf": lambda: fuse(ids, "rrf", top_k=TOP_K, num_docs=CORPUS),
+        "weighted_rrf": lambda: fuse(ids, "weighted_rrf", weights=weights, top_k=TOP_K, num_docs=CORPUS),
+        "combsum": lambda: fuse(ids, "combsum", scores=scores, top_k=TOP_K, num_docs=CORPUS),
+        "combmnz": lambda: fuse(ids, "combmnz", scores=scores, top_k=TOP_K, num_docs=CORPUS),
+    }
+    print(f"{NUM_LISTS} lists x depth {DEPTH}, corpus {CORPUS}, top {TOP_K}")
+    for name, fn in cases.items():
+        ms = timeit.timeit(fn, number=runs) / runs * 1000
+        print(f"{name:>15}: {ms:7.3f} ms")
+
+    # Output:
+    #300 lists x depth 100, corpus 10000, top 10
+    # dict rrf (old):  16.554 ms
+    #            rrf:   0.438 ms
+    #   weighted_rrf:   0.432 ms
+    #        combsum:   0.471 ms
+    #        combmnz:   0.491 ms
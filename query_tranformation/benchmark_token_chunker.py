@@ -0,0 +1,85 @@
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from streaming_ingest import iter_pdf_pages
+from token_chunker import TokenChunker
+
+# tokenization.py lives at the repo root
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+import tokenization
+
+#Token-aware TokenChunker(500 tokens, 50 overlap) vs the old RecursiveCharacterTextSplitter(2000 chars,
+#200 overlap): splitting speed and how evenly sized the chunks are in tokens (what embedding limits
+#and prompt budgets care about). Corpora: the bundled cheat sheet and 2000 synthetic pages of prose
+#with headings, or any PDF given on the command line. Token counts use the gpt-4 (cl100k) tokenizer;
+#the count cache is cleared before each timed run.
+#Run from this folder:  python benchmark_token_chunker.py [pdf_path]
+
+MODEL = "gpt-4"
+WORDS = ("state hook render component effect memo reference context reducer props event "
+         "update value function callback dependency array mount cleanup layout").split()
+
+
+def synthetic_pages(count, seed=0):
+    rng = random.Random(seed)
+
+    def sentence():
+        words = rng.choices(WORDS, k=rng.randint(6, 40))
+        return " ".join(words).capitalize() + rng.choice([".", ".", ".", "?", "!"])
+
+    pages = []
+    for number in range(count):
+        blocks = []
+        for _ in range(rng.randint(2, 6)):
+            if rng.random() < 0.4:
+                blocks.append(f"{rng.choice(WORDS).title()} {rng.choice(WORDS)}")  # heading
+            lines = " ".join(sentence() for _ in range(rng.randint(1, 8)))
+            blocks.append("\n".join(lines[i:i + 90] for i in range(0, len(lines), 90)))  # wrapped lines
+        pages.append(Document(page_content="\n\n".join(blocks), metadata={"source": "synthetic", "page": number}))
+    return pages
+
+
+def char_split(pages):
+    splitter = RecursiveCharacterTextSplitter(chunk_size=2000, chunk_overlap=200)
+    return [chunk for page in pages for chunk in splitter.split_documents([page])]
+
+
+def token_split(pages):
+    return list(TokenChunker(chunk_tokens=500, overlap_tokens=50, model_name=MODEL).iter_chunks(pages))
+
+
+def report(corpus, label, split, pages, tokenizer):
+    tokenization._COUNT_CACHES.clear()
+    start = time.perf_counter()
+    chunks = split(pages)
+    elapsed = time.perf_counter() - start
+    sizes = np.array([len(tokenizer.encode(chunk.page_content)) for chunk in chunks])
+    print(f"{corpus:>10} | {label:>6} | {elapsed:>7.2f} | {len(chunks):>6} | {sizes.mean():>6.0f} | "
+          f"{sizes.std():>6.0f} | {sizes.std() / sizes.mean():>5.2f} | {sizes.min():>5} | {sizes.max():>5}")
+
+
+if __name__ == "__main__":
+    tokenizer = tokenization.Tokenizer(MODEL)
+    corpora = [("cheatsheet", list(iter_pdf_pages("React CheatSheet.pdf"))), ("synthetic", synthetic_pages(2000))]
+    if len(sys.argv) > 1:
+        corpora = [(sys.argv[1][-10:], list(iter_pdf_pages(sys.argv[1])))]
+
+    print(f"{'corpus':>10} | {'split':>6} | {'seconds':>7} | {'chunks':>6} | {'mean':>6} | {'std':>6} | {'cv':>5} | {'min':>5} | {'max':>5}")
+    for corpus, pages in corpora:
+        report(corpus, "chars", char_split, pages, tokenizer)
+        report(corpus, "tokens", token_split, pages, tokenizer)
+
+    # Output (1 vCPU). Token-aware splitting pays for tokenizing every sentence once (~0.5 s of the
+    # 1.46 s is tiktoken itself), the character splitter never tokenizes; in exchange chunk sizes in
+    # tokens are far more even (cv 0.19 vs 0.29-0.38) and there are no 2-5 token scraps:
+    #    corpus |  split | seconds | chunks |   mean |    std |    cv |   min |   max
+    #cheatsheet |  chars |    0.00 |     14 |    215 |     81 |  0.38 |     5 |   332
+    #cheatsheet | tokens |    0.01 |      9 |    339 |     64 |  0.19 |   251 |   470
+    # synthetic |  chars |    0.17 |   4585 |    219 |     65 |  0.29 |     2 |   335
+    # synthetic | tokens |    1.46 |   2870 |    369 |     69 |  0.19 |   148 |   489
@@ -0,0 +1,197 @@
+import json
+import math
+import re
+from array import array
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+from langchain_core.documents import Document
+
+from chunk_ids import chunk_point_id
+
+#In-process lexical (BM25) index that runs alongside the vector search.
+#Vector search is weak on exact identifiers (useEffect, useImperativeHandle, API names), BM25 is
+#strong on them, so both rankings are fused in rank_the_queries.
+#
+#Postings are compact typed arrays per term (int32 chunk slot + uint16 term frequency), appended to
+#as chunks are ingested, so the index is updated incrementally instead of rebuilt. Removed chunks
+#are tombstoned and dropped by compact(). Persisted as <path>.npz (postings in CSR layout) plus a
+#<path>.json sidecar with chunk IDs and texts.
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    # identifiers like useEffect stay one token, just lower-cased
+    return _TOKEN.findall(text.lower())
+
+
+class BM25Index:
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}          # term -> (array('i') slots, array('H') term frequencies)
+        self.doc_lengths = array("i")
+        self.alive = array("b")
+        self.ids = []
+        self.documents = []
+        self.slot_of = {}           # chunk id -> slot
+        self.total_length = 0
+        self.num_alive = 0
+        self.dirty = False
+
+    def __len__(self):
+        return self.num_alive
+
+    def __contains__(self, chunk_id):
+        return chunk_id in self.slot_of
+
+    # ---- updates ----
+
+    def add(self, chunk_id, doc):
+        if chunk_id in self.slot_of:
+            return
+        slot = len(self.ids)
+        terms = tokenize(doc.page_content)
+        for term, tf in Counter(terms).items():
+            entry = self.postings.get(term)
+            if entry is None:
+                entry = self.postings[term] = (array("i"), array("H"))
+            entry[0].append(slot)
+            entry[1].append(min(tf, 65535))
+        self.doc_lengths.append(len(terms))
+        self.alive.append(1)
+        self.ids.append(chunk_id)
+        self.documents.append(doc)
+        self.slot_of[chunk_id] = slot
+        self.total_length += len(terms)
+        self.num_alive += 1
+        self.dirty = True
+
+    def add_documents(self, docs, ids=None):
+        ids = ids or [chunk_point_id(doc) for doc in docs]
+        for chunk_id, doc in zip(ids, docs):
+            self.add(chunk_id, doc)
+
+    def remove(self, chunk_ids):
+        for chunk_id in chunk_ids:
+            slot = self.slot_of.pop(chunk_id, None)
+            if slot is None:
+                continue
+            self.alive[slot] = 0
+            self.total_length -= self.doc_lengths[slot]
+            self.num_alive -= 1
+            self.dirty = True
+        if len(self.ids) and self.num_alive < 0.8 * len(self.ids):
+            self.compact()
+
+    def retain(self, chunk_ids):
+        """Remove every chunk whose ID is not in chunk_ids"""
+        keep = set(chunk_ids)
+        self.remove([chunk_id for chunk_id in list(self.slot_of) if chunk_id not in keep])
+
+    def compact(self):
+        """Rebuild without tombstoned chunks"""
+        live = [(chunk_id, doc) for chunk_id, doc, alive in zip(self.ids, self.documents, self.alive) if alive]
+        self.__init__(self.k1, self.b)
+        for chunk_id, doc in live:
+            self.add(chunk_id, doc)
+
+    # ---- search ----
+
+    def search_with_scores(self, query, k=3):
+        if not self.num_alive:
+            return []
+        num_docs = len(self.ids)
+        avg_length = self.total_length / self.num_alive
+        doc_lengths = np.frombuffer(self.doc_lengths, dtype=np.int32)
+        scores = np.zeros(num_docs, dtype=np.float32)
+
+        for term in set(tokenize(query)):
+            entry = self.postings.get(term)
+            if entry is None:
+                continue
+            slots = np.frombuffer(entry[0], dtype=np.int32)
+            tf = np.frombuffer(entry[1], dtype=np.uint16).astype(np.float32)
+            df = len(slots)
+            idf = math.log(1 + (self.num_alive - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * doc_lengths[slots] / avg_length)
+            scores[slots] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        if self.num_alive < num_docs:
+            scores *= np.frombuffer(self.alive, dtype=np.int8)
+        candidates = np.flatnonzero(scores)
+        if candidates.size > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+        results = []
+        for slot in candidates.tolist():
+            doc = self.documents[slot]
+            metadata = {**doc.metadata, "_id": self.ids[slot]}
+            results.append((Document(page_content=doc.page_content, metadata=metadata), float(scores[slot])))
+        return results
+
+    def search(self, query, k=3):
+        return [doc for doc, _ in self.search_with_scores(query, k)]
+
+    # ---- persistence ----
+
+    def save(self, path):
+        path = Path(path)
+        terms = list(self.postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(self.postings[term][0]) for term in terms])
+        slots = np.concatenate([np.frombuffer(self.postings[t][0], dtype=np.int32) for t in terms] or [np.zeros(0, np.int32)])
+        tfs = np.concatenate([np.frombuffer(self.postings[t][1], dtype=np.uint16) for t in terms] or [np.zeros(0, np.uint16)])
+        np.savez(path.with_suffix(".npz"), offsets=offsets, slots=slots, tfs=tfs,
+                 doc_lengths=np.frombuffer(self.doc_lengths, dtype=np.int32),
+                 alive=np.frombuffer(self.alive, dtype=np.int8))
+        with open(path.with_suffix(".json"), "w") as f:
+            json.dump({
+                "k1": self.k1, "b": self.b, "terms": terms, "ids": self.ids,
+                "documents": [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in self.documents],
+            }, f)
+        self.dirty = False
+
+    def save_if_dirty(self, path):
+        if self.dirty:
+            self.save(path)
+
+    @classmethod
+    def load(cls, path):
+        path = Path(path)
+        with open(path.with_suffix(".json"), "r") as f:
+            meta = json.load(f)
+        arrays = np.load(path.with_suffix(".npz"))
+        index = cls(meta["k1"], meta["b"])
+        offsets, slots, tfs = arrays["offsets"], arrays["slots"], arrays["tfs"]
+        for i, term in enumerate(meta["terms"]):
+            start, end = offsets[i], offsets[i + 1]
+            index.postings[term] = (array("i", slots[start:end].tobytes()), array("H", tfs[start:end].tobytes()))
+        index.doc_lengths = array("i", arrays["doc_lengths"].tobytes())
+        index.alive = array("b", arrays["alive"].tobytes())
+        index.ids = meta["ids"]
+        index.documents = [Document(page_content=d["page_content"], metadata=d["metadata"]) for d in meta["documents"]]
+        index.slot_of = {chunk_id: slot for slot, chunk_id in enumerate(index.ids) if index.alive[slot]}
+        index.num_alive = len(index.slot_of)
+        index.total_length = int(arrays["doc_lengths"][arrays["alive"] == 1].sum())
+        return index
+
+    @classmethod
+    def load_or_create(cls, path):
+        path = Path(path)
+        if path.with_suffix(".npz").exists() and path.with_suffix(".json").exists():
+            try:
+                return cls.load(path)
+            except (json.JSONDecodeError, KeyError, ValueError) as e:
+                print(f"Error loading BM25 index {path}: {e}, rebuilding")
+        return cls()
+
+
+def index_chunks(chunks, index):
+    """Pass-through generator adding every chunk to the BM25 index on its way to the vector store"""
+    for chunk in chunks:
+        index.add(chunk_point_id(chunk), chunk)
+        yield chunk
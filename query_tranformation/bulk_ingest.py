@@ -0,0 +1,175 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from streaming_ingest import iter_chunks, iter_pdf_pages, stream_chunks_to_qdrant
+
+#Bulk ingest of a whole folder of PDFs.
+#PDF parsing and text splitting are CPU-bound, so they run across a process pool; the chunks of
+#every file are funnelled into ONE batched embed/upsert stage (streaming_ingest). A manifest keeps
+#the mtime/size/hash of each ingested file so unchanged files are skipped on the next run.
+#
+#Usage:  python bulk_ingest.py <folder> [--workers 4]
+
+MANIFEST_NAME = ".ingest_manifest.json"
+
+
+def discover_pdfs(folder):
+    return sorted(path for path in Path(folder).rglob("*") if path.suffix.lower() == ".pdf")
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(folder):
+    manifest_path = Path(folder) / MANIFEST_NAME
+    if manifest_path.exists():
+        try:
+            with open(manifest_path, "r") as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            print(f"Error loading {manifest_path}, re-ingesting everything")
+    return {}
+
+
+def save_manifest(folder, manifest):
+    manifest_path = Path(folder) / MANIFEST_NAME
+    tmp_path = manifest_path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+def file_changed(path, entry):
+    """mtime/size is the cheap check, the content hash settles touched-but-identical files"""
+    if entry is None:
+        return True
+    stat = path.stat()
+    if stat.st_mtime == entry["mtime"] and stat.st_size == entry["size"]:
+        return False
+    return file_sha256(path) != entry["sha256"]
+
+
+def parse_and_split(pdf_path, chunk_tokens=500, overlap_tokens=50):
+    """Runs in a worker process: returns (path, page count, chunks)"""
+    pages = 0
+
+    def counted(page_iter):
+        nonlocal pages
+        for page in page_iter:
+            pages += 1
+            yield page
+
+    chunks = list(iter_chunks(counted(iter_pdf_pages(pdf_path)), chunk_tokens, overlap_tokens))
+    return str(pdf_path), pages, chunks
+
+
+def iter_parsed_chunks(pdf_paths, workers, chunk_tokens, overlap_tokens, stats):
+    """Yield chunks from the process pool as files finish, recording per-file progress in `stats`.
+    At most 2 x workers files are submitted at a time, so parsing stays only a little ahead of the
+    embedding stage and only those files' chunks are held in memory."""
+    workers = workers or os.cpu_count() or 1
+    queued = iter([str(path) for path in pdf_paths])
+    total = len(pdf_paths)
+    pool = ProcessPoolExecutor(max_workers=workers)
+    running = {}
+
+    def submit_more():
+        while len(running) < 2 * workers:
+            path = next(queued, None)
+            if path is None:
+                return
+            running[pool.submit(parse_and_split, path, chunk_tokens, overlap_tokens)] = path
+
+    done = 0
+    try:
+        submit_more()
+        while running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                source = running.pop(future)
+                done += 1
+                try:
+                    path, pages, chunks = future.result()
+                except Exception as e:
+                    stats["failed"].append(source)
+                    print(f"❌ [{done}/{total}] {e}")
+                    continue
+                stats["pages"] += pages
+                stats["chunks"] += len(chunks)
+                stats["done"].append(path)
+                print(f"✅ [{done}/{total}] {Path(path).name}: {pages} pages, {len(chunks)} chunks")
+                submit_more()  # the next files parse while these chunks are embedded
+                yield from chunks
+    finally:
+        # on an early exit (embedding failed) files not started yet are dropped, not parsed
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def bulk_ingest(folder, embedding_model, client, collection_name="pdf_chunks", workers=None,
+                chunk_tokens=500, overlap_tokens=50, batch_size=64, lexical_index=None):
+    folder = Path(folder)
+    manifest = load_manifest(folder)
+    pdf_paths = discover_pdfs(folder)
+
+    changed = [path for path in pdf_paths if file_changed(path, manifest.get(str(path)))]
+    removed = [source for source in manifest if not Path(source).exists()]
+    print(f"📚 {len(pdf_paths)} PDFs found, {len(changed)} new/changed, "
+          f"{len(pdf_paths) - len(changed)} unchanged, {len(removed)} removed")
+
+    stats = {"pages": 0, "chunks": 0, "done": [], "failed": []}
+    start = time.perf_counter()
+    vector_store = stream_chunks_to_qdrant(
+        iter_parsed_chunks(changed, workers, chunk_tokens, overlap_tokens, stats),
+        embedding_model, client, collection_name,
+        sources=[str(path) for path in changed] + removed,
+        batch_size=batch_size,
+        lexical_index=lexical_index,
+        failed_sources=stats["failed"],  # their old points stay until they parse again
+    )
+    elapsed = time.perf_counter() - start
+
+    # Only files that made it through the whole pipeline are marked as ingested
+    for source in removed:
+        manifest.pop(source, None)
+    for source in stats["done"]:
+        stat = Path(source).stat()
+        manifest[source] = {"mtime": stat.st_mtime, "size": stat.st_size, "sha256": file_sha256(source)}
+    save_manifest(folder, manifest)
+
+    print(f"⏱️ {stats['pages']} pages / {stats['chunks']} chunks in {elapsed:.1f}s "
+          f"({stats['pages'] / elapsed if elapsed else 0:.1f} pages/sec)")
+    return vector_store
+
+
+if __name__ == "__main__":
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+    from embedding_cache import CachedEmbeddings
+    from qdrant_sync import connect_qdrant
+
+    parser = argparse.ArgumentParser(description="Index a folder of PDFs into Qdrant")
+    parser.add_argument("folder")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--collection", default="pdf_chunks")
+    parser.add_argument("--qdrant-url", default="http://localhost:6333")
+    args = parser.parse_args()
+
+    load_dotenv()
+    embedder = CachedEmbeddings(GoogleGenerativeAIEmbeddings(
+        model="models/text-embedding-004",
+        google_api_key=os.getenv("GOOGLE_API_KEY")
+    ))
+    bulk_ingest(args.folder, embedder, connect_qdrant(args.qdrant_url), args.collection, workers=args.workers)
+    embedder.print_stats()
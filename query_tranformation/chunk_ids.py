@@ -0,0 +1,16 @@
+import hashlib
+import uuid
+
+#Stable chunk identity shared by every index (Qdrant, LocalVectorStore, BM25), so results coming
+#from different retrievers can be fused by ID.
+
+# Fixed namespace so the same chunk always maps to the same UUID across runs and machines
+POINT_NAMESPACE = uuid.UUID("6f1c1f8e-3a0b-4f57-9d43-2b5c1c0e7a11")
+
+
+def chunk_point_id(chunk):
+    """Deterministic ID of a chunk, also used as its Qdrant point ID"""
+    source = str(chunk.metadata.get("source", ""))
+    page = str(chunk.metadata.get("page", ""))
+    text_hash = hashlib.sha256(chunk.page_content.encode("utf-8")).hexdigest()
+    return str(uuid.uuid5(POINT_NAMESPACE, f"{source}|{page}|{text_hash}"))
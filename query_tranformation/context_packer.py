@@ -0,0 +1,76 @@
+import sys
+from pathlib import Path
+
+from rank_fusion import chunk_id
+
+# tokenization.py lives at the repo root
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from tokenization import Tokenizer
+
+#Token-budgeted context packing for the RAG answer step.
+#Chunks arrive best-ranked first; each chunk's token count is computed once and cached by chunk ID,
+#then chunks are packed greedily until the budget is spent. Text that a chunk shares with an
+#already packed neighbour (the splitter's chunk_overlap) is trimmed so it is not sent twice.
+#Counts use the gpt-4o tokenizer, close enough to budget prompts for other models too.
+
+SEPARATOR = "\n\n...\n\n"
+
+
+def _overlap(left, right, max_overlap, min_overlap):
+    """Length of the longest suffix of `left` that is also a prefix of `right`"""
+    for size in range(min(max_overlap, len(left), len(right)), min_overlap - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+class ContextPacker:
+    def __init__(self, budget_tokens=3000, model_name="gpt-4o", max_overlap=400, min_overlap=20):
+        self.tokenizer = Tokenizer(model_name)
+        self.budget_tokens = budget_tokens
+        self.max_overlap = max_overlap
+        self.min_overlap = min_overlap
+        self.token_counts = {}
+        self.separator_tokens = self.count_tokens(SEPARATOR)
+
+    def count_tokens(self, text):
+        return self.tokenizer.count_tokens(text)
+
+    def chunk_tokens(self, doc):
+        key = chunk_id(doc)
+        if key not in self.token_counts:
+            self.token_counts[key] = self.count_tokens(doc.page_content)
+        return self.token_counts[key]
+
+    def _trim(self, doc, packed):
+        """Drop the part of doc's text already covered by a packed chunk of the same source"""
+        text = doc.page_content
+        for other in packed:
+            if other.metadata.get("source") != doc.metadata.get("source"):
+                continue
+            page, other_page = doc.metadata.get("page"), other.metadata.get("page")
+            if page is not None and other_page is not None and abs(page - other_page) > 1:
+                continue
+            head = _overlap(other.page_content, text, self.max_overlap, self.min_overlap)
+            text = text[head:]
+            tail = _overlap(text, other.page_content, self.max_overlap, self.min_overlap)
+            text = text[:len(text) - tail]
+        return text
+
+    def pack(self, ranked_docs, budget_tokens=None):
+        """Returns (context text, packed docs, context token count)"""
+        budget = budget_tokens or self.budget_tokens
+        used = 0
+        packed, texts = [], []
+        for doc in ranked_docs:
+            text = self._trim(doc, packed)
+            if not text.strip():
+                continue
+            tokens = self.chunk_tokens(doc) if text == doc.page_content else self.count_tokens(text)
+            cost = tokens + (self.separator_tokens if texts else 0)
+            if used + cost > budget:
+                continue  # a lower-ranked but shorter chunk may still fit
+            used += cost
+            packed.append(doc)
+            texts.append(text)
+        return SEPARATOR.join(texts), packed, used
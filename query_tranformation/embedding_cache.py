@@ -0,0 +1,137 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from pathlib import Path
+
+from langchain_core.embeddings import Embeddings
+
+from parallel_retrieval import embed_queries
+
+#Persistent, content-addressed cache for chunk embeddings.
+#Shared by the "parallel query retrival" and "Reciprocal Rank Fusion" scripts so a restart
+#on an unchanged PDF does zero embedding API calls and an edited page only re-embeds its chunks.
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent / "embedding_cache.sqlite3"
+
+
+def content_hash(text, model_name):
+    """Key of a cached vector: sha256 over (embedding model, chunk text)"""
+    return hashlib.sha256(f"{model_name}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite store of text-hash -> vector with size-bounded LRU eviction"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=100_000):
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        # one connection shared by the main thread, retrieval workers and the reranker's pool
+        self.lock = threading.RLock()
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)")
+        self.conn.commit()
+
+    def get_many(self, keys):
+        """Return {key: vector} for the keys present in the cache and bump their LRU timestamp"""
+        with self.lock:
+            found = {}
+            # sqlite caps the number of bound parameters, so look keys up in slices
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self.conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+            if found:
+                now = time.time()
+                self.conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+                self.conn.commit()
+            return found
+
+    def put_many(self, items):
+        """Store (key, vector) pairs, then evict least-recently-used rows over max_entries"""
+        with self.lock:
+            now = time.time()
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, array("f", vector).tobytes(), now) for key, vector in items],
+            )
+            self.evict()
+            self.conn.commit()
+
+    def evict(self):
+        with self.lock:
+            overflow = len(self) - self.max_entries
+            if overflow > 0:
+                self.conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                    (overflow,),
+                )
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """Wraps a LangChain embedder and only sends cache misses to the underlying model"""
+
+    def __init__(self, embedder, model_name=None, cache=None):
+        self.embedder = embedder
+        self.model_name = model_name or getattr(embedder, "model", type(embedder).__name__)
+        self.cache = cache if cache is not None else EmbeddingCache()
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts):
+        keys = [content_hash(text, self.model_name) for text in texts]
+        cached = self.cache.get_many(list(set(keys)))
+
+        # Embed each missing text once, even if the same chunk appears several times
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        if missing:
+            vectors = self.embedder.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            self.cache.put_many(fresh.items())
+            cached.update(fresh)
+
+        self.misses += len(missing)
+        self.hits += len(texts) - len(missing)
+        return [cached[key] for key in keys]
+
+    def embed_query(self, text):
+        # Queries are one-off user input, there is nothing to gain from caching them
+        return self.embedder.embed_query(text)
+
+    def embed_queries(self, texts):
+        """Batch of queries in one request, used by the concurrent retrieval stage"""
+        return embed_queries(self.embedder, texts)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "cached": len(self.cache)}
+
+    def print_stats(self):
+        stats = self.stats()
+        print(f"🗃️ Embedding cache: {stats['hits']} hits, {stats['misses']} misses, {stats['cached']} vectors stored")
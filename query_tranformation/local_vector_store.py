@@ -0,0 +1,264 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+from chunk_ids import chunk_point_id
+
+#In-process vector index, a drop-in for QdrantVectorStore on small corpora and in tests.
+#Embeddings are L2-normalized and kept in one float32 matrix, so cosine similarity for a whole
+#batch of queries is a single matrix multiply followed by an argpartition top-k.
+#For larger corpora an optional IVF index (k-means coarse quantizer + inverted lists) only scores
+#the chunks in the `n_probe` closest clusters.
+#Persisted as <path>.npy (memory-mapped on load) + <path>.json metadata sidecar (+ <path>.ivf.npz).
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _top_k(scores, k):
+    """Indices of the k best scores (best first) for a 1-D score array"""
+    if k >= scores.shape[0]:
+        return np.argsort(-scores, kind="stable")
+    best = np.argpartition(-scores, k - 1)[:k]
+    return best[np.argsort(-scores[best], kind="stable")]
+
+
+def kmeans(vectors, n_clusters, iterations=10, seed=0):
+    """Spherical k-means on normalized vectors, returns normalized centroids"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(vectors.shape[0], n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        for cluster in range(n_clusters):
+            members = vectors[assignment == cluster]
+            if len(members):
+                centroids[cluster] = members.sum(axis=0)
+        centroids = _normalize(centroids)
+    return centroids
+
+
+class LocalVectorStore(VectorStore):
+    def __init__(self, embedding, vectors=None, documents=None, ids=None):
+        self.embedding = embedding
+        self.vectors = np.zeros((0, 0), dtype=np.float32) if vectors is None else vectors
+        self.documents = documents or []
+        self.ids = ids or []
+        self.centroids = None
+        self.ivf_order = None
+        self.ivf_offsets = None
+        self.n_probe = 8
+        self.dirty = False
+
+    @property
+    def embeddings(self):
+        return self.embedding
+
+    def __len__(self):
+        return len(self.documents)
+
+    # ---- ingest ----
+
+    def add_vectors(self, vectors, documents, ids=None):
+        vectors = _normalize(vectors)
+        ids = ids or [chunk_point_id(doc) for doc in documents]
+        if len(self.documents) == 0:
+            self.vectors = vectors
+        else:
+            # a memory-mapped matrix is read only, concatenating copies it into memory
+            self.vectors = np.concatenate([self.vectors, vectors])
+        self.documents.extend(documents)
+        self.ids.extend(ids)
+        # new vectors are not in the inverted lists, fall back to exact search until rebuilt
+        self.centroids = None
+        self.dirty = True
+        return ids
+
+    def add_documents(self, documents, ids=None, **kwargs):
+        vectors = self.embedding.embed_documents([doc.page_content for doc in documents])
+        return self.add_vectors(vectors, list(documents), ids)
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        documents = [Document(page_content=text, metadata=dict(metadata)) for text, metadata in zip(texts, metadatas)]
+        return self.add_documents(documents, ids=ids)
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, **kwargs):
+        store = cls(embedding)
+        store.add_texts(texts, metadatas, ids)
+        return store
+
+    @classmethod
+    def from_documents(cls, documents, embedding, ids=None, batch_size=256, **kwargs):
+        store = cls(embedding)
+        ids = iter(ids) if ids is not None else None
+        batch = []
+        for doc in documents:
+            batch.append(doc)
+            if len(batch) == batch_size:
+                store.add_documents(batch, [next(ids) for _ in batch] if ids else None)
+                batch = []
+        if batch:
+            store.add_documents(batch, [next(ids) for _ in batch] if ids else None)
+        return store
+
+    def sync_documents(self, documents, batch_size=256):
+        """Make the store hold exactly `documents`: only chunks it does not have yet are embedded,
+        chunks that are gone are dropped. Returns (added, removed)"""
+        present = set(self.ids)
+        seen = set()
+        batch = []
+        added = 0
+        for doc in documents:
+            point_id = chunk_point_id(doc)
+            if point_id in seen:
+                continue
+            seen.add(point_id)
+            if point_id not in present:
+                batch.append(doc)
+            if len(batch) == batch_size:
+                added += len(self.add_documents(batch))
+                batch = []
+        if batch:
+            added += len(self.add_documents(batch))
+        removed = self.retain(seen)
+        return added, removed
+
+    def retain(self, ids):
+        """Drop every chunk whose id is not in `ids`, returns how many were dropped"""
+        keep = [i for i, point_id in enumerate(self.ids) if point_id in ids]
+        removed = len(self.ids) - len(keep)
+        if removed:
+            self.vectors = np.asarray(self.vectors)[keep]
+            self.documents = [self.documents[i] for i in keep]
+            self.ids = [self.ids[i] for i in keep]
+            self.centroids = None
+            self.dirty = True
+        return removed
+
+    # ---- approximate index ----
+
+    def build_ivf(self, n_lists=None, n_probe=8, iterations=10):
+        """Cluster the corpus into n_lists inverted lists (default ~sqrt(N))"""
+        n_lists = n_lists or max(1, int(np.sqrt(len(self))))
+        self.centroids = kmeans(np.asarray(self.vectors), n_lists, iterations)
+        assignment = np.argmax(self.vectors @ self.centroids.T, axis=1)
+        self.ivf_order = np.argsort(assignment, kind="stable")
+        self.ivf_offsets = np.searchsorted(assignment[self.ivf_order], np.arange(n_lists + 1))
+        self.n_probe = n_probe
+        self.dirty = True
+
+    def _candidates(self, query_vector, n_probe):
+        lists = _top_k(self.centroids @ query_vector, n_probe)
+        return np.concatenate([
+            self.ivf_order[self.ivf_offsets[lst]:self.ivf_offsets[lst + 1]] for lst in lists
+        ])
+
+    # ---- search ----
+
+    def search_batch(self, query_vectors, k=4, exact=None):
+        """Top-k (indices, scores) for each query vector. Exact search is one matrix multiply
+        for the whole batch; with an IVF index only the probed lists are scored."""
+        queries = _normalize(query_vectors)
+        if len(self) == 0:
+            return [(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)) for _ in queries]
+
+        if exact or (exact is None and self.centroids is None):
+            all_scores = queries @ self.vectors.T
+            results = []
+            for scores in all_scores:
+                best = _top_k(scores, k)
+                results.append((best, scores[best]))
+            return results
+
+        results = []
+        for query in queries:
+            candidates = self._candidates(query, self.n_probe)
+            scores = self.vectors[candidates] @ query
+            best = _top_k(scores, k)
+            results.append((candidates[best], scores[best]))
+        return results
+
+    def _to_documents(self, indices, scores):
+        results = []
+        for index, score in zip(indices.tolist(), scores.tolist()):
+            doc = self.documents[index]
+            metadata = {**doc.metadata, "_id": self.ids[index]}
+            results.append((Document(page_content=doc.page_content, metadata=metadata), score))
+        return results
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4, **kwargs):
+        indices, scores = self.search_batch([embedding], k)[0]
+        return self._to_documents(indices, scores)
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search_with_score(self, query, k=4, **kwargs):
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k)
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: (score + 1.0) / 2.0
+
+    # ---- persistence ----
+
+    def save(self, path):
+        path = Path(path)
+        # written aside and swapped in: self.vectors may be a memory map of the old file
+        with open(path.with_suffix(".npy.tmp"), "wb") as f:
+            np.save(f, np.asarray(self.vectors, dtype=np.float32))
+        os.replace(path.with_suffix(".npy.tmp"), path.with_suffix(".npy"))
+        with open(path.with_suffix(".json"), "w") as f:
+            json.dump({
+                "ids": self.ids,
+                "documents": [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in self.documents],
+                "n_probe": self.n_probe,
+            }, f)
+        if self.centroids is not None:
+            np.savez(path.with_suffix(".ivf.npz"), centroids=self.centroids,
+                     order=self.ivf_order, offsets=self.ivf_offsets)
+        elif path.with_suffix(".ivf.npz").exists():
+            path.with_suffix(".ivf.npz").unlink()  # built for vectors that changed since
+        self.dirty = False
+
+    def save_if_dirty(self, path):
+        if self.dirty:
+            self.save(path)
+
+    @classmethod
+    def load(cls, path, embedding):
+        """Vectors are memory-mapped, so only the pages that searches touch get read from disk"""
+        path = Path(path)
+        vectors = np.load(path.with_suffix(".npy"), mmap_mode="r")
+        with open(path.with_suffix(".json"), "r") as f:
+            meta = json.load(f)
+        documents = [Document(page_content=doc["page_content"], metadata=doc["metadata"]) for doc in meta["documents"]]
+        store = cls(embedding, vectors=vectors, documents=documents, ids=meta["ids"])
+        store.n_probe = meta.get("n_probe", 8)
+        ivf_path = path.with_suffix(".ivf.npz")
+        if ivf_path.exists():
+            ivf = np.load(ivf_path)
+            store.centroids = ivf["centroids"]
+            store.ivf_order = ivf["order"]
+            store.ivf_offsets = ivf["offsets"]
+        return store
+
+    @classmethod
+    def load_or_create(cls, path, embedding):
+        path = Path(path)
+        if path.with_suffix(".npy").exists() and path.with_suffix(".json").exists():
+            return cls.load(path, embedding)
+        return cls(embedding)
@@ -0,0 +1,71 @@
+import hashlib
+import re
+
+import numpy as np
+
+#Near-duplicate chunk collapsing with 64-bit SimHash signatures.
+#The signature is computed once at ingest and stored in chunk metadata ("simhash", hex string so it
+#survives JSON/Qdrant payloads). At query time near-duplicates are found in linear time: the 64 bits
+#are cut into max_distance + 1 bands, and by the pigeonhole principle two signatures within
+#max_distance bits of each other agree exactly on at least one band, so only chunks sharing a band
+#bucket are compared. Chunks sharing ~90% of their text typically land within 8 bits, unrelated
+#chunks around 32.
+
+SIGNATURE_KEY = "simhash"
+_WORD = re.compile(r"\w+")
+_BIT_WEIGHTS = 1 << np.arange(64, dtype=np.uint64)
+
+
+def simhash(text, shingle_size=4):
+    words = _WORD.findall(text.lower())
+    if len(words) < shingle_size:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+
+    hashes = np.frombuffer(
+        b"".join(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest() for shingle in shingles),
+        dtype=np.uint64,
+    )
+    # bit i of the signature is set when most shingle hashes have bit i set
+    bits = ((hashes[:, None] >> np.arange(64, dtype=np.uint64)) & np.uint64(1)).sum(axis=0)
+    return int(_BIT_WEIGHTS[bits * 2 > len(hashes)].sum())
+
+
+def add_signature(doc):
+    doc.metadata[SIGNATURE_KEY] = format(simhash(doc.page_content), "016x")
+    return doc
+
+
+def signature(doc):
+    value = doc.metadata.get(SIGNATURE_KEY)
+    # chunks ingested before signatures existed get one computed on the fly
+    return int(value, 16) if value is not None else simhash(doc.page_content)
+
+
+def _bands(sig, num_bands):
+    # widths differ by at most one bit (9 bands: 7 or 8 bits) and every band holds real bits;
+    # a ceiling width would leave the last band past bit 64, always 0, one bucket shared by all
+    bounds = [64 * i // num_bands for i in range(num_bands + 1)]
+    return [(band, (sig >> lo) & ((1 << (hi - lo)) - 1)) for band, (lo, hi) in enumerate(zip(bounds, bounds[1:]))]
+
+
+def collapse_near_duplicates(ranked_docs, max_distance=8):
+    """Keep the best-ranked representative of every group of near-duplicate chunks (order preserved)"""
+    num_bands = max_distance + 1
+    buckets = {}
+    kept = []
+    for doc in ranked_docs:
+        sig = signature(doc)
+        bands = _bands(sig, num_bands)
+        duplicate = any(
+            bin(sig ^ other).count("1") <= max_distance
+            for band in bands
+            for other in buckets.get(band, ())
+        )
+        if duplicate:
+            continue
+        kept.append(doc)
+        for band in bands:
+            buckets.setdefault(band, []).append(sig)
+    return kept
@@ -1,42 +1,34 @@
 from pathlib import Path
 import os
+import sys
+import time
 from dotenv import load_dotenv
 
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
-from langchain_qdrant import QdrantVectorStore
+
+# shared helpers live one level up in query_tranformation/
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from embedding_cache import CachedEmbeddings
+from qdrant_sync import connect_qdrant
+from streaming_ingest import iter_chunks, iter_pdf_pages, stream_pdf_to_qdrant
+from local_vector_store import LocalVectorStore
+from semantic_cache import SemanticAnswerCache
+from query_variations import VariationCache, iter_variation_lines, retrieve_with_speculation
+from context_packer import ContextPacker
+from near_duplicates import collapse_near_duplicates
 
 load_dotenv()
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-
-
-def load_pdf_documents(pdf_file_path):
-    loader = PyPDFLoader(file_path=pdf_file_path)
-    return loader.load()
-
-
-def split_into_chunks(documents, chunk_size=2000, chunk_overlap=200):
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size, chunk_overlap=chunk_overlap
-    )
-    return splitter.split_documents(documents)
+# "qdrant" (server at localhost:6333) or "local" (in-process NumPy index, no server needed)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "qdrant")
 
 
 def generate_embeddings():
-    return GoogleGenerativeAIEmbeddings(
+    # cached so re-runs on an unchanged PDF skip already-embedded chunks
+    return CachedEmbeddings(GoogleGenerativeAIEmbeddings(
         model="models/text-embedding-004",
         google_api_key=GOOGLE_API_KEY
-    )
-
-
-def store_chunks_in_qdrant(chunks, embedding_model):
-    return QdrantVectorStore.from_documents(
-        documents=chunks,
-        embedding=embedding_model,
-        url="http://localhost:6333",
-        collection_name="pdf_chunks"
-    )
+    ))
 
 
 def load_chat_model():
@@ -59,19 +51,8 @@ If the query is unclear, ask the user to clarify the question once again.
 """
 
 
-def create_query_variations(user_query, model, num_variations=3):
-    prompt = f"Generate {num_variations} different ways to ask the question: {user_query}"
-    response = model.invoke(prompt)
-    variations = response.content.split("\n")
-    return [user_query] + [v.strip() for v in variations if v.strip()]
-
-
-def search_chunks_for_all_queries(queries, vector_store, top_k=3):
-    all_results = []
-    for query in queries:
-        docs = vector_store.similarity_search(query, k=top_k)
-        all_results.extend(docs)
-    return all_results
+def query_variation_prompt(user_query, num_variations=3):
+    return f"Generate {num_variations} different ways to ask the question: {user_query}"
 
 
 def remove_duplicate_chunks(documents):
@@ -84,24 +65,49 @@ def remove_duplicate_chunks(documents):
     return unique
 
 
-def answer_question(user_query, relevant_chunks, model):
-    context_text = "\n\n...\n\n".join([doc.page_content for doc in relevant_chunks])
+def answer_question(user_query, relevant_chunks, model, packer=None):
+    if packer is None:
+        context_text = "\n\n...\n\n".join([doc.page_content for doc in relevant_chunks])
+    else:
+        # highest-ranked chunks first, until the token budget is spent
+        context_text, _, _ = packer.pack(relevant_chunks)
     full_prompt = SYSTEM_PROMPT + f"\n\nPDF Excerpts:\n{context_text}\n\nUser's Question: {user_query}\n\nAnswer:"
+    if packer is not None:
+        print(f"🧮 Prompt tokens: {packer.count_tokens(full_prompt)}")
     response = model.invoke(full_prompt)
     return response.content
 
 
-def ask_pdf_question(user_query, vector_store, chat_model):
-    query_versions = create_query_variations(user_query, chat_model)
-
+def ask_pdf_question(user_query, vector_store, chat_model, answer_cache=None, variation_cache=None, packer=None):
+    # same or nearly the same question asked before: skip variations, retrieval and generation
+    if answer_cache is not None:
+        cached_answer, query_vector = answer_cache.get(user_query)
+        if cached_answer is not None:
+            return cached_answer
+    start = time.perf_counter()
+
+    # the original query is searched while the variations are still being generated,
+    # repeated questions reuse their cached variations
+    query_versions, docs_per_query = retrieve_with_speculation(
+        user_query,
+        vector_store,
+        iter_variation_lines(chat_model, query_variation_prompt(user_query)),
+        k=3,
+        cache=variation_cache,
+    )
 
     print("\n🔁 Query Variations:")
     for idx, q in enumerate(query_versions, 1):
         print(f"{idx}. {q}")
 
-    all_matches = search_chunks_for_all_queries(query_versions, vector_store)
-    unique_chunks = remove_duplicate_chunks(all_matches)
-    return answer_question(user_query, unique_chunks, chat_model)
+    all_matches = [doc for docs in docs_per_query for doc in docs]
+    # exact duplicates first (cheap), then chunks that are mostly the same text
+    unique_chunks = collapse_near_duplicates(remove_duplicate_chunks(all_matches))
+    answer = answer_question(user_query, unique_chunks, chat_model, packer)
+
+    if answer_cache is not None:
+        answer_cache.put(user_query, answer, time.perf_counter() - start, query_vector)
+    return answer
 
 
 if __name__ == '__main__':
@@ -110,10 +116,23 @@ if __name__ == '__main__':
 
     print(pdf_path)
 
-    documents = load_pdf_documents(pdf_path)
-    chunks = split_into_chunks(documents)
     embedder = generate_embeddings()
-    vector_store = store_chunks_in_qdrant(chunks, embedder)
+    # pages are loaded, split, embedded and upserted batch by batch instead of all at once
+    if VECTOR_BACKEND == "local":
+        # persisted next to this script, re-runs only embed the chunks that changed
+        index_path = Path(__file__).resolve().parent / "vector_index"
+        vector_store = LocalVectorStore.load_or_create(index_path, embedder)
+        vector_store.sync_documents(iter_chunks(iter_pdf_pages(pdf_path)))
+        vector_store.save_if_dirty(index_path)
+    else:
+        vector_store = stream_pdf_to_qdrant(
+            pdf_path, embedder, client=connect_qdrant("http://localhost:6333"), collection_name="pdf_chunks"
+        )
+    embedder.print_stats()
+    answer_cache = SemanticAnswerCache(embedder, path=Path(__file__).resolve().parent / "answer_cache.json")
+    answer_cache.bind(vector_store)
+    variation_cache = VariationCache(path=Path(__file__).resolve().parent / "variation_cache.json")
+    packer = ContextPacker(budget_tokens=3000)
     chat_model = load_chat_model()
 
     while True:
@@ -125,7 +144,8 @@ if __name__ == '__main__':
             print("❗ Please enter a valid question.")
             continue
         try:
-            response = ask_pdf_question(user_input, vector_store, chat_model)
+            response = ask_pdf_question(user_input, vector_store, chat_model, answer_cache, variation_cache, packer)
             print("\n📎 Answer:\n", response)
+            answer_cache.print_stats()
         except Exception as e:
             print(f"⚠️ Error: {e}")
\ No newline at end of file
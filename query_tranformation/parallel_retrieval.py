@@ -0,0 +1,110 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+#Concurrent retrieval stage for multi-query RAG.
+#All query variations are embedded in ONE batched call, then the vector searches are fanned out
+#concurrently (thread pool or asyncio) so latency no longer grows linearly with the number of variations.
+
+
+def embed_queries(embedder, queries):
+    """Embed all query variations in a single batched request"""
+    if hasattr(embedder, "embed_queries"):
+        return embedder.embed_queries(queries)
+    try:
+        # Google embeddings use a different task type for queries than for documents
+        return embedder.embed_documents(queries, task_type="RETRIEVAL_QUERY")
+    except TypeError:
+        return embedder.embed_documents(queries)
+
+
+def _search_fn(vector_store, queries, k):
+    """Returns search(i) for query i, searching by precomputed vector when the store supports it"""
+    embedder = getattr(vector_store, "embeddings", None)
+    if embedder is None or not hasattr(vector_store, "similarity_search_by_vector"):
+        return lambda i: vector_store.similarity_search(queries[i], k=k)
+
+    vectors = embed_queries(embedder, queries)
+    return lambda i: vector_store.similarity_search_by_vector(vectors[i], k=k)
+
+
+class TimedSearches:
+    """Thread pool of searches where every search gets its own `timeout` seconds, counted from when a
+    worker picks it up (or from its submission, while it is still waiting for a worker). A search over
+    its timeout contributes an empty list and is left running in the background instead of delaying
+    the answer. Use as `with TimedSearches(...) as searches:`; leaving never waits for hung searches."""
+
+    def __init__(self, max_workers=8, timeout=10.0):
+        self.timeout = timeout
+        self.pool = ThreadPoolExecutor(max_workers=max(1, max_workers))
+        self.searches = []  # (query, future, submitted)
+        self.started = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        # queries that never got a worker are not started at all
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, query, search, *args, **kwargs):
+        i = len(self.searches)
+
+        def run():
+            self.started[i] = time.monotonic()
+            return search(*args, **kwargs)
+
+        self.searches.append((query, self.pool.submit(run), time.monotonic()))
+
+    def results(self):
+        """One list of Documents per submitted search, in submission order"""
+        docs_per_query = []
+        for i, (query, future, submitted) in enumerate(self.searches):
+            while not future.done():
+                remaining = self.started.get(i, submitted) + self.timeout - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    future.result(timeout=remaining)
+                except FutureTimeoutError:
+                    pass  # it may have been picked up meanwhile, which restarts its clock
+            if future.done():
+                docs_per_query.append(future.result())
+            else:
+                print(f"⏱️ Retrieval timed out for: {query}")
+                docs_per_query.append([])
+        return docs_per_query
+
+
+def retrieve_concurrently(queries, vector_store, k=3, max_concurrency=8, timeout=10.0):
+    """Thread-pool retrieval, returns one list of Documents per query (same order as queries).
+    Every query gets its own `timeout` (see TimedSearches)."""
+    search = _search_fn(vector_store, queries, k)
+    with TimedSearches(min(max_concurrency, len(queries)), timeout) as searches:
+        for i, query in enumerate(queries):
+            searches.submit(query, search, i)
+        return searches.results()
+
+
+async def aretrieve_concurrently(queries, vector_store, k=3, max_concurrency=8, timeout=10.0):
+    """asyncio variant of retrieve_concurrently with a semaphore as the concurrency limit"""
+    embedder = getattr(vector_store, "embeddings", None)
+    use_vectors = embedder is not None and hasattr(vector_store, "asimilarity_search_by_vector")
+    if use_vectors:
+        vectors = await asyncio.to_thread(embed_queries, embedder, queries)
+
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def search(i):
+        async with semaphore:
+            try:
+                if use_vectors:
+                    coro = vector_store.asimilarity_search_by_vector(vectors[i], k=k)
+                else:
+                    coro = asyncio.to_thread(vector_store.similarity_search, queries[i], k=k)
+                return await asyncio.wait_for(coro, timeout)
+            except asyncio.TimeoutError:
+                print(f"⏱️ Retrieval timed out for: {queries[i]}")
+                return []
+
+    return list(await asyncio.gather(*(search(i) for i in range(len(queries)))))
@@ -0,0 +1,67 @@
+from qdrant_client import QdrantClient, models
+
+#Qdrant helpers for the incremental, idempotent ingest in streaming_ingest.py.
+#Every chunk gets a deterministic point ID derived from (source file, page, chunk hash), so running
+#the same PDF twice is a no-op, an edited page only uploads its changed chunks, and chunks that
+#no longer exist in the document are deleted instead of piling up as duplicates.
+
+
+def existing_point_ids(client, collection_name, source, batch_size=256):
+    """IDs of all points already stored for one source file"""
+    source_filter = models.Filter(must=[
+        models.FieldCondition(key="metadata.source", match=models.MatchValue(value=source))
+    ])
+    ids = set()
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            scroll_filter=source_filter,
+            limit=batch_size,
+            offset=offset,
+            with_payload=False,
+            with_vectors=False,
+        )
+        ids.update(str(point.id) for point in points)
+        if offset is None:
+            return ids
+
+
+def ensure_collection(client, collection_name, vector_size):
+    if not client.collection_exists(collection_name):
+        client.create_collection(
+            collection_name=collection_name,
+            vectors_config=models.VectorParams(size=vector_size, distance=models.Distance.COSINE),
+        )
+
+
+def upsert_chunks(client, collection_name, point_ids, chunks, vectors):
+    """One batched upsert, same payload layout as QdrantVectorStore.from_documents so retrieval stays unchanged"""
+    ensure_collection(client, collection_name, len(vectors[0]))
+    client.upsert(
+        collection_name=collection_name,
+        points=[
+            models.PointStruct(
+                id=point_id,
+                vector=vector,
+                payload={"page_content": chunk.page_content, "metadata": chunk.metadata},
+            )
+            for point_id, chunk, vector in zip(point_ids, chunks, vectors)
+        ],
+    )
+
+
+def delete_points(client, collection_name, point_ids, batch_size=64):
+    point_ids = list(point_ids)
+    for start in range(0, len(point_ids), batch_size):
+        client.delete(
+            collection_name=collection_name,
+            points_selector=models.PointIdsList(points=point_ids[start:start + batch_size]),
+        )
+
+
+def connect_qdrant(url="http://localhost:6333"):
+    """Pass ":memory:" to run against Qdrant's in-process local mode (handy for tests)"""
+    if url == ":memory:":
+        return QdrantClient(location=":memory:")
+    return QdrantClient(url=url)
@@ -0,0 +1,91 @@
+import json
+import os
+from collections import OrderedDict
+
+from parallel_retrieval import TimedSearches, retrieve_concurrently
+from semantic_cache import normalize_question
+
+#Memoized query-variation generation with speculative retrieval.
+#Cache hit: the stored variations are retrieved right away (one batched embedding call).
+#Cache miss: retrieval of the ORIGINAL query starts immediately while the chat model is still
+#streaming its variations; each variation is searched as soon as its line is complete.
+
+
+def iter_variation_lines(model, prompt):
+    """Yield every non-empty line of the model's answer as soon as it has been streamed"""
+    buffer = ""
+    for chunk in model.stream(prompt):
+        buffer += chunk.content
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            if line.strip():
+                yield line.strip()
+    if buffer.strip():
+        yield buffer.strip()
+
+
+class VariationCache:
+    """Bounded LRU of normalized query -> generated variations, optionally persisted as JSON"""
+
+    def __init__(self, max_entries=500, path=None):
+        self.max_entries = max_entries
+        self.path = path
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    self.entries.update(json.load(f))
+            except json.JSONDecodeError:
+                print(f"Error loading {path}, starting with an empty variation cache")
+
+    @staticmethod
+    def key(query, num_variations):
+        return f"{num_variations}|{normalize_question(query)}"
+
+    def get(self, query, num_variations):
+        key = self.key(query, num_variations)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, query, num_variations, variations):
+        key = self.key(query, num_variations)
+        self.entries[key] = variations
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        if self.path:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, self.path)
+
+
+def retrieve_with_speculation(query, vector_store, variation_lines, k=3, cache=None, num_variations=3,
+                              max_concurrency=8, timeout=10.0):
+    """Returns (queries, docs_per_query) with the original query first.
+    `variation_lines` is a lazy iterable (e.g. iter_variation_lines), it is never consumed on a cache hit.
+    A search over its `timeout` seconds contributes an empty list (see retrieve_concurrently)."""
+    cached = cache.get(query, num_variations) if cache is not None else None
+    if cached is not None:
+        queries = [query] + cached
+        return queries, retrieve_concurrently(queries, vector_store, k=k, max_concurrency=max_concurrency,
+                                              timeout=timeout)
+
+    variations = []
+    with TimedSearches(max_concurrency, timeout) as searches:
+        # the original query does not need the LLM, search it while the variations are generated
+        searches.submit(query, vector_store.similarity_search, query, k=k)
+        for line in variation_lines:
+            variations.append(line)
+            searches.submit(line, vector_store.similarity_search, line, k=k)
+        docs_per_query = searches.results()
+
+    if cache is not None:
+        cache.put(query, num_variations, variations)
+    return [query] + variations, docs_per_query
@@ -0,0 +1,121 @@
+import hashlib
+
+import numpy as np
+
+#Rank fusion engine for multi-query retrieval.
+#Ranked lists are turned into one (num_lists x depth) matrix of integer chunk IDs, padded with -1,
+#and every strategy scores all entries in a single vectorized pass (np.bincount), then only the
+#top_k results are selected with np.argpartition instead of sorting every fused document.
+#
+#   rrf           sum_i            1 / (k + rank)
+#   weighted_rrf  sum_i  w_i     * 1 / (k + rank)
+#   combsum       sum_i  w_i     * score
+#   combmnz       combsum        * number of lists the document appears in
+
+
+def _rrf(ids, ranks, scores, weights, k):
+    return weights[:, None] / (k + ranks)
+
+
+def _combsum(ids, ranks, scores, weights, k):
+    if scores is None:
+        raise ValueError("combsum/combmnz need similarity scores for every ranked list")
+    return weights[:, None] * scores
+
+
+FUSION_STRATEGIES = {
+    "rrf": _rrf,
+    "weighted_rrf": _rrf,
+    "combsum": _combsum,
+    "combmnz": _combsum,
+}
+
+
+def fuse(ids, strategy="rrf", scores=None, weights=None, k=60, top_k=None, num_docs=None):
+    """Fuse ranked lists of integer chunk IDs.
+
+    ids     int array (num_lists, depth), row i is the ranking of query i, -1 marks padding
+    scores  float array like ids with raw similarity scores (combsum/combmnz only)
+    weights per-list weights (weighted_rrf/combsum/combmnz), defaults to 1.0
+    Returns (doc_ids, fused_scores) ordered best first, at most top_k of them.
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    if ids.ndim != 2:
+        raise ValueError("ids must be a 2-D (num_lists, depth) array")
+    if strategy not in FUSION_STRATEGIES:
+        raise ValueError(f"Unknown fusion strategy: {strategy}")
+
+    weights = np.ones(ids.shape[0]) if weights is None else np.asarray(weights, dtype=np.float64)
+    scores = None if scores is None else np.asarray(scores, dtype=np.float64)
+    ranks = np.arange(1, ids.shape[1] + 1, dtype=np.float64)[None, :]
+
+    valid = ids >= 0
+    contributions = FUSION_STRATEGIES[strategy](ids, ranks, scores, weights, k)
+    contributions = np.broadcast_to(contributions, ids.shape)[valid]
+    flat_ids = ids[valid]
+
+    size = num_docs if num_docs is not None else (int(flat_ids.max()) + 1 if flat_ids.size else 0)
+    fused = np.bincount(flat_ids, weights=contributions, minlength=size)
+    hits = np.bincount(flat_ids, minlength=size)
+    if strategy == "combmnz":
+        fused *= hits
+
+    present = np.flatnonzero(hits)
+    if top_k is not None and top_k < present.size:
+        # partial selection: O(n) to find the top_k, then sort only those
+        candidates = present[np.argpartition(-fused[present], top_k - 1)[:top_k]]
+    else:
+        candidates = present
+    order = candidates[np.argsort(-fused[candidates], kind="stable")]
+    return order, fused[order]
+
+
+def chunk_id(doc):
+    """Stable identity of a retrieved chunk: the Qdrant point ID when available, else a content hash"""
+    point_id = doc.metadata.get("_id")
+    if point_id is not None:
+        return str(point_id)
+    return hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()
+
+
+def fuse_documents(docs_per_query, strategy="rrf", scores_per_query=None, weights=None,
+                   k=60, top_k=None, debug=False):
+    """Fuse lists of LangChain Documents, returns the fused Documents best first.
+
+    With debug=True also returns per-document provenance:
+    {chunk_id: [(query index, rank, contribution), ...]} plus the fused scores.
+    """
+    index = {}
+    docs = []
+    depth = max((len(query_docs) for query_docs in docs_per_query), default=0)
+    ids = np.full((len(docs_per_query), depth), -1, dtype=np.int64)
+    for i, query_docs in enumerate(docs_per_query):
+        for rank, doc in enumerate(query_docs):
+            key = chunk_id(doc)
+            slot = index.get(key)
+            if slot is None:
+                slot = index[key] = len(docs)
+                docs.append(doc)
+            ids[i, rank] = slot
+
+    scores = None
+    if scores_per_query is not None:
+        scores = np.zeros(ids.shape)
+        for i, query_scores in enumerate(scores_per_query):
+            scores[i, :len(query_scores)] = query_scores
+
+    order, fused_scores = fuse(ids, strategy, scores, weights, k, top_k, num_docs=len(docs))
+    fused_docs = [docs[slot] for slot in order]
+    if not debug:
+        return fused_docs
+
+    weights = np.ones(ids.shape[0]) if weights is None else np.asarray(weights, dtype=np.float64)
+    provenance = {}
+    for i, row in enumerate(ids):
+        for rank, slot in enumerate(row[row >= 0], start=1):
+            if strategy in ("rrf", "weighted_rrf"):
+                contribution = weights[i] / (k + rank)
+            else:
+                contribution = weights[i] * scores[i, rank - 1]
+            provenance.setdefault(chunk_id(docs[slot]), []).append((i, rank, float(contribution)))
+    return fused_docs, fused_scores.tolist(), provenance
@@ -0,0 +1,102 @@
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+
+import numpy as np
+
+from bm25_index import BM25Index
+
+#Cheap reranking stage between fusion and prompt assembly.
+#A large candidate pool (e.g. the top 50 fused chunks) is scored with three cheap features:
+#   lexical   BM25 of the original query over the pool itself
+#   semantic  cosine(query, chunk) for the whole pool in one matrix-vector product; chunk vectors
+#             come from the (cached) embedder, so chunks embedded at ingest cost no API call
+#   prior     the chunk's position in the fused ranking
+#Only candidates near the top_n cut-off ("borderline") are optionally sent to the chat model for a
+#relevance grade: at most `max_graded` of them (the closest to the cut-off), all at once, and only
+#when the remaining latency budget exceeds the expected grade latency (a running average of the
+#observed calls, starting at `llm_latency_s`). The semantic scoring runs in a worker pool and the
+#grades in their own small pool, so slow chat calls never hold up the next request's scoring;
+#whatever is not back by the deadline is ignored. Grading is off unless an `llm` is passed.
+
+LLM_GRADE_PROMPT = """Rate how relevant the excerpt is to the question on a scale of 0 to 10.
+Question: {question}
+Excerpt: {excerpt}
+Reply with the number only."""
+
+
+def _min_max(values):
+    spread = values.max() - values.min() if values.size else 0.0
+    return (values - values.min()) / spread if spread > 0 else np.zeros_like(values)
+
+
+class Reranker:
+    def __init__(self, embedder, weights=(0.35, 0.45, 0.2), llm=None, budget_ms=300,
+                 borderline_band=0.05, llm_weight=0.5, max_graded=4, llm_latency_s=1.0):
+        self.embedder = embedder
+        self.lexical_weight, self.semantic_weight, self.prior_weight = weights
+        self.llm = llm
+        self.budget_ms = budget_ms
+        self.borderline_band = borderline_band
+        self.llm_weight = llm_weight
+        self.max_graded = max_graded
+        self.llm_latency_s = llm_latency_s  # expected seconds per grade, updated from observed calls
+        # shared across requests; calls that overrun the budget finish here without anyone waiting
+        self.pool = ThreadPoolExecutor(max_workers=8)
+        # grades get their own workers so a backlog of slow chat calls cannot delay semantic scoring
+        self.llm_pool = ThreadPoolExecutor(max_workers=max_graded) if llm is not None else None
+
+    def lexical_scores(self, query, candidates):
+        pool = BM25Index()
+        pool.add_documents(candidates, ids=[str(i) for i in range(len(candidates))])
+        scores = np.zeros(len(candidates), dtype=np.float32)
+        for doc, score in pool.search_with_scores(query, k=len(candidates)):
+            scores[int(doc.metadata["_id"])] = score
+        return _min_max(scores)
+
+    def semantic_scores(self, query, candidates):
+        query_vector = np.asarray(self.embedder.embed_query(query), dtype=np.float32)
+        matrix = np.asarray(self.embedder.embed_documents([doc.page_content for doc in candidates]), dtype=np.float32)
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        query_vector /= max(np.linalg.norm(query_vector), 1e-12)
+        return _min_max(matrix @ query_vector)
+
+    def llm_grade(self, query, doc):
+        started = time.perf_counter()
+        response = self.llm.invoke(LLM_GRADE_PROMPT.format(question=query, excerpt=doc.page_content[:1500]))
+        self.llm_latency_s = 0.8 * self.llm_latency_s + 0.2 * (time.perf_counter() - started)
+        match = re.search(r"\d+(\.\d+)?", response.content)
+        return min(float(match.group()), 10.0) / 10.0 if match else None
+
+    def rerank(self, query, candidates, top_n=5):
+        """Returns all candidates reordered best first; top_n is the cut-off the LLM grading focuses on"""
+        if len(candidates) <= 1:
+            return list(candidates)
+        deadline = time.perf_counter() + self.budget_ms / 1000
+        semantic = self.pool.submit(self.semantic_scores, query, candidates)
+
+        prior = 1.0 - np.arange(len(candidates), dtype=np.float32) / len(candidates)
+        scores = self.prior_weight * prior + self.lexical_weight * self.lexical_scores(query, candidates)
+        try:
+            scores += self.semantic_weight * semantic.result(timeout=max(0.0, deadline - time.perf_counter()))
+        except FutureTimeoutError:
+            semantic.cancel()  # embedder too slow, rank on the lexical and prior scores
+
+        order = np.argsort(-scores, kind="stable")
+        if (self.llm is not None and len(candidates) > top_n
+                and deadline - time.perf_counter() > self.llm_latency_s):
+            cutoff = scores[order[top_n - 1]]
+            borderline = [i for i in order.tolist() if abs(scores[i] - cutoff) <= self.borderline_band]
+            borderline = sorted(borderline, key=lambda i: abs(scores[i] - cutoff))[:self.max_graded]
+            grades = {self.llm_pool.submit(self.llm_grade, query, candidates[i]): i for i in borderline}
+            done, late = wait(grades, timeout=max(0.0, deadline - time.perf_counter()))
+            for future in late:
+                future.cancel()  # out of budget, keep the cheap scores for these
+            for future in done:
+                grade = future.result() if future.exception() is None else None
+                if grade is not None:
+                    i = grades[future]
+                    scores[i] = (1 - self.llm_weight) * scores[i] + self.llm_weight * grade
+            order = np.argsort(-scores, kind="stable")
+
+        return [candidates[i] for i in order.tolist()]
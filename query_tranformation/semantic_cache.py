@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+#Semantic answer cache for the PDF chat assistants.
+#Lookup order: exact match on the normalized question (no embedding call at all), then cosine
+#similarity of the question embedding against every cached question in one matrix-vector product.
+#Entries expire after `ttl_seconds`, the least recently used entry is evicted past `max_entries`,
+#and the whole cache is dropped when the fingerprint of the vector collection changes (re-ingest).
+
+
+def normalize_question(question):
+    return " ".join(question.lower().split()).rstrip("?!. ")
+
+
+def collection_fingerprint(vector_store):
+    """Hash of every point ID in the store. Point IDs are content-addressed (chunk_ids.chunk_point_id),
+    so any re-ingest that adds, changes or removes a chunk changes the fingerprint."""
+    ids = getattr(vector_store, "ids", None)
+    if ids is None and hasattr(vector_store, "client"):
+        ids, offset = [], None
+        while True:
+            points, offset = vector_store.client.scroll(
+                collection_name=vector_store.collection_name, limit=1024, offset=offset,
+                with_payload=False, with_vectors=False,
+            )
+            ids.extend(str(point.id) for point in points)
+            if offset is None:
+                break
+    digest = hashlib.sha256()
+    for point_id in sorted(str(point_id) for point_id in ids or []):
+        digest.update(point_id.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class SemanticAnswerCache:
+    def __init__(self, embedder, threshold=0.95, ttl_seconds=24 * 3600, max_entries=1000, path=None):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.path = path
+        self.fingerprint = None
+
+        # normalized question -> {"answer", "vector", "created", "latency"}
+        self.entries = OrderedDict()
+        self._matrix = None
+        self._matrix_keys = []
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+        if path and os.path.exists(path):
+            self.load()
+
+    # ---- invalidation ----
+
+    def bind(self, vector_store):
+        """Attach the cache to a collection, clearing it if the collection was re-ingested since"""
+        fingerprint = collection_fingerprint(vector_store)
+        if self.fingerprint is not None and fingerprint != self.fingerprint:
+            print("🧹 Collection changed, clearing answer cache")
+            self.clear()
+        self.fingerprint = fingerprint
+
+    def clear(self):
+        self.entries.clear()
+        self._matrix = None
+        self._matrix_keys = []
+
+    # ---- lookup ----
+
+    def _expired(self, entry, now):
+        return now - entry["created"] > self.ttl_seconds
+
+    def _hit(self, key):
+        entry = self.entries[key]
+        self.entries.move_to_end(key)
+        self.saved_seconds += entry["latency"]
+        return entry["answer"]
+
+    def _vectors(self):
+        if self._matrix is None:
+            self._matrix_keys = list(self.entries.keys())
+            self._matrix = (np.stack([self.entries[key]["vector"] for key in self._matrix_keys])
+                            if self._matrix_keys else None)
+        return self._matrix_keys, self._matrix
+
+    def get(self, question):
+        """Returns (answer or None, question vector or None). Pass the vector back to put()."""
+        key = normalize_question(question)
+        now = time.time()
+
+        entry = self.entries.get(key)
+        if entry is not None and not self._expired(entry, now):
+            self.exact_hits += 1
+            return self._hit(key), entry["vector"]
+
+        vector = np.asarray(self.embedder.embed_query(question), dtype=np.float32)
+        vector /= max(np.linalg.norm(vector), 1e-12)
+        keys, matrix = self._vectors()
+        if matrix is not None:
+            similarities = matrix @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.threshold and not self._expired(self.entries[keys[best]], now):
+                self.semantic_hits += 1
+                return self._hit(keys[best]), vector
+
+        self.misses += 1
+        return None, vector
+
+    def put(self, question, answer, latency, vector=None):
+        key = normalize_question(question)
+        if vector is None:
+            vector = np.asarray(self.embedder.embed_query(question), dtype=np.float32)
+            vector /= max(np.linalg.norm(vector), 1e-12)
+
+        self.entries[key] = {"answer": answer, "vector": vector, "created": time.time(), "latency": latency}
+        self.entries.move_to_end(key)
+        now = time.time()
+        for stale_key in [k for k, e in self.entries.items() if self._expired(e, now)]:
+            del self.entries[stale_key]
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        self._matrix = None
+
+        if self.path:
+            self.save()
+
+    # ---- stats / persistence ----
+
+    def stats(self):
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+            "saved_seconds": self.saved_seconds,
+        }
+
+    def print_stats(self):
+        stats = self.stats()
+        print(f"⚡ Answer cache: hit rate {stats['hit_rate']:.0%} "
+              f"({stats['exact_hits']} exact, {stats['semantic_hits']} semantic, {stats['misses']} misses), "
+              f"saved {stats['saved_seconds']:.1f}s")
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "fingerprint": self.fingerprint,
+                "entries": [
+                    {"key": key, "answer": e["answer"], "vector": e["vector"].tolist(),
+                     "created": e["created"], "latency": e["latency"]}
+                    for key, e in self.entries.items()
+                ],
+            }, f)
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except json.JSONDecodeError:
+            print(f"Error loading {self.path}, starting with an empty answer cache")
+            return
+        self.fingerprint = data.get("fingerprint")
+        for e in data.get("entries", []):
+            self.entries[e["key"]] = {"answer": e["answer"], "vector": np.asarray(e["vector"], dtype=np.float32),
+                                      "created": e["created"], "latency": e["latency"]}
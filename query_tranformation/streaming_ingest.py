@@ -0,0 +1,137 @@
+import queue
+import threading
+
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_qdrant import QdrantVectorStore
+
+from chunk_ids import chunk_point_id
+from near_duplicates import add_signature
+from qdrant_sync import delete_points, existing_point_ids, upsert_chunks
+from token_chunker import TokenChunker
+
+#Streaming, page-by-page PDF ingest with bounded memory.
+#   lazy page loading -> incremental splitting -> micro-batched embedding -> batched upsert
+#A reader thread parses and splits pages while the main thread embeds and upserts the previous
+#batch. The hand-off queue is bounded, so when embedding falls behind the reader blocks
+#(backpressure) and at most `max_pending_batches` batches of chunks are ever held in memory.
+
+_DONE = object()
+
+
+def iter_pdf_pages(pdf_path):
+    """Yield one Document per page without materializing the whole PDF"""
+    yield from PyPDFLoader(file_path=str(pdf_path)).lazy_load()
+
+
+def iter_chunks(pages, chunk_tokens=500, overlap_tokens=50):
+    for chunk in TokenChunker(chunk_tokens, overlap_tokens).iter_chunks(pages):
+        # SimHash signature for query-time near-duplicate collapsing
+        yield add_signature(chunk)
+
+
+def iter_batches(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _put(out_queue, item, stop):
+    """Put `item`, blocking while the queue is full; False if `stop` was set meanwhile"""
+    while not stop.is_set():
+        try:
+            out_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _produce(chunks, batch_size, out_queue, errors, stop):
+    try:
+        for batch in iter_batches(chunks, batch_size):
+            if not _put(out_queue, batch, stop):  # the consumer gave up (embedding or upsert failed)
+                return
+    except Exception as e:
+        errors.append(e)
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()  # a generator's own cleanup (e.g. bulk_ingest's process pool) runs now
+        _put(out_queue, _DONE, stop)
+
+
+def stream_chunks_to_qdrant(chunks, embedding_model, client, collection_name="pdf_chunks",
+                            sources=None, batch_size=64, max_pending_batches=2, lexical_index=None,
+                            failed_sources=()):
+    """Embed and upsert an iterable of chunks batch by batch.
+    Points already in the collection are skipped; when `sources` are given, points of those source
+    files that were not seen in this run are deleted at the end.
+    Sources listed in `failed_sources` (it may be filled while `chunks` is consumed) keep their points.
+    A BM25Index passed as `lexical_index` receives the same adds and deletes."""
+    present_by_source = {}
+    if sources and client.collection_exists(collection_name):
+        for source in sources:
+            present_by_source[str(source)] = existing_point_ids(client, collection_name, str(source))
+    present = set().union(*present_by_source.values())
+
+    pending = queue.Queue(maxsize=max_pending_batches)
+    errors = []
+    stop = threading.Event()
+    reader = threading.Thread(target=_produce, args=(chunks, batch_size, pending, errors, stop), daemon=True)
+    reader.start()
+
+    seen = set()
+    upserted = 0
+    try:
+        while True:
+            batch = pending.get()
+            if batch is _DONE:
+                break
+
+            fresh_ids, fresh_chunks = [], []
+            for chunk in batch:
+                point_id = chunk_point_id(chunk)
+                if point_id in seen:
+                    continue
+                seen.add(point_id)
+                if lexical_index is not None and point_id not in lexical_index:
+                    lexical_index.add(point_id, chunk)
+                if point_id not in present:
+                    fresh_ids.append(point_id)
+                    fresh_chunks.append(chunk)
+
+            if fresh_chunks:
+                vectors = embedding_model.embed_documents([chunk.page_content for chunk in fresh_chunks])
+                upsert_chunks(client, collection_name, fresh_ids, fresh_chunks, vectors)
+                upserted += len(fresh_chunks)
+    finally:
+        stop.set()  # unblocks the reader if we are leaving early
+        reader.join()
+    if errors:
+        raise errors[0]
+
+    # a file that could not be parsed was not seen at all: keep what it had rather than wiping it
+    kept = set(map(str, failed_sources))
+    stale = set().union(*(ids for source, ids in present_by_source.items() if source not in kept)) - seen
+    delete_points(client, collection_name, stale, batch_size)
+    if lexical_index is not None:
+        lexical_index.remove(stale)
+
+    print(f"📥 Streamed ingest: {upserted} upserted, {len(stale)} deleted, {len(seen) - upserted} unchanged")
+    return QdrantVectorStore(client=client, collection_name=collection_name, embedding=embedding_model)
+
+
+def stream_pdf_to_qdrant(pdf_path, embedding_model, client, collection_name="pdf_chunks",
+                         chunk_tokens=500, overlap_tokens=50, batch_size=64, max_pending_batches=2,
+                         lexical_index=None):
+    """Full streaming pipeline for one PDF, returns a vector store over the collection"""
+    chunks = iter_chunks(iter_pdf_pages(pdf_path), chunk_tokens, overlap_tokens)
+    return stream_chunks_to_qdrant(
+        chunks, embedding_model, client, collection_name,
+        sources=[str(pdf_path)], batch_size=batch_size, max_pending_batches=max_pending_batches,
+        lexical_index=lexical_index,
+    )
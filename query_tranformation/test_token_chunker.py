@@ -0,0 +1,23 @@
+import sys
+from pathlib import Path
+
+from langchain_core.documents import Document
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from token_chunker import TokenChunker
+
+
+def test_blank_pages_give_no_chunks():
+    chunker = TokenChunker(chunk_tokens=20, overlap_tokens=0)
+    pages = [Document(page_content=text, metadata={"page": i}) for i, text in enumerate(["", "  \n\n \n", "\t"])]
+    assert list(chunker.iter_chunks(pages)) == []
+
+
+def test_blank_pages_between_text_are_skipped():
+    chunker = TokenChunker(chunk_tokens=20, overlap_tokens=0)
+    texts = ["React hooks let components keep state.", "   \n\n   ", "", "Effects run after the render is committed."]
+    pages = [Document(page_content=text, metadata={"page": i}) for i, text in enumerate(texts)]
+    chunks = list(chunker.iter_chunks(pages))
+    assert chunks
+    assert all(chunk.page_content.strip() for chunk in chunks)
+    assert "Effects run" in chunks[-1].page_content
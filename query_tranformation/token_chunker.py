@@ -0,0 +1,169 @@
+import re
+import sys
+from collections import namedtuple
+from pathlib import Path
+
+from langchain_core.documents import Document
+
+# tokenization.py lives at the repo root
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from tokenization import Tokenizer
+
+#Streaming, token-budgeted chunker (replaces the character-based RecursiveCharacterTextSplitter).
+#Each page is scanned once with a single regex that finds structural boundaries, giving "units"
+#(sentences, lines, paragraphs) tagged with the strength of the boundary in front of them:
+#   heading (3) > paragraph / page break (2) > sentence (1) > wrapped line / word (0)
+#Units are counted with the project Tokenizer (one batch per page) and packed
+#until the token budget is reached; a chunk is then cut at the strongest boundary in its second
+#half, and a heading starts a new chunk as soon as the current one is half full. Overlap is the
+#trailing `overlap_tokens` tokens of the previous chunk (whole sentences, then words).
+#Chunks are yielded as they are completed, so only the current chunk's units are held in memory.
+#Metadata: the first page's metadata plus page, page_end, start_index/end_index (character offsets
+#into the document, i.e. the page texts joined by a blank line) and tokens (the sum of the unit
+#counts; BPE merges across unit edges make the exact count of the chunk text differ by a few tokens).
+
+WORD, SENTENCE, PARAGRAPH, HEADING = 0, 1, 2, 3
+PAGE_BREAK = "\n\n"
+
+# every alternative starts with a specific character, which keeps the scan fast on long pages
+_BOUNDARY = re.compile(r"[.!?][ \t]+(?:\n[ \t\n]*)?|\n[ \t\n]*")
+_WORD = re.compile(r"\S+\s*")
+
+_Unit = namedtuple("_Unit", "text tokens strength start metadata")
+
+
+def _boundary_strength(text, match):
+    if match.group().count("\n") > 1:
+        return PARAGRAPH
+    if match.group()[0] in ".!?":
+        return SENTENCE
+    # a single line break ends a sentence only after sentence punctuation (PDF lines end in spaces)
+    before = text[max(0, match.start() - 8):match.start()].rstrip()
+    return SENTENCE if before[-1:] in (".", "!", "?") and before else WORD
+
+
+def _is_heading(text):
+    text = text.strip()
+    return 0 < len(text) <= 80 and "\n" not in text and (text.startswith("#") or text[-1] not in ".!?:;,")
+
+
+class TokenChunker:
+    def __init__(self, chunk_tokens=500, overlap_tokens=50, model_name="gpt-4o"):
+        if overlap_tokens >= chunk_tokens:
+            raise ValueError("overlap_tokens must be smaller than chunk_tokens")
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        self.tokenizer = Tokenizer(model_name)
+
+    # ---- units ----
+
+    def _page_units(self, page, offset, last_page=False):
+        """Split one page into units along structural boundaries, in one regex pass"""
+        text = page.page_content if last_page else page.page_content + PAGE_BREAK
+        spans, start, strength = [], 0, PARAGRAPH
+        for match in _BOUNDARY.finditer(text):
+            if match.start() == 0:
+                continue  # leading whitespace stays with the first unit
+            after = _boundary_strength(text, match)
+            spans.append((start, match.end(), strength, after))
+            start, strength = match.end(), after
+        if start < len(text):
+            spans.append((start, len(text), strength, PARAGRAPH))
+
+        texts = [text[begin:end] for begin, end, _, _ in spans]
+        counts = self.tokenizer.count_tokens_batch(texts, use_cache=False)
+        for (begin, _, strength, after), unit_text, tokens in zip(spans, texts, counts):
+            if strength >= PARAGRAPH and after == PARAGRAPH and _is_heading(unit_text):
+                strength = HEADING
+            unit = _Unit(unit_text, tokens, strength, offset + begin, page.metadata)
+            if tokens > self.chunk_tokens:
+                yield from self._word_units(unit)
+            else:
+                yield unit
+
+    def _word_units(self, unit):
+        """Break a unit that alone exceeds the budget (or is being trimmed for overlap) into words"""
+        matches = list(_WORD.finditer(unit.text))
+        counts = self.tokenizer.count_tokens_batch([match.group() for match in matches], use_cache=False)
+        for i, (match, tokens) in enumerate(zip(matches, counts)):
+            yield _Unit(match.group(), tokens, unit.strength if i == 0 else WORD, unit.start + match.start(), unit.metadata)
+
+    # ---- packing ----
+
+    def _cut_index(self, units, next_strength, first=1):
+        """Where to end the chunk: the strongest boundary once half the budget is filled, latest on ties"""
+        best, best_strength, filled = len(units), -1, 0
+        for i, unit in enumerate(units):
+            if i >= first and filled >= self.chunk_tokens // 2 and unit.strength >= best_strength:
+                best, best_strength = i, unit.strength
+            filled += unit.tokens
+        return len(units) if next_strength >= best_strength else best
+
+    def _overlap(self, units):
+        """Trailing units of an emitted chunk worth at most overlap_tokens tokens"""
+        carried, budget = [], self.overlap_tokens
+        for unit in reversed(units):
+            if unit.tokens <= budget:
+                carried.append(unit)
+                budget -= unit.tokens
+                continue
+            for word in reversed(list(self._word_units(unit))):
+                if word.tokens > budget:
+                    break
+                carried.append(word)
+                budget -= word.tokens
+            break
+        carried.reverse()
+        return [unit._replace(strength=WORD) for unit in carried]
+
+    def _make_chunk(self, units):
+        text = "".join(unit.text for unit in units)
+        stripped = text.lstrip()
+        start = units[0].start + len(text) - len(stripped)
+        stripped = stripped.rstrip()
+        metadata = {
+            **units[0].metadata,
+            "page": units[0].metadata.get("page"),
+            "page_end": units[-1].metadata.get("page"),
+            "start_index": start,
+            "end_index": start + len(stripped),
+            "tokens": sum(unit.tokens for unit in units),
+        }
+        return Document(page_content=stripped, metadata=metadata)
+
+    def iter_chunks(self, pages):
+        """Yield token-budgeted chunks from an iterable of page Documents"""
+        for chunk in self._iter_all_chunks(pages):
+            if chunk.page_content:  # blank or scanned pages have no text to embed
+                yield chunk
+
+    def _iter_all_chunks(self, pages):
+        current, tokens, carried, offset = [], 0, 0, 0  # `carried` leading units repeat the previous chunk
+        pages = iter(pages)
+        page = next(pages, None)
+        while page is not None:
+            following = next(pages, None)
+            for unit in self._page_units(page, offset, last_page=following is None):
+                if unit.strength == HEADING and tokens - sum(u.tokens for u in current[:carried]) >= self.chunk_tokens // 2:
+                    # a new section starts a new chunk, no overlap carried across it
+                    yield self._make_chunk(current)
+                    current, tokens, carried = [], 0, 0
+                while current and tokens + unit.tokens > self.chunk_tokens:
+                    cut = self._cut_index(current, unit.strength, first=min(carried + 1, len(current)))
+                    emitted, rest = current[:cut], current[cut:]
+                    yield self._make_chunk(emitted)
+                    overlap = self._overlap(emitted)
+                    if sum(u.tokens for u in overlap + rest) + unit.tokens > self.chunk_tokens:
+                        overlap = []
+                    current, carried = overlap + rest, len(overlap)
+                    tokens = sum(u.tokens for u in current)
+                current.append(unit)
+                tokens += unit.tokens
+            offset += len(page.page_content) + len(PAGE_BREAK)
+            page = following
+        if len(current) > carried:
+            yield self._make_chunk(current)
+
+    def split_documents(self, documents):
+        """Same call as the LangChain splitters, for code that wants a list"""
+        return list(self.iter_chunks(documents))
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from embedding_store import EmbeddingStore
+
+
+@pytest.mark.parametrize("dtype,keep_full_precision", [("int8", True), ("float16", False), ("float32", False)])
+def test_load_save_load_round_trip(tmp_path, dtype, keep_full_precision):
+    vectors = np.random.default_rng(0).standard_normal((500, 32)).astype(np.float32)
+    store = EmbeddingStore(dtype, keep_full_precision=keep_full_precision)
+    store.add(vectors)
+    store.save(tmp_path / "store")
+    expected = store.search(vectors[:5], k=3)
+
+    # saving over the files the loaded store has memory-mapped
+    loaded = EmbeddingStore.load(tmp_path / "store")
+    loaded.save(tmp_path / "store")
+    reloaded = EmbeddingStore.load(tmp_path / "store")
+
+    assert len(reloaded) == 500 and reloaded.ids == store.ids
+    assert (reloaded.full is not None) == keep_full_precision
+    for (indices, scores), (want_indices, want_scores) in zip(reloaded.search(vectors[:5], k=3), expected):
+        assert np.array_equal(indices, want_indices)
+        assert np.allclose(scores, want_scores)
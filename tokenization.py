@@ -1,11 +1,85 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
 import tiktoken
 
 #Tokenization is phaseI of the LLM pipeline.
 #It converts text to tokens and vice versa.
 
+#Encoders are shared: the first Tokenizer for a model loads its BPE ranks, every later one reuses them.
+#Token counts are cached (LRU, keyed by the string's hash) per encoding, because the same prompts,
+#memory entries and chunks get counted over and over.
+
+_ENCODERS = {}
+_COUNT_CACHES = {}
+_REGISTRY_LOCK = threading.Lock()
+NUM_THREADS = os.cpu_count() or 1
+
+
+def get_encoder(model_name):
+    """Shared tiktoken encoder for model_name, loaded lazily on first use"""
+    encoder = _ENCODERS.get(model_name)
+    if encoder is None:
+        with _REGISTRY_LOCK:
+            encoder = _ENCODERS.get(model_name)
+            if encoder is None:
+                encoder = _ENCODERS[model_name] = tiktoken.encoding_for_model(model_name)
+    return encoder
+
+
+class TokenCountCache:
+    """LRU of token counts keyed by hash(text); str caches its own hash, so lookups are cheap"""
+
+    def __init__(self, max_entries=100_000):
+        self.max_entries = max_entries
+        self.counts = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text):
+        key = hash(text)
+        with self.lock:
+            count = self.counts.get(key)
+            if count is None:
+                self.misses += 1
+                return None
+            self.counts.move_to_end(key)
+            self.hits += 1
+            return count
+
+    def put(self, text, count):
+        with self.lock:
+            self.counts[hash(text)] = count
+            self.counts.move_to_end(hash(text))
+            while len(self.counts) > self.max_entries:
+                self.counts.popitem(last=False)
+
+
+def _count_cache(encoder):
+    cache = _COUNT_CACHES.get(encoder.name)
+    if cache is None:
+        with _REGISTRY_LOCK:
+            cache = _COUNT_CACHES.setdefault(encoder.name, TokenCountCache())
+    return cache
+
+
 class Tokenizer:
     def __init__(self, model_name='gpt-4o'):
-        self.encoder = tiktoken.encoding_for_model(model_name)
+        self.model_name = model_name
+        self._encoder = None
+
+    @property
+    def encoder(self):
+        if self._encoder is None:
+            self._encoder = get_encoder(self.model_name)
+        return self._encoder
+
+    @property
+    def count_cache(self):
+        return _count_cache(self.encoder)
 
     def encode(self, text):
         return self.encoder.encode(text)
@@ -15,7 +89,64 @@ class Tokenizer:
 
     def vocab_size(self):
         return self.encoder.n_vocab
-    
+
+    # ---- batches and counting ----
+
+    def _encode_many(self, texts, num_threads, encode):
+        """The BPE core releases the GIL, so slices of the batch are encoded on parallel threads.
+        One slice per thread rather than tiktoken's one future per string, which costs more than
+        encoding a short string; with a single CPU it is a plain loop."""
+        if num_threads <= 1 or len(texts) < 2 * num_threads:
+            return [encode(text) for text in texts]
+        step = -(-len(texts) // num_threads)
+        with ThreadPoolExecutor(num_threads) as pool:
+            parts = pool.map(lambda start: [encode(text) for text in texts[start:start + step]], range(0, len(texts), step))
+        return [tokens for part in parts for tokens in part]
+
+    def encode_batch(self, texts, num_threads=NUM_THREADS):
+        return self._encode_many(list(texts), num_threads, self.encoder.encode)
+
+    def count_tokens(self, text):
+        cache = self.count_cache
+        count = cache.get(text)
+        if count is None:
+            count = len(self.encoder.encode_ordinary(text))
+            cache.put(text, count)
+        return count
+
+    def count_tokens_batch(self, texts, num_threads=NUM_THREADS, use_cache=True):
+        """Token counts for many texts; only texts not in the cache are encoded, in one batch.
+        use_cache=False skips the cache for one-off texts (e.g. the sentences of a document being chunked)"""
+        texts = list(texts)
+        if not use_cache:
+            return [len(tokens) for tokens in self._encode_many(texts, num_threads, self.encoder.encode_ordinary)]
+        cache = self.count_cache
+        counts = [cache.get(text) for text in texts]
+        missing = list(dict.fromkeys(text for text, count in zip(texts, counts) if count is None))
+        if missing:
+            encoded = self._encode_many(missing, num_threads, self.encoder.encode_ordinary)
+            fresh = {text: len(tokens) for text, tokens in zip(missing, encoded)}
+            for text, count in fresh.items():
+                cache.put(text, count)
+            counts = [fresh[text] if count is None else count for text, count in zip(texts, counts)]
+        return counts
+
+    def truncate_to_tokens(self, text, max_tokens):
+        """Longest prefix of text that fits in max_tokens tokens"""
+        if max_tokens <= 0:
+            return ""
+        if len(text) <= max_tokens or self.count_tokens(text) <= max_tokens:
+            return text  # (a token is at least one character)
+        # Only encode a window that surely holds max_tokens tokens, cut before a space so the last
+        # word is not split differently than in the full text
+        window = text[:max_tokens * 8]
+        cut = window.rfind(" ")
+        tokens = self.encoder.encode_ordinary(window[:cut] if cut > 0 else window)
+        if len(tokens) <= max_tokens:
+            tokens = self.encoder.encode_ordinary(text)
+        # decode bytes ourselves so a multi-byte character cut in half is dropped, not replaced
+        return self.encoder.decode_bytes(tokens[:max_tokens]).decode("utf-8", errors="ignore")
+
 
 #Example usage:
 if __name__ == "__main__":
@@ -31,4 +162,8 @@ if __name__ == "__main__":
 
     my_tokens = [976, 9059, 10139, 402, 290, 2450]
     decoded_text = tokenizer.decode(my_tokens)
-    print(f"Input Tokens: {my_tokens} \nDecoded text: {decoded_text}\n\n")  # "The cat sat on the mat."
\ No newline at end of file
+    print(f"Input Tokens: {my_tokens} \nDecoded text: {decoded_text}\n\n")  # "The cat sat on the mat."
+
+    texts = [text, "The dog sat on the log.", text]
+    print(f"Batch token counts: {tokenizer.count_tokens_batch(texts)}")  # [6, 7, 6]
+    print(f"Truncated to 3 tokens: {tokenizer.truncate_to_tokens(text, 3)}")  # "The cat sat"
@@ -2,6 +2,8 @@ from dotenv import load_dotenv
 import os
 import google.generativeai as genai
 
+from embedding_service import EmbeddingService
+
 #Vector embedding is phaseII of LLM pipeline
 #It converts tokens generated in phaseI to vector embeddings
     #but this code is not using tokens, it is directly using text as embedding API keys are designed 
@@ -12,10 +14,31 @@ class VectorEmbedding:
     def __init__(self):
         self.api_key = os.getenv("GENAI_API_KEY")
         genai.configure(api_key=self.api_key)
+        self.services = {}  # EmbeddingService per (model, task_type, options), kept for every embed_batch call
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Close the embedding services (their HTTP connections and event loop threads)"""
+        for service in self.services.values():
+            service.close()
+        self.services.clear()
 
     def embed_content(self, content, model="embedding-001", task_type="RETRIEVAL_DOCUMENT"):
         return genai.embed_content(model=model, content=content, task_type=task_type)
 
+    def embed_batch(self, texts, model="embedding-001", task_type="RETRIEVAL_DOCUMENT", **kwargs):
+        """Many texts at once: batched, concurrent and rate limited, returns a float32 array (len(texts) x dim).
+        The service is created on the first call and reused, so back-to-back calls share its rate limits."""
+        key = (model, task_type, tuple(sorted(kwargs.items())))
+        if key not in self.services:
+            self.services[key] = EmbeddingService(api_key=self.api_key, model=model, task_type=task_type, **kwargs)
+        return self.services[key].embed(texts)
+
     def print_embedding(self, embedding):
         print(f"Embedding vector length: {len(embedding)}")
         print(f"First 5 elements: {embedding[:5]}")